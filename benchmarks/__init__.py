@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Benchmark suite for the analysis pipeline. Run with: python -m benchmarks.run --help
@@ -0,0 +1,133 @@
+# benchmarks/corpus.py
+
+import os
+import random
+
+import fitz
+
+# Fixed vocabulary so that every run with the same seed produces identical documents
+_WORDS = (
+    "agreement supplier invoice delivery schedule payment quarter revenue contract clause party "
+    "obligation warranty liability report analysis growth market customer product service policy "
+    "account balance statement audit compliance risk review budget forecast region office annual "
+    "the of and to in for with on by from at as is are was be this that shall may will must"
+).split()
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+
+
+def _paragraph(rng, sentences=5):
+    result = []
+    for _ in range(sentences):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 18))]
+        result.append(" ".join(words).capitalize() + ".")
+    return " ".join(result)
+
+
+def _write_text_page(doc, rng):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    text = "\n\n".join(_paragraph(rng) for _ in range(6))
+    page.insert_textbox(fitz.Rect(MARGIN, MARGIN, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN), text, fontsize=10)
+    return page
+
+
+def make_digital_pdf(path, pages, seed=0):
+    """Pages with a real text layer, like a born-digital report."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        _write_text_page(doc, rng)
+    doc.save(path)
+    doc.close()
+
+
+def make_scanned_pdf(path, pages, seed=0, dpi=150):
+    """Rasterized pages without a text layer, like the output of a document scanner."""
+    rng = random.Random(seed)
+    source = fitz.open()
+    doc = fitz.open()
+    for _ in range(pages):
+        pix = _write_text_page(source, rng).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_image(page.rect, pixmap=pix)
+    source.close()
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def make_table_pdf(path, pages, seed=0, rows=20, cols=5):
+    """Pages with one ruled table each, which page.find_tables() detects from the lines."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    cell_w = (PAGE_WIDTH - 2 * MARGIN) / cols
+    cell_h = 24
+    for _ in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text((MARGIN, MARGIN - 10), _paragraph(rng, 1)[:80], fontsize=11)
+        for r in range(rows):
+            for c in range(cols):
+                rect = fitz.Rect(MARGIN + c * cell_w, MARGIN + r * cell_h,
+                                 MARGIN + (c + 1) * cell_w, MARGIN + (r + 1) * cell_h)
+                page.draw_rect(rect, color=(0, 0, 0), width=0.5)
+                text = rng.choice(_WORDS) if r == 0 else f"{rng.uniform(0, 10000):.2f}"
+                page.insert_textbox(rect + (3, 5, -3, 0), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def _pattern_pixmap(rng, width, height):
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.set_rect(pix.irect, (255, 255, 255))
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        rect = fitz.IRect(x, y, x + rng.randint(10, width // 3), y + rng.randint(10, height // 3))
+        pix.set_rect(rect & pix.irect, tuple(rng.randrange(256) for _ in range(3)))
+    return pix
+
+
+def make_image_pdf(path, pages, seed=0, images_per_page=4):
+    """Pages with several embedded raster images and a short caption."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    slot_h = (PAGE_HEIGHT - 2 * MARGIN) / images_per_page
+    for _ in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        for i in range(images_per_page):
+            top = MARGIN + i * slot_h
+            page.insert_image(fitz.Rect(MARGIN, top, PAGE_WIDTH / 2, top + slot_h - 10),
+                              pixmap=_pattern_pixmap(rng, 640, 480))
+            page.insert_textbox(fitz.Rect(PAGE_WIDTH / 2 + 10, top, PAGE_WIDTH - MARGIN, top + slot_h - 10),
+                                _paragraph(rng, 2), fontsize=9)
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def make_text_file(path, megabytes, seed=0):
+    """A large plain-text file."""
+    rng = random.Random(seed)
+    target = megabytes * 1024 * 1024
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            chunk = _paragraph(rng, 8) + "\n\n"
+            f.write(chunk)
+            written += len(chunk)
+
+
+def generate_corpus(directory, pages=20, txt_megabytes=2, seed=0):
+    """Writes every synthetic document into directory and returns {corpus_name: path}."""
+    os.makedirs(directory, exist_ok=True)
+    builders = {
+        'digital': ("digital.pdf", lambda p: make_digital_pdf(p, pages, seed)),
+        'scanned': ("scanned.pdf", lambda p: make_scanned_pdf(p, pages, seed)),
+        'tables': ("tables.pdf", lambda p: make_table_pdf(p, pages, seed)),
+        'images': ("images.pdf", lambda p: make_image_pdf(p, pages, seed)),
+        'text': ("huge.txt", lambda p: make_text_file(p, txt_megabytes, seed)),
+    }
+    paths = {}
+    for name, (filename, build) in builders.items():
+        path = os.path.join(directory, filename)
+        build(path)
+        paths[name] = path
+    return paths
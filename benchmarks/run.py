@@ -0,0 +1,319 @@
+# benchmarks/run.py
+"""
+Benchmarks the analysis pipeline on synthetic documents.
+
+    python -m benchmarks.run                                  # mock LLM, results to benchmark_results.json
+    python -m benchmarks.run --llm models/tiny.gguf           # real inference with a small GGUF model
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # exit code 1 on regressions
+
+Every corpus runs in its own process, so peak RSS is measured per corpus.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import multiprocessing
+import concurrent.futures
+
+# Allow running as a plain script as well as with -m
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from benchmarks.corpus import generate_corpus
+from src.utils.tracing import summarize
+
+RESULTS_VERSION = 1
+
+# Stages measured for each corpus and the pipeline options used for its end-to-end run
+CORPUS_PLANS = {
+    'digital': (['text', 'images', 'tables', 'nlp', 'llm'],
+                {'ocr': False, 'images': True, 'tables': True, 'nlp': True}),
+    'scanned': (['render', 'ocr', 'nlp', 'llm'],
+                {'ocr': True, 'images': False, 'tables': False, 'nlp': True}),
+    'tables': (['text', 'tables', 'llm'],
+               {'ocr': False, 'images': False, 'tables': True, 'nlp': False}),
+    'images': (['text', 'images', 'llm'],
+               {'ocr': False, 'images': True, 'tables': False, 'nlp': False}),
+    'text': (['text', 'nlp', 'llm'],
+             {'ocr': False, 'images': False, 'tables': False, 'nlp': True}),
+}
+
+# Metrics compared against the baseline and whether a higher value is better
+_HIGHER_IS_BETTER = {'pages_per_sec': True, 'peak_rss_mb': False, 'p50': False, 'p90': False}
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process and of its finished children (e.g. inference workers)."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return max(own, children) / (1024 * 1024)
+
+
+def _available_stages(stages):
+    """Drops stages whose optional dependency is missing and reports why."""
+    from src.utils.dependency_checker import check_tesseract_dependency
+    from src.processing import nlp_handler
+
+    skipped = {}
+    if 'ocr' in stages and not check_tesseract_dependency()[0]:
+        skipped['ocr'] = "Tesseract not found"
+    if 'nlp' in stages and nlp_handler.get_nlp() is None:
+        skipped['nlp'] = "spaCy model not available"
+    return [s for s in stages if s not in skipped], skipped
+
+
+def _measure_stages(path, stages, llm_handler, ocr_dpi, ocr_profile):
+    """Times each stage on every page of the document, independently of the pipeline."""
+    import fitz
+    from src.processing import ocr_handler, nlp_handler
+
+    samples = {stage: [] for stage in stages}
+    llm_stats = []
+    profile = ocr_handler.get_profile(ocr_profile)
+    doc = fitz.open(path)
+    try:
+        for page in doc:
+            text = ""
+            png = None
+            if 'render' in stages:
+                start = time.perf_counter()
+                png = page.get_pixmap(dpi=ocr_dpi).tobytes("png")
+                samples['render'].append(time.perf_counter() - start)
+            if 'ocr' in stages:
+                start = time.perf_counter()
+                text = ocr_handler.extract_text_from_image(png, profile)
+                samples['ocr'].append(time.perf_counter() - start)
+            if 'text' in stages:
+                start = time.perf_counter()
+                text = page.get_text()
+                samples['text'].append(time.perf_counter() - start)
+            if 'images' in stages:
+                start = time.perf_counter()
+                for img in page.get_images(full=True):
+                    doc.extract_image(img[0])
+                samples['images'].append(time.perf_counter() - start)
+            if 'tables' in stages:
+                start = time.perf_counter()
+                for table in page.find_tables().tables:
+                    table.extract()
+                samples['tables'].append(time.perf_counter() - start)
+            nlp_data = ""
+            if 'nlp' in stages:
+                start = time.perf_counter()
+                nlp_data = nlp_handler.process_text(text)
+                samples['nlp'].append(time.perf_counter() - start)
+            if 'llm' in stages:
+                start = time.perf_counter()
+                for _ in llm_handler.generate_summary_stream(text, nlp_data, "Summarize the key points."):
+                    pass
+                samples['llm'].append(time.perf_counter() - start)
+                llm_stats.append(llm_handler.last_stats)
+    finally:
+        doc.close()
+    return samples, llm_stats
+
+
+def _run_pipeline(path, options, llm_handler, ocr_dpi, ocr_profile):
+    """Runs AnalysisPipeline end to end without a GUI and returns (seconds, pages, error, pipeline metrics)."""
+    from src.processing.pipeline import AnalysisPipeline, AnalysisSignals
+
+    pages = []
+    errors = []
+    signals = AnalysisSignals()
+    signals.page_processed.connect(lambda page, total, text: pages.append(page))
+    signals.error.connect(errors.append)
+    pipeline = AnalysisPipeline(path, "Summarize the key points.",
+                                dict(options, temperature=0.0, ocr_dpi=ocr_dpi, ocr_profile=ocr_profile), llm_handler, signals)
+    start = time.perf_counter()
+    pipeline.run()
+    return time.perf_counter() - start, len(pages), errors[0] if errors else None, pipeline.tracer.metrics()
+
+
+def _load_llm(llm):
+    from src.processing.llm_handler import LLMHandler
+
+    if llm == "mock":
+        config.MOCK_TOKEN_DELAY = 0.0
+        handler = LLMHandler(backend_name="mock")
+        handler.load_model()
+    else:
+        handler = LLMHandler(backend_name="llama_cpp")
+        handler.model_name = os.path.abspath(llm)
+        handler.load_model(force_cpu=True, speculative_mode="off")
+    return handler
+
+
+def benchmark_corpus(name, path, llm, ocr_dpi, ocr_profile, output_dir):
+    """Benchmarks one document. Runs in a fresh process (see main)."""
+    # Keep pipeline output away from the user's output folder
+    config.OUTPUT_DIR = output_dir
+    stages, skipped = _available_stages(CORPUS_PLANS[name][0])
+    options = dict(CORPUS_PLANS[name][1])
+    if 'ocr' in skipped:
+        options['ocr'] = False
+    if 'nlp' in skipped:
+        options['nlp'] = False
+
+    llm_handler = _load_llm(llm)
+    try:
+        samples, llm_stats = _measure_stages(path, stages, llm_handler, ocr_dpi, ocr_profile)
+        seconds, pages, error, pipeline_metrics = _run_pipeline(path, options, llm_handler, ocr_dpi, ocr_profile)
+    finally:
+        llm_handler.shutdown()
+
+    result = {
+        'document': os.path.basename(path),
+        'pages': pages,
+        'seconds': seconds,
+        'pages_per_sec': pages / seconds if seconds > 0 else None,
+        'stages': {stage: summarize(values) for stage, values in samples.items() if values},
+        'skipped_stages': skipped,
+        # Stage timings as traced by the pipeline itself during the end-to-end run
+        'pipeline_stages': pipeline_metrics['stages'],
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+    decode = [st['tokens_per_second'] for st in llm_stats if st.get('tokens_per_second')]
+    ttft = [st['time_to_first_token'] for st in llm_stats if st.get('time_to_first_token') is not None]
+    if decode:
+        result['llm'] = {'decode_tokens_per_sec': summarize(decode),
+                         'time_to_first_token': summarize(ttft) if ttft else None}
+    if error:
+        result['error'] = error
+    return result
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Returns a list of human-readable regressions: throughput that dropped, or latency
+    and memory that grew, by more than `tolerance` (a fraction) relative to the baseline.
+    """
+    regressions = []
+
+    def check(label, metric, current, previous):
+        # Sub-millisecond stage timings are mostly noise
+        if current is None or not previous or (metric in ('p50', 'p90') and previous < 0.001):
+            return
+        change = (current - previous) / previous
+        worse = -change if _HIGHER_IS_BETTER[metric] else change
+        if worse > tolerance:
+            regressions.append(f"{label} {metric}: {previous:.4g} -> {current:.4g} ({change:+.1%})")
+
+    for name, current in results['corpora'].items():
+        previous = baseline.get('corpora', {}).get(name)
+        if not previous or 'error' in current:
+            continue
+        check(name, 'pages_per_sec', current.get('pages_per_sec'), previous.get('pages_per_sec'))
+        check(name, 'peak_rss_mb', current.get('peak_rss_mb'), previous.get('peak_rss_mb'))
+        for stage, stats in current['stages'].items():
+            old = previous.get('stages', {}).get(stage)
+            if old:
+                for metric in ('p50', 'p90'):
+                    check(f"{name}/{stage}", metric, stats[metric], old[metric])
+    return regressions
+
+
+def format_report(results):
+    lines = []
+    for name, r in results['corpora'].items():
+        if 'error' in r:
+            lines.append(f"{name:<8} ERROR: {r['error']}")
+            continue
+        rss = f"{r['peak_rss_mb']:.0f} MB" if r['peak_rss_mb'] else "n/a"
+        lines.append(f"{name:<8} {r['pages']:>4} pages  {r['pages_per_sec']:>8.2f} pages/s  peak RSS {rss}")
+        for stage, st in r['stages'].items():
+            lines.append(f"    {stage:<7} p50 {st['p50'] * 1000:>9.2f} ms   p90 {st['p90'] * 1000:>9.2f} ms   "
+                         f"p99 {st['p99'] * 1000:>9.2f} ms")
+        if r.get('llm'):
+            lines.append(f"    decode  p50 {r['llm']['decode_tokens_per_sec']['p50']:.1f} tok/s")
+        for stage, reason in r['skipped_stages'].items():
+            lines.append(f"    {stage:<7} skipped ({reason})")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DocuMind analysis pipeline on synthetic documents.")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per PDF corpus (default: 20)")
+    parser.add_argument("--txt-mb", type=int, default=2, help="Size of the plain-text corpus in MB (default: 2)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", action="append", choices=sorted(CORPUS_PLANS),
+                        help="Only run the given corpus (repeatable)")
+    parser.add_argument("--llm", default="mock", help="'mock' (deterministic, default) or the path to a GGUF model")
+    parser.add_argument("--ocr-dpi", type=int, default=200)
+    parser.add_argument("--ocr-profile", choices=sorted(config.OCR_PROFILES), default=config.OCR_DEFAULT_PROFILE)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Compare against this results file; exit code 1 on regressions")
+    parser.add_argument("--save-baseline", help="Also write the results to this path as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed relative slowdown before a metric counts as a regression (default: 0.15)")
+    args = parser.parse_args(argv)
+
+    names = args.corpus or list(CORPUS_PLANS)
+    results = {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'llm': args.llm,
+            'pages': args.pages,
+            'txt_mb': args.txt_mb,
+            'seed': args.seed,
+            'ocr_dpi': args.ocr_dpi,
+            'ocr_profile': args.ocr_profile,
+        },
+        'corpora': {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="documind_bench_") as workdir:
+        print(f"Generating corpus ({args.pages} pages per PDF, {args.txt_mb} MB text)...")
+        paths = generate_corpus(os.path.join(workdir, "corpus"), args.pages, args.txt_mb, args.seed)
+        ctx = multiprocessing.get_context("spawn")
+        for name in names:
+            print(f"Benchmarking '{name}'...")
+            try:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                    results['corpora'][name] = executor.submit(
+                        benchmark_corpus, name, paths[name], args.llm, args.ocr_dpi, args.ocr_profile,
+                        os.path.join(workdir, "output")
+                    ).result()
+            except Exception as e:
+                results['corpora'][name] = {'error': repr(e)}
+
+    print()
+    print(format_report(results))
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
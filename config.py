@@ -18,6 +18,7 @@ else:
 MODEL_DIR = os.path.join(WORK_DIR, "models")
 ASSET_DIR = os.path.join(BASE_DIR, "assets")
 OUTPUT_DIR = os.path.join(WORK_DIR, "output")
+CACHE_DIR = os.path.join(WORK_DIR, "cache")
 VENDOR_DIR = os.path.join(BASE_DIR, "vendor")
 
 # Explicit path to the bundled Tesseract executable
@@ -33,6 +34,209 @@ MODEL_SAVE_FILENAME = "Llama-3.2-1B-Instruct-Q4_K_M.gguf"
 # --- LLM Settings ---
 N_GPU_LAYERS = -1
 MAX_TOKENS = 32768
+SUMMARY_MAX_TOKENS = 512
+
+
+# --- Inference Backend ---
+# "llama_cpp" runs the local GGUF model in worker processes, "openai" talks to an
+# OpenAI-compatible server (e.g. llama.cpp's llama-server) and "mock" is a
+# deterministic stand-in for tests and benchmarks.
+LLM_BACKEND = "llama_cpp"
+LLM_SERVER_URL = "http://127.0.0.1:8080"
+LLM_SERVER_MODEL = ""  # Sent as "model"; llama-server ignores it
+LLM_SERVER_API_KEY = ""
+LLM_SERVER_MAX_CONCURRENCY = 4  # Concurrent page requests, match the server's --parallel
+LLM_SERVER_TIMEOUT = 300
+LLM_SERVER_ALLOW_REMOTE = False  # Documents never leave this machine unless enabled
+MOCK_TOKEN_DELAY = 0.0
+
+
+# --- Inference Worker Settings ---
+# Inference runs in separate processes so a native crash or OOM in llama.cpp
+# cannot take down the GUI. 0 = choose the worker count from free RAM.
+LLM_WORKERS = 0
+LLM_MAX_AUTO_WORKERS = 4
+# Estimated RAM per worker on top of the model file (KV cache, scratch buffers)
+LLM_WORKER_RAM_OVERHEAD_MB = 2048
+LLM_WORKER_LOAD_TIMEOUT = 300
+# Pages decoded together as parallel sequences in one llama.cpp context per worker.
+# 1 = one page at a time. Each worker then holds a second KV cache of MAX_TOKENS.
+LLM_BATCH_SIZE = 1
+
+
+# --- Performance Tuning ---
+# The hardware profile (cores, NUMA, caches, RAM, GPUs) is cached in CACHE_DIR.
+HARDWARE_PROFILE_MAX_AGE_DAYS = 30
+# Benchmark thread counts and n_batch once per model on CPU and remember the fastest
+LLM_AUTOTUNE = True
+LLM_AUTOTUNE_BUDGET_SECONDS = 30
+LLM_AUTOTUNE_BATCH_SIZES = [512, 256, 1024]
+# "auto" locks the weights in RAM when they fit twice over; True/False to force
+LLM_USE_MLOCK = "auto"
+
+
+# --- Speculative Decoding ---
+# "off", "prompt_lookup" (drafts copied from n-grams already in the prompt, ideal
+# for summaries that quote the page) or "draft_model" (a small GGUF in MODEL_DIR
+# that shares the main model's vocabulary). Applies to one-page-at-a-time decoding.
+SPECULATIVE_MODE = "off"
+SPECULATIVE_NUM_PRED_TOKENS = 10
+SPECULATIVE_MAX_NGRAM = 2
+SPECULATIVE_DRAFT_MODEL = ""
+# llama-cpp-python keeps logits for every position while verifying drafts
+# (n_ctx x vocabulary floats), so the context is capped in speculative mode.
+SPECULATIVE_N_CTX = 8192
+
+
+# --- Input Settings ---
+# Plain-text files are split into logical pages at form feeds or, failing that,
+# at the last line break before this many bytes (about one dense printed page).
+TXT_PAGE_CHARS = 6000
+
+
+# --- OCR Settings ---
+# Pages whose OCR would need more memory than this (rendered pixmap plus the copies
+# Tesseract makes) are rasterized and recognized in horizontal bands instead.
+# Large image files are decoded once and handed to Tesseract band by band the same way.
+OCR_MAX_MEMORY_MB = 256
+# Band overlap in points (1/72 inch). Must exceed the tallest text line so every
+# line is complete in at least one band; 48pt covers body text up to ~36pt type.
+OCR_TILE_OVERLAP = 48
+# Bands recognized in parallel (each Tesseract call is a separate process).
+# The memory ceiling is shared between them.
+OCR_TILE_WORKERS = 1
+# Adaptive OCR renders in grayscale at the first DPI step and re-renders only
+# low-confidence text blocks (or the whole page, if most of it is poor) at the
+# next steps, never above the DPI chosen in the GUI.
+OCR_ADAPTIVE = True
+OCR_ADAPTIVE_DPI_STEPS = [150, 225, 300, 400]
+OCR_ADAPTIVE_MIN_CONFIDENCE = 75  # Mean Tesseract word confidence (0-100)
+OCR_LANG = "eng"
+
+
+# --- OCR Profiles ---
+# Trained-data variants. "fast" and "best" are the tessdata_fast / tessdata_best
+# downloads; a variant that is missing falls back to the bundled "standard" data.
+TESSDATA_DIRS = {
+    "standard": os.path.join(VENDOR_DIR, "tesseract", "tessdata"),
+    "fast": os.path.join(VENDOR_DIR, "tesseract", "tessdata_fast"),
+    "best": os.path.join(VENDOR_DIR, "tesseract", "tessdata_best"),
+}
+# oem: 1 = LSTM only, 3 = default (legacy + LSTM, standard data only).
+# psm: 3 = automatic layout, 4 = single column, 6 = one uniform block of text.
+# threads: OpenMP threads per Tesseract call (OMP_THREAD_LIMIT), None = Tesseract's
+#          default. Calls that run in parallel (tiled OCR) always get one thread each.
+# preprocess: applied in order to the grayscale render: "autocontrast", "denoise", "sharpen".
+# whitelist: optional string of the only characters to recognize (no spaces).
+OCR_PROFILES = {
+    "fast": {'oem': 1, 'tessdata': "fast", 'psm': 6, 'threads': 1,
+             'preprocess': [], 'whitelist': None},
+    "balanced": {'oem': 1, 'tessdata': "standard", 'psm': 3, 'threads': 2,
+                 'preprocess': ["autocontrast"], 'whitelist': None},
+    "accurate": {'oem': 1, 'tessdata': "best", 'psm': 3, 'threads': None,
+                 'preprocess': ["autocontrast", "denoise", "sharpen"], 'whitelist': None},
+}
+OCR_DEFAULT_PROFILE = "balanced"
+
+
+# --- Duplicate Pages ---
+# Pages that repeat an earlier page reuse its summary (exact repeats) or only have
+# their changed lines summarized (near repeats). Every page is OCR'd and keeps its own
+# text; a scan that looks the same as an earlier page in a small thumbnail only has its
+# text compared line by line with that page's, which catches repeats OCR noise would hide.
+DEDUP_ENABLED = True
+DEDUP_MIN_WORDS = 30                # shorter pages are always processed in full
+DEDUP_TEXT_MAX_DISTANCE = 8         # SimHash bits (of 64) for a near repeat
+DEDUP_MAX_CHANGED_RATIO = 0.3       # near repeats with more changed lines are summarized in full
+# The thumbnail check only catches repeats that render (almost) identically: a
+# changed line of body text flips ~15 bits, but a single changed digit may not,
+# which is why a match is confirmed on the OCR text. -1 turns the thumbnail check off.
+DEDUP_IMAGE_DPI = 48                # thumbnail resolution for the perceptual hash
+DEDUP_IMAGE_HASH_SIZE = 64          # dHash grid, 64 x 64 = 4096 bits
+DEDUP_IMAGE_MAX_DISTANCE = 2        # differing bits still counted as the same page
+DEDUP_IMAGE_MIN_INK = 0.01          # share of set bits; emptier pages are never matched by image
+
+
+# --- Text Cleanup ---
+# Page text is cleaned before NLP and summarization (raw_text.txt keeps the original):
+# hyphenated line breaks are rejoined, whitespace collapsed, and lines repeated near
+# the top or bottom of pages (running headers, footers, disclaimers) are removed.
+CLEANUP_ENABLED = True
+CLEANUP_EDGE_LINES = 5      # non-blank lines at each edge of a page checked for repeats
+CLEANUP_REPEAT_PAGES = 3    # pages an edge line must appear on to count as boilerplate
+
+
+# --- Prompt Compression ---
+# Optional extractive compression of dense pages: sentences are ranked (TextRank over
+# TF-IDF, boosted for named entities) and only the best go to the LLM, in page order.
+# Prompt eval time scales with prompt tokens, so this is the cheapest speedup on CPU.
+COMPRESSION_ENABLED = False       # default of the "Compress Dense Pages" option
+COMPRESSION_TOKEN_RATIO = 0.5     # share of a page's tokens kept
+COMPRESSION_MIN_TOKENS = 300      # shorter pages are sent as they are
+COMPRESSION_ENTITY_BOOST = 0.25   # score bonus per named entity in a sentence
+
+
+# --- Question Answering ---
+# Analyzed documents can be queried in the "Ask" tab. Their text is split into
+# overlapping chunks, embedded with a small GGUF embedding model from the models
+# folder (in its own worker process) and kept in <output folder>/qa_index. Only
+# pages added since the last question are embedded. The "openai" backend uses the
+# server's /v1/embeddings endpoint instead (llama-server needs --embeddings).
+EMBEDDING_MODEL_FILENAME = "nomic-embed-text-v1.5.Q4_K_M.gguf"
+EMBEDDING_N_CTX = 2048
+EMBEDDING_BATCH_SIZE = 16          # chunks per embedding call
+# Task prefixes the embedding model was trained with (nomic-embed); "" for models without them
+EMBEDDING_QUERY_PREFIX = "search_query: "
+EMBEDDING_DOCUMENT_PREFIX = "search_document: "
+QA_CHUNK_CHARS = 1200              # about 300 tokens per chunk
+QA_CHUNK_OVERLAP = 200             # text repeated between neighbouring chunks
+QA_TOP_K = 6                       # excerpts given to the model per question
+QA_MAX_ANSWER_TOKENS = 512
+
+
+# --- Search Index ---
+# Page text, summaries and entities of every run are indexed in one SQLite FTS5
+# database in OUTPUT_DIR, searchable from the Search tab.
+SEARCH_ENABLED = True
+SEARCH_DB_FILE = "search.db"
+SEARCH_COMMIT_PAGES = 16       # pages written per transaction
+SEARCH_MAX_RESULTS = 50
+
+
+# --- Model Routing ---
+# With "Route Pages by Complexity", simple pages are summarized by ROUTING_SMALL_MODEL_FILENAME
+# and complex ones by the model selected in the GUI. Both stay loaded side by side; with
+# LLM_WORKERS = 0 the worker processes of both are sized to fit free RAM together.
+# A page's complexity (0-1) is a weighted mix of its signals, each scaled against the
+# level at which it alone would make the page fully complex.
+ROUTING_ENABLED = False                 # default of the "Route Pages by Complexity" option
+ROUTING_SMALL_MODEL_FILENAME = "qwen2.5-0.5b-instruct-q4_k_m.gguf"  # about half the default model; put it in MODEL_DIR
+ROUTING_THRESHOLD = 0.35                # pages scoring this or more go to the large model
+ROUTING_WEIGHTS = {'tokens': 0.3, 'entities': 0.25, 'tables': 0.3, 'ocr': 0.15}
+ROUTING_TOKENS_FULL = 1200              # estimated prompt tokens
+ROUTING_ENTITY_DENSITY_FULL = 0.04      # distinct named entities per word
+ROUTING_TABLE_LINES_FULL = 0.3          # share of lines laid out as table rows
+ROUTING_OCR_CONFIDENCE_FLOOR = 60       # mean OCR confidence (%) at or below which text counts as noisy
+
+
+# --- Progressive Preview ---
+# With "Quick Preview Pass", every page's text layer is extracted to preview_text.txt and
+# shown before full processing starts. Scanned pages are left to full OCR, so the preview
+# costs next to nothing; only a page picked while it runs gets a quick low-DPI OCR.
+# Pages picked in the Raw Text or AI Summary view during a run are processed next.
+PREVIEW_ENABLED = True          # default of the "Quick Preview Pass" option
+PREVIEW_OCR_DPI = 100           # for scanned pages picked during the preview
+PREVIEW_MIN_TEXT_CHARS = 20     # shorter text layers count as missing (scanned pages)
+
+
+# --- Skim Mode ---
+# Summarizes a stratified sample of the pages (always the first and last) and writes a short
+# overview of the whole document from those summaries, for quick triage of large inputs.
+SKIM_ENABLED = False            # default of the "Skim Mode" option
+SKIM_FRACTION = 0.1             # share of the (selected) pages summarized
+SKIM_MIN_PAGES = 8
+SKIM_MAX_PAGES = 40
+SKIM_OVERVIEW_MAX_TOKENS = 768  # length limit of the overview itself
 
 
 # --- Application Information ---
@@ -9,6 +9,12 @@ import config # Now contains our absolute paths
 
 def main():
     """Application entry point."""
+    if "--profile-imports" in sys.argv:
+        # Prints where startup time goes, e.g. to catch a heavy module imported at the top level
+        from src.utils.startup_profile import import_time_report
+        print(import_time_report())
+        return
+
     # Use the absolute path for the models directory
     if not os.path.exists(config.MODEL_DIR):
         os.makedirs(config.MODEL_DIR)
@@ -1,21 +1,32 @@
 import os
+import re
 import sys
+import html
+import sqlite3
 import subprocess
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
                              QPushButton, QFileDialog, QTextEdit, QGroupBox, QMessageBox,
                              QLabel, QPlainTextEdit, QComboBox, QCheckBox, QTabWidget, 
-                             QScrollArea, QStackedLayout, QProgressBar, QSlider, QListWidget)
+                             QScrollArea, QStackedLayout, QProgressBar, QSlider, QListWidget, QLineEdit,
+                             QTextBrowser)
 from PyQt6.QtGui import QAction, QIcon, QPixmap
-from PyQt6.QtCore import Qt, QThreadPool, pyqtSlot
+from PyQt6.QtCore import Qt, QThreadPool, QTimer, QUrl, pyqtSlot
 
 import config
 from src.gui.widgets import DropArea, DialProgressBar
+from src.gui.page_viewer import PagedTextView
 from src.gui.model_dialog import ModelManagerDialog
 from src.utils.helpers import detect_hardware
-from src.utils.dependency_checker import check_tesseract_dependency, check_spacy_model
+from src.utils.dependency_checker import run_dependency_checks
 from src.utils.downloader import DownloadWorker
-from src.processing.pipeline import AnalysisPipeline, AnalysisSignals
-from src.processing.llm_handler import LLMHandler
+from src.utils.workers import TaskWorker
+from src.utils.tracing import format_stage_totals
+from src.processing.pipeline import AnalysisPipeline, AnalysisSignals, ResummarizePipeline
+from src.processing.run_manifest import read_manifest, read_page_text
+from src.processing.llm_handler import LLMHandler, EmbeddingHandler
+from src.processing.question_answering import DocumentIndex, QuestionWorker, QuestionSignals
+from src.processing.search_index import SearchIndex, index_past_runs, MATCH_START, MATCH_END
+from src.processing.input_adapters import TEXT_EXTENSIONS, IMAGE_EXTENSIONS
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -25,26 +36,64 @@ class MainWindow(QMainWindow):
         self.setWindowIcon(QIcon(os.path.join(config.ASSET_DIR, "logo.png")))
         
         self.llm_handler = LLMHandler()
+        self.embedding_handler = EmbeddingHandler()
         
         self.threadpool = QThreadPool()
         self.analysis_worker = None
+        self._model_loading = False  # a model is being loaded in the background
+        self._on_model_ready = None  # what to start once it is loaded
         self.active_model_name = config.MODEL_DEFAULT_FILENAME
         self.selected_file = None
+        self.last_output_path = None  # output folder of the last run, for re-summarizing
+        self.qa_worker = None
+        self.qa_folder = None   # output folder questions are asked about
+        self._qa_indexes = {}   # output folder -> DocumentIndex, kept loaded between questions
+        self._answer_pages = []
+        self.search_index = None  # opened on the first search
+        # The page viewers read raw text back from disk; only summaries are kept in memory
+        self._raw_text_path = None
+        self._raw_text_spans = {}   # page -> (start, end) byte offsets in raw_text.txt
+        self._preview_path = None
+        self._preview_spans = {}    # page -> (start, end) in preview_text.txt, until the full text is in
+        self._page_summaries = {}   # page -> finished summary
+        self._streaming_page = None
+        self._streaming_tokens = []
         
         self._create_menu_bar()
         self._init_ui()
         self._setup_hardware_indicator()
         
-        self.check_dependencies()
         self.check_model_file()
+        # Let the window paint first; the checks load spaCy and report back when done
+        QTimer.singleShot(0, self.check_dependencies)
 
     def check_dependencies(self):
-        is_found, message = check_tesseract_dependency()
-        if not is_found:
-            QMessageBox.warning(self, "Dependency Missing", message)
-        is_found, message = check_spacy_model()
-        if not is_found:
-            QMessageBox.warning(self, "Dependency Missing", message)
+        worker = TaskWorker(run_dependency_checks)
+        worker.signals.result.connect(self.on_dependencies_checked)
+        self.threadpool.start(worker)
+
+    @pyqtSlot(object)
+    def on_dependencies_checked(self, results):
+        for is_found, message in results:
+            if not is_found:
+                QMessageBox.warning(self, "Dependency Missing", message)
+
+    @pyqtSlot(str)
+    def _update_routing_option(self, selected_model):
+        """Routing needs a second, smaller local model; the option is disabled (with the reason) without one."""
+        small = config.ROUTING_SMALL_MODEL_FILENAME
+        reason = None
+        if config.LLM_BACKEND == "openai":
+            reason = "Unavailable: the inference server has a single model."
+        elif small == selected_model:
+            reason = f"Unavailable: the selected model is the small model ({small}).\nSelect a larger model to route between the two."
+        elif config.LLM_BACKEND == "llama_cpp" and not os.path.exists(os.path.join(config.MODEL_DIR, small)):
+            reason = f"Unavailable: put the small model {small} in the models folder to enable routing."
+        self.routing_check.setEnabled(reason is None)
+        self.routing_check.setToolTip(f"Summarizes simple pages with the small model ({small})\n"
+                                      "and complex ones (long, entity-dense, tables, noisy OCR) with the selected model.\n"
+                                      "Both models stay loaded, so this needs RAM for both."
+                                      + (f"\n\n{reason}" if reason else ""))
 
     def check_model_file(self):
         self.model_combo.clear()
@@ -54,7 +103,9 @@ class MainWindow(QMainWindow):
             os.makedirs(config.MODEL_DIR)
             
         # Scan for GGUF files
-        models = [f for f in os.listdir(config.MODEL_DIR) if f.endswith(".gguf")]
+        # The embedding model for questions lives in the same folder but cannot summarize
+        models = [f for f in os.listdir(config.MODEL_DIR)
+                  if f.endswith(".gguf") and f != config.EMBEDDING_MODEL_FILENAME]
         
         if models:
             self.model_combo.addItems(models)
@@ -74,6 +125,8 @@ class MainWindow(QMainWindow):
             self.download_stack.setCurrentIndex(0)
             self.model_combo.hide()
             self.log_output.appendPlainText(f"⚠️ No models found. Please download the Llama 3.2 model.")
+        # A model downloaded since the last scan may be the routing small model
+        self._update_routing_option(self.model_combo.currentText())
 
     def _create_menu_bar(self):
         menu_bar = self.menuBar()
@@ -81,6 +134,15 @@ class MainWindow(QMainWindow):
         open_action = QAction("&Open Document...", self)
         open_action.triggered.connect(self.select_files)
         file_menu.addAction(open_action)
+        resume_action = QAction("&Resume Analysis...", self)
+        resume_action.triggered.connect(self.resume_analysis)
+        file_menu.addAction(resume_action)
+        resummarize_action = QAction("Re-&summarize From Folder...", self)
+        resummarize_action.triggered.connect(self.resummarize_from_folder)
+        file_menu.addAction(resummarize_action)
+        ask_action = QAction("Ask &Questions About Folder...", self)
+        ask_action.triggered.connect(self.ask_about_folder)
+        file_menu.addAction(ask_action)
         output_folder_action = QAction("Open &Output Folder", self)
         output_folder_action.triggered.connect(self.open_output_folder)
         file_menu.addAction(output_folder_action)
@@ -145,7 +207,12 @@ class MainWindow(QMainWindow):
         self.start_btn.setObjectName("startButton")
         self.start_btn.clicked.connect(self.start_analysis)
         self.stop_btn = QPushButton("Stop Analysis")
+        self.resummarize_btn = QPushButton("Re-summarize")
+        self.resummarize_btn.setToolTip("Summarizes the last run again with the current instructions and AI creativity,\n"
+                                        "reusing its extracted text. Separate several instruction variants with a line of ---.")
+        self.resummarize_btn.clicked.connect(self.resummarize)
         layout.addWidget(self.start_btn)
+        layout.addWidget(self.resummarize_btn)
         # layout.addWidget(self.pause_btn) # Removing Pause button
         layout.addWidget(self.stop_btn)
         self.start_btn.setEnabled(False)
@@ -185,10 +252,43 @@ class MainWindow(QMainWindow):
         self.tbl_check = QCheckBox("Table Extraction")
         self.nlp_check = QCheckBox("NLP Processing")
         self.nlp_check.setChecked(True)
+        self.compress_check = QCheckBox("Compress Dense Pages")
+        self.compress_check.setChecked(config.COMPRESSION_ENABLED)
+        self.compress_check.setToolTip("Sends only the most informative sentences of long pages to the AI.\n"
+                                       "Faster prompt processing, but details in the dropped sentences are not summarized.")
+        self.preview_check = QCheckBox("Quick Preview Pass")
+        self.preview_check.setChecked(config.PREVIEW_ENABLED)
+        self.preview_check.setToolTip("Shows the text layer of every page at once, before full OCR and summaries.\n"
+                                      "Scanned pages have none; pick one in the Raw Text or AI Summary view to have it processed next.")
+        self.routing_check = QCheckBox("Route Pages by Complexity")
+        self.routing_check.setChecked(config.ROUTING_ENABLED)
+        self.model_combo.currentTextChanged.connect(self._update_routing_option)
+        self.skim_check = QCheckBox("Skim Mode")
+        self.skim_check.setChecked(config.SKIM_ENABLED)
+        self.skim_check.setToolTip(f"Summarizes the first and last page and a stratified sample of about {config.SKIM_FRACTION:.0%}\n"
+                                   f"of the pages in between (at most {config.SKIM_MAX_PAGES} in all), then writes a short\n"
+                                   "overview of the document from them. For quick triage of large documents.")
+        self.pages_input = QLineEdit()
+        self.pages_input.setPlaceholderText("All pages (e.g. 1-20,45,100-)")
+        self.pages_input.setToolTip("Only these pages are processed. Leave empty for the whole document.")
+        pages_layout = QHBoxLayout()
+        pages_layout.addWidget(QLabel("Pages:"))
+        pages_layout.addWidget(self.pages_input)
+        self.adaptive_ocr_check = QCheckBox("Adaptive OCR DPI")
+        self.adaptive_ocr_check.setChecked(config.OCR_ADAPTIVE)
+        self.adaptive_ocr_check.setToolTip("Scans in grayscale at a low DPI first and re-scans only low-confidence\n"
+                                           "regions at higher DPI, up to the OCR DPI slider.")
+        self.ocr_check.toggled.connect(self.adaptive_ocr_check.setEnabled)
         options_layout.addWidget(self.ocr_check)
+        options_layout.addWidget(self.adaptive_ocr_check)
         options_layout.addWidget(self.img_check)
         options_layout.addWidget(self.tbl_check)
         options_layout.addWidget(self.nlp_check)
+        options_layout.addWidget(self.compress_check)
+        options_layout.addWidget(self.preview_check)
+        options_layout.addWidget(self.routing_check)
+        options_layout.addWidget(self.skim_check)
+        options_layout.addLayout(pages_layout)
         options_layout.addStretch()
         sliders_layout = QVBoxLayout()
         ocr_precision_label = QLabel("OCR DPI: 200")
@@ -201,6 +301,15 @@ class MainWindow(QMainWindow):
         self.ocr_slider.setToolTip("Controls OCR scan resolution. Higher = more accurate but slower.")
         self.ocr_slider.valueChanged.connect(lambda v: ocr_precision_label.setText(f"OCR DPI: {v}"))
         sliders_layout.addWidget(self.ocr_slider)
+        sliders_layout.addWidget(QLabel("OCR Profile:"))
+        self.ocr_profile_combo = QComboBox()
+        for name in config.OCR_PROFILES:
+            self.ocr_profile_combo.addItem(name.capitalize(), name)
+        self.ocr_profile_combo.setCurrentIndex(max(0, self.ocr_profile_combo.findData(config.OCR_DEFAULT_PROFILE)))
+        self.ocr_profile_combo.setToolTip("Fast uses the small LSTM models and treats pages as one block of text. "
+                                          "Accurate uses the best models, automatic layout and extra cleanup.")
+        self.ocr_check.toggled.connect(self.ocr_profile_combo.setEnabled)
+        sliders_layout.addWidget(self.ocr_profile_combo)
         sliders_layout.addSpacing(10)
         ai_creativity_label = QLabel("AI Creativity: 20%")
         sliders_layout.addWidget(ai_creativity_label)
@@ -211,6 +320,16 @@ class MainWindow(QMainWindow):
         self.ai_slider.setToolTip("Controls how creative/random the AI responses are. Lower = more factual, Higher = more creative.")
         self.ai_slider.valueChanged.connect(lambda v: ai_creativity_label.setText(f"AI Creativity: {v}%"))
         sliders_layout.addWidget(self.ai_slider)
+        sliders_layout.addSpacing(10)
+        sliders_layout.addWidget(QLabel("Speculative Decoding:"))
+        self.speculative_combo = QComboBox()
+        self.speculative_combo.addItem("Off", "off")
+        self.speculative_combo.addItem("Prompt Lookup", "prompt_lookup")
+        self.speculative_combo.addItem("Draft Model", "draft_model")
+        self.speculative_combo.setCurrentIndex(max(0, self.speculative_combo.findData(config.SPECULATIVE_MODE)))
+        self.speculative_combo.setToolTip("Drafts several tokens at once and verifies them in one pass. "
+                                          "Prompt Lookup copies spans from the page text and needs no extra model.")
+        sliders_layout.addWidget(self.speculative_combo)
         self.force_cpu_check = QCheckBox("Force CPU Mode (Bypass GPU)")
         self.force_cpu_check.setToolTip("Check this if you experience crashes on startup.")
         sliders_layout.addWidget(self.force_cpu_check)
@@ -245,6 +364,11 @@ class MainWindow(QMainWindow):
         self.time_eta_label = QLabel("00:00 / 00:00")
         info_layout.addWidget(self.time_eta_label)
         info_layout.addSpacing(10)
+        info_layout.addWidget(QLabel("Time by Stage:"))
+        self.stage_breakdown_label = QLabel("N/A")
+        self.stage_breakdown_label.setWordWrap(True)
+        info_layout.addWidget(self.stage_breakdown_label)
+        info_layout.addSpacing(10)
         model_label_title = QLabel("Model:")
         model_label_title.setObjectName("infoTitle")
         self.model_in_use_label = QLabel("N/A")
@@ -258,12 +382,15 @@ class MainWindow(QMainWindow):
 
     def _create_output_tabs(self):
         tabs = QTabWidget()
-        self.summary_output = QTextEdit()
-        self.summary_output.setReadOnly(True)
-        self.raw_text_output = QPlainTextEdit()
-        self.raw_text_output.setReadOnly(True)
+        self.summary_view = PagedTextView(self._load_summary_page, "Page summaries appear here as they are written.")
+        self.raw_text_view = PagedTextView(self._load_raw_page, "The text of each page appears here as it is extracted.")
+        self.summary_view.page_picked.connect(self.prioritize_page)
+        self.raw_text_view.page_picked.connect(self.prioritize_page)
         self.log_output = QPlainTextEdit()
         self.log_output.setReadOnly(True)
+        self.overview_output = QTextEdit()
+        self.overview_output.setReadOnly(True)
+        self.overview_output.setPlaceholderText("Run with Skim Mode for a quick overview of the whole document.")
         # --- Extracted Images Tab with Open Folder Button ---
         images_container = QWidget()
         images_container_layout = QVBoxLayout(images_container)
@@ -277,12 +404,60 @@ class MainWindow(QMainWindow):
         self.image_layout = QVBoxLayout(self.image_display_widget)
         image_scroll_area.setWidget(self.image_display_widget)
         images_container_layout.addWidget(image_scroll_area)
-        tabs.addTab(self.summary_output, "AI Summary")
-        tabs.addTab(self.raw_text_output, "Raw Text")
+        # --- Ask Tab: questions answered from the analyzed document ---
+        ask_container = QWidget()
+        ask_layout = QVBoxLayout(ask_container)
+        ask_layout.setContentsMargins(0, 0, 0, 0)
+        self.qa_scope_label = QLabel("Analyze a document, or use File → Ask Questions About Folder...")
+        self.qa_scope_label.setWordWrap(True)
+        ask_layout.addWidget(self.qa_scope_label)
+        question_layout = QHBoxLayout()
+        self.question_input = QLineEdit()
+        self.question_input.setPlaceholderText("Ask a question about the document...")
+        self.question_input.returnPressed.connect(self.ask_question)
+        self.ask_btn = QPushButton("Ask")
+        self.ask_btn.clicked.connect(self.ask_question)
+        question_layout.addWidget(self.question_input)
+        question_layout.addWidget(self.ask_btn)
+        ask_layout.addLayout(question_layout)
+        self.answer_output = QTextEdit()
+        self.answer_output.setReadOnly(True)
+        ask_layout.addWidget(self.answer_output)
+        tabs.addTab(self.summary_view, "AI Summary")
+        tabs.addTab(self.overview_output, "Overview")
+        tabs.addTab(self.raw_text_view, "Raw Text")
         tabs.addTab(images_container, "Extracted Images")
+        tabs.addTab(ask_container, "Ask")
+        tabs.addTab(self._create_search_tab(), "Search")
         tabs.addTab(self.log_output, "System Log")
+        self.output_tabs = tabs
+        self.ask_tab = ask_container
         return tabs
         
+    def _create_search_tab(self):
+        """Full-text search over the pages of every past analysis."""
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        query_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search all analyzed documents (word* for prefixes)...")
+        self.search_input.returnPressed.connect(self.run_search)
+        search_btn = QPushButton("Search")
+        search_btn.clicked.connect(self.run_search)
+        self.index_past_btn = QPushButton("Index Past Runs")
+        self.index_past_btn.setToolTip("Adds analyses made before the search index existed.")
+        self.index_past_btn.clicked.connect(self.index_past_runs)
+        query_layout.addWidget(self.search_input)
+        query_layout.addWidget(search_btn)
+        query_layout.addWidget(self.index_past_btn)
+        layout.addLayout(query_layout)
+        self.search_results = QTextBrowser()
+        self.search_results.setOpenLinks(False)
+        self.search_results.anchorClicked.connect(lambda url: self._open_path(url.toLocalFile()))
+        layout.addWidget(self.search_results)
+        return container
+
     def _setup_hardware_indicator(self):
         hw_widget = QWidget()
         layout = QHBoxLayout(hw_widget)
@@ -294,7 +469,19 @@ class MainWindow(QMainWindow):
         self.device_indicator_light = QLabel()
         self.device_indicator_light.setFixedSize(12, 12)
         
-        device_type, device_name = detect_hardware()
+        layout.addWidget(self.device_logo_label)
+        layout.addWidget(self.device_text_label)
+        layout.addWidget(self.device_indicator_light)
+        self.top_bar_layout.addWidget(hw_widget)
+
+        # Profiling shells out to nvidia-smi and reads CPU details; keep it off the GUI thread
+        worker = TaskWorker(detect_hardware)
+        worker.signals.result.connect(self.on_hardware_detected)
+        self.threadpool.start(worker)
+
+    @pyqtSlot(object)
+    def on_hardware_detected(self, device):
+        device_type, device_name = device
         
         # Select brand logo based on device
         if device_type == 'cuda':
@@ -334,17 +521,13 @@ class MainWindow(QMainWindow):
         # Scale to height 24, allow width to expand (maintain aspect ratio)
         self.device_logo_label.setPixmap(pixmap.scaledToHeight(24, Qt.TransformationMode.SmoothTransformation))
         
-        layout.addWidget(self.device_logo_label)
-        layout.addWidget(self.device_text_label)
-        layout.addWidget(self.device_indicator_light)
-        
         self.device_text_label.setText(text)
         self.device_indicator_light.setStyleSheet(f"QLabel {{ background-color: {color}; border: 1px solid {color}; border-radius: 6px; }}")
-        self.top_bar_layout.addWidget(hw_widget)
     
     @pyqtSlot()
     def select_files(self):
-        file_types = "All Supported Files (*.pdf *.jpg *.png *.txt);;All Files (*)"
+        patterns = " ".join(f"*{ext}" for ext in ('.pdf',) + IMAGE_EXTENSIONS + TEXT_EXTENSIONS)
+        file_types = f"All Supported Files ({patterns});;All Files (*)"
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Document", "", file_types)
         if file_path:
             self.handle_files([file_path])
@@ -356,113 +539,307 @@ class MainWindow(QMainWindow):
         self.file_list_widget.addItem(os.path.basename(self.selected_file))
         filename = os.path.basename(self.selected_file)
         ext = os.path.splitext(filename)[1].lower()
-        doc_type_map = {'.pdf': "PDF", '.txt': "Text", '.jpg': "Image", '.png': "Image"}
-        doc_type = doc_type_map.get(ext, "File")
+        if ext == '.pdf':
+            doc_type = "PDF"
+        elif ext in TEXT_EXTENSIONS:
+            doc_type = "Text"
+        elif ext in IMAGE_EXTENSIONS:
+            doc_type = "Image"
+        else:
+            doc_type = "File"
         self.current_file_label.setText(filename)
         self.doc_type_label.setText(f"{doc_type} Document")
         self.log_output.setPlainText(f"Selected file: {filename}")
         self.start_btn.setEnabled(True)
 
     @pyqtSlot()
-    def start_analysis(self):
-        active_model = self.model_combo.currentText()
-        if not self.selected_file:
-            QMessageBox.warning(self, "No File Selected", "Please select a document to analyze.")
+    def resume_analysis(self):
+        """Continues an interrupted run from its output folder."""
+        if self.analysis_worker:
+            QMessageBox.information(self, "Analysis Running", "Stop the current analysis before resuming another one.")
+            return
+        folder = QFileDialog.getExistingDirectory(self, "Select Output Folder to Resume", config.OUTPUT_DIR)
+        if not folder:
+            return
+        try:
+            manifest = read_manifest(folder)
+        except RuntimeError as e:
+            QMessageBox.warning(self, "Cannot Resume", str(e))
+            return
+        if manifest.get('complete'):
+            QMessageBox.information(self, "Nothing to Resume", "This analysis already finished.")
             return
+        source = manifest['source']
+        source_path = source['path']
+        if not os.path.exists(source_path):
+            # The document was moved; the pipeline checks the hash of whatever file is picked
+            source_path, _ = QFileDialog.getOpenFileName(self, f"Locate {source['name']}", "", "All Files (*)")
+            if not source_path:
+                return
+        self.handle_files([source_path])
+        self.start_analysis(resume_dir=folder)
+
+    def _ensure_model_loaded(self, on_ready):
+        """
+        Loads (or reloads) the selected model, then calls on_ready with its name. Loading (and the
+        first-time autotune benchmark of a model) runs in the background so the window stays responsive.
+        """
+        if self._model_loading:
+            return
+        active_model = self.model_combo.currentText()
+        if config.LLM_BACKEND != "llama_cpp":
+            # Server and mock backends do not need a local GGUF file
+            active_model = active_model or config.LLM_BACKEND
         if not active_model:
             QMessageBox.warning(self, "No Model", "No AI model selected. Please download a model first.")
             return
         
         # Reload model if it changed or hasn't been loaded yet
-        if not self.llm_handler.process or self.llm_handler.model_name != active_model:
-            try:
-                if self.llm_handler.process:
-                    self.llm_handler.shutdown()
-                self.llm_handler.model_name = active_model
-                force_cpu = self.force_cpu_check.isChecked()
-                self.llm_handler.load_model(force_cpu=force_cpu)
-            except RuntimeError as e:
-                reply = QMessageBox.question(
-                    self, 
-                    "Model Missing", 
-                    f"{str(e)}\n\nWould you like to download the model now?",
-                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-                )
-                if reply == QMessageBox.StandardButton.Yes:
-                    self.start_model_download()
-                return
-            
+        speculative_mode = self.speculative_combo.currentData()
+        routing = self.routing_check.isChecked() and self.routing_check.isEnabled()
+        if (self.llm_handler.process and self.llm_handler.model_name == active_model
+                and self.llm_handler.speculative_mode == speculative_mode and self.llm_handler.routing == routing):
+            on_ready(self._loaded_model_label())
+            return
+
+        self._model_loading = True
+        self.start_btn.setEnabled(False)
+        self.resummarize_btn.setEnabled(False)
+        self.ask_btn.setEnabled(False)
+        self.model_in_use_label.setText(f"Loading {active_model}...")
+        self.log_output.appendPlainText(f"⏳ Loading {active_model}...")
+        worker = TaskWorker(self._load_model, active_model, self.force_cpu_check.isChecked(), speculative_mode, routing)
+        self._on_model_ready = on_ready
+        worker.signals.result.connect(self.on_model_loaded)
+        worker.signals.error.connect(self.on_model_load_error)
+        self.threadpool.start(worker)
+
+    def _load_model(self, model_name, force_cpu, speculative_mode, routing):
+        """Runs on a pool thread; nothing else uses the handler while the controls are disabled."""
+        if self.llm_handler.process:
+            self.llm_handler.shutdown()
+        self.llm_handler.model_name = model_name
+        self.llm_handler.load_model(force_cpu=force_cpu, speculative_mode=speculative_mode, routing=routing)
+
+    def _loaded_model_label(self):
+        if self.llm_handler.small_model_name:
+            return f"{self.llm_handler.model_name} + {self.llm_handler.small_model_name}"
+        return self.llm_handler.model_name
+
+    def _end_model_loading(self):
+        self._model_loading = False
+        self._on_model_ready = None
+        self.model_in_use_label.setText("N/A")
+        self.start_btn.setEnabled(bool(self.selected_file))
+        self.resummarize_btn.setEnabled(True)
+        self.ask_btn.setEnabled(True)
+
+    @pyqtSlot(object)
+    def on_model_loaded(self, _):
+        on_ready, self._on_model_ready = self._on_model_ready, None
+        self._end_model_loading()
+        self.log_output.appendPlainText(f"✅ Model ready: {self._loaded_model_label()}")
+        on_ready(self._loaded_model_label())
+
+    @pyqtSlot(str)
+    def on_model_load_error(self, error_message):
+        self._end_model_loading()
+        reply = QMessageBox.question(
+            self, 
+            "Model Missing", 
+            f"{error_message}\n\nWould you like to download the model now?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.start_model_download()
+
+    def _start_worker(self, worker, active_model):
+        """Clears the output views, connects the worker's signals and starts it."""
         self.start_btn.setEnabled(False)
+        self.resummarize_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.model_in_use_label.setText(active_model)
-        temperature = self.ai_slider.value() / 100.0
-        ocr_dpi = self.ocr_slider.value()
-        proc_options = { 'ocr': self.ocr_check.isChecked(), 'images': self.img_check.isChecked(), 'tables': self.tbl_check.isChecked(), 'nlp': self.nlp_check.isChecked(), 'temperature': temperature, 'ocr_dpi': ocr_dpi }
-        user_instr = self.instr_text.toPlainText()
-        
-        self.raw_text_output.clear()
-        self.summary_output.clear()
+        self.raw_text_view.clear()
+        self.summary_view.clear()
+        self._raw_text_path = None
+        self._raw_text_spans = {}
+        self._preview_path = None
+        self._preview_spans = {}
+        self._page_summaries = {}
+        self._streaming_page = None
+        self._streaming_tokens = []
         self.log_output.clear()
+        self.overview_output.clear()
+        self.stage_breakdown_label.setText("N/A")
 
-        signals = AnalysisSignals()
-        self.analysis_worker = AnalysisPipeline(self.selected_file, user_instr, proc_options, self.llm_handler, signals)
+        self.analysis_worker = worker
         self.analysis_worker.signals.log.connect(self.log_output.appendPlainText)
         self.analysis_worker.signals.progress.connect(self.progress_dial.setValue)
-        self.analysis_worker.signals.page_processed.connect(self.append_raw_text)
+        self.analysis_worker.signals.raw_text_saved.connect(self.on_raw_text_saved)
+        self.analysis_worker.signals.preview_saved.connect(self.on_preview_saved)
         self.analysis_worker.signals.summary_header.connect(self.on_summary_header)
         self.analysis_worker.signals.token_received.connect(self.on_token_received)
         self.analysis_worker.signals.page_summary_ready.connect(self.on_page_summary_done)
         self.analysis_worker.signals.detailed_progress.connect(self.update_progress_info)
+        self.analysis_worker.signals.stage_metrics.connect(self.update_stage_breakdown)
         self.analysis_worker.signals.status_changed.connect(self.progress_dial.setState)
+        self.analysis_worker.signals.overview_ready.connect(self.on_overview_ready)
         self.analysis_worker.signals.finished.connect(self.on_analysis_finished)
         self.analysis_worker.signals.error.connect(self.on_analysis_error)
         self.threadpool.start(self.analysis_worker)
 
+    @pyqtSlot()
+    def start_analysis(self, resume_dir=None):
+        if self.qa_worker:
+            return
+        if not self.selected_file:
+            QMessageBox.warning(self, "No File Selected", "Please select a document to analyze.")
+            return
+        self._ensure_model_loaded(lambda active_model: self._run_analysis(active_model, resume_dir))
+
+    def _run_analysis(self, active_model, resume_dir):
+        temperature = self.ai_slider.value() / 100.0
+        ocr_dpi = self.ocr_slider.value()
+        proc_options = { 'ocr': self.ocr_check.isChecked(), 'images': self.img_check.isChecked(), 'tables': self.tbl_check.isChecked(), 'nlp': self.nlp_check.isChecked(), 'temperature': temperature, 'ocr_dpi': ocr_dpi, 'ocr_adaptive': self.adaptive_ocr_check.isChecked(), 'ocr_profile': self.ocr_profile_combo.currentData(), 'compress': self.compress_check.isChecked(), 'preview': self.preview_check.isChecked(), 'skim': self.skim_check.isChecked(), 'pages': self.pages_input.text().strip() }
+        user_instr = self.instr_text.toPlainText()
+
+        signals = AnalysisSignals()
+        worker = AnalysisPipeline(self.selected_file, user_instr, proc_options, self.llm_handler, signals,
+                                  resume_dir=resume_dir)
+        self._start_worker(worker, active_model)
+
+    @pyqtSlot()
+    def resummarize(self):
+        """Summarizes the last run (or a chosen run folder) again with the current instructions and creativity."""
+        if self.analysis_worker:
+            return
+        output_path = self.last_output_path
+        if not output_path or not os.path.exists(output_path):
+            output_path = QFileDialog.getExistingDirectory(self, "Select Output Folder to Re-summarize", config.OUTPUT_DIR)
+            if not output_path:
+                return
+        self._resummarize_folder(output_path)
+
+    @pyqtSlot()
+    def resummarize_from_folder(self):
+        if self.analysis_worker:
+            QMessageBox.information(self, "Analysis Running", "Stop the current analysis first.")
+            return
+        output_path = QFileDialog.getExistingDirectory(self, "Select Output Folder to Re-summarize", config.OUTPUT_DIR)
+        if output_path:
+            self._resummarize_folder(output_path)
+
+    def _resummarize_folder(self, output_path):
+        if self.qa_worker:
+            return
+        try:
+            read_manifest(output_path)
+        except RuntimeError as e:
+            QMessageBox.warning(self, "Cannot Re-summarize", str(e))
+            return
+        self._ensure_model_loaded(lambda active_model: self._run_resummarize(active_model, output_path))
+
+    def _run_resummarize(self, active_model, output_path):
+        # Lines containing only "---" separate instruction variants, which are run one after another
+        variants = [v.strip() for v in re.split(r'^\s*---\s*$', self.instr_text.toPlainText(), flags=re.MULTILINE)]
+        variants = [v for v in variants if v] or [""]
+        proc_options = {'temperature': self.ai_slider.value() / 100.0, 'compress': self.compress_check.isChecked()}
+
+        signals = AnalysisSignals()
+        worker = ResummarizePipeline(output_path, variants, proc_options, self.llm_handler, signals)
+        self._start_worker(worker, active_model)
+
     @pyqtSlot(str)
     def on_analysis_finished(self, final_report):
-        self.summary_output.append("\n---\n✅ **Analysis Complete!**")
+        self.log_output.appendPlainText("✅ Analysis Complete!")
         self.progress_dial.setState('ready')
         self.reset_controls()
         
+    @pyqtSlot(str)
+    def on_overview_ready(self, overview):
+        self.overview_output.setMarkdown(overview)
+        self.output_tabs.setCurrentWidget(self.overview_output)
+
     @pyqtSlot(str)
     def on_analysis_error(self, error_message):
         QMessageBox.critical(self, "Analysis Error", error_message)
         self.progress_dial.setState('stopped')
         self.reset_controls()
 
-    @pyqtSlot(int, int, str)
-    def append_raw_text(self, page_num, total_pages, text):
-        header = f"--- Page {page_num} of {total_pages} ---\n\n"
-        self.raw_text_output.appendPlainText(header + text + "\n\n")
+    def _load_raw_page(self, page_num):
+        """Reads one page back from the run's raw_text.txt (or its quick preview), for the Raw Text view."""
+        if page_num in self._raw_text_spans:
+            path, span, note = self._raw_text_path, self._raw_text_spans[page_num], ""
+        elif page_num in self._preview_spans:
+            path, span = self._preview_path, self._preview_spans[page_num]
+            note = "(Quick preview; the full text follows when the page is processed.)\n\n"
+        else:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return note + read_page_text(f, *span)
+        except OSError as e:
+            return f"(Could not read the text of this page: {e})"
+
+    def _load_summary_page(self, page_num):
+        if page_num == self._streaming_page:
+            return "".join(self._streaming_tokens)
+        return self._page_summaries.get(page_num)
+
+    @pyqtSlot(str, int, int, int)
+    def on_raw_text_saved(self, raw_text_path, page_num, start, end):
+        self._raw_text_path = raw_text_path
+        self._raw_text_spans[page_num] = (start, end)
+        self._preview_spans.pop(page_num, None)
+        self.raw_text_view.page_ready(page_num)
+
+    @pyqtSlot(str, int, int, int)
+    def on_preview_saved(self, preview_path, page_num, start, end):
+        self._preview_path = preview_path
+        self._preview_spans[page_num] = (start, end)
+        self.raw_text_view.page_ready(page_num, partial=True)
+
+    @pyqtSlot(int)
+    def prioritize_page(self, page_num):
+        """A page picked in a viewer during a run is processed next, unless it is already done."""
+        if (self.analysis_worker and self.stop_btn.isEnabled() and page_num not in self._page_summaries
+                and self.analysis_worker.prioritize_page(page_num)):
+            self.log_output.appendPlainText(f"⏫ Page {page_num} moved to the front of the queue.")
 
     @pyqtSlot(int, int)
     def on_summary_header(self, page_num, total_pages):
-        """Inserts the header before streaming starts."""
-        header = f"<h3>Summary for Page {page_num} of {total_pages}</h3>\n"
-        self.summary_output.append(header)
-        # Move cursor to the very end for token appending
-        cursor = self.summary_output.textCursor()
-        cursor.movePosition(cursor.MoveOperation.End)
-        self.summary_output.setTextCursor(cursor)
+        """A page starts streaming; the summary view follows it unless the user picked a page."""
+        self._streaming_page = page_num
+        self._streaming_tokens = []
+        self.summary_view.set_total(total_pages)
+        if self.summary_view.follow_check.isChecked():
+            self.summary_view.show_page(page_num)
 
     @pyqtSlot(str)
     def on_token_received(self, token):
-        """Appends a single token at the current cursor position."""
-        cursor = self.summary_output.textCursor()
-        cursor.movePosition(cursor.MoveOperation.End)
-        cursor.insertText(token)
-        self.summary_output.setTextCursor(cursor)
-        self.summary_output.ensureCursorVisible()
+        """Appends a single token to the streaming page, on screen if it is shown."""
+        self._streaming_tokens.append(token)
+        self.summary_view.append_to_page(self._streaming_page, token)
 
     @pyqtSlot(int, int, str)
     def on_page_summary_done(self, page_num, total_pages, summary_text):
-        """Called when a full page summary is complete. Adds a separator."""
-        self.summary_output.append("\n---\n")
+        """Called when a full page summary is complete."""
+        self._page_summaries[page_num] = summary_text
+        if page_num == self._streaming_page:
+            self._streaming_page = None
+            self._streaming_tokens = []
+        self.summary_view.page_ready(page_num)
         
     @pyqtSlot(int, int, str, str)
     def update_progress_info(self, pages_done, total_pages, elapsed_str, eta_str):
         self.pages_processed_label.setText(f"{pages_done} / {total_pages}")
+        self.raw_text_view.set_total(total_pages)
+        self.summary_view.set_total(total_pages)
         self.time_eta_label.setText(f"{elapsed_str} / {eta_str}")
+
+    @pyqtSlot(object)
+    def update_stage_breakdown(self, totals):
+        self.stage_breakdown_label.setText(format_stage_totals(totals))
         
     @pyqtSlot()
     def stop_analysis(self):
@@ -472,11 +849,145 @@ class MainWindow(QMainWindow):
             self.stop_btn.setEnabled(False)
 
     def reset_controls(self):
+        if self.analysis_worker and self.analysis_worker.output_path:
+            self.last_output_path = self.analysis_worker.output_path
+            self._set_qa_folder(self.last_output_path)
         self.start_btn.setEnabled(True)
+        self.resummarize_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.model_in_use_label.setText("N/A")
         self.analysis_worker = None
 
+    # --- Questions ---
+
+    def _set_qa_folder(self, folder):
+        self.qa_folder = folder
+        self.qa_scope_label.setText(f"Questions are answered from: {os.path.basename(folder)}")
+
+    @pyqtSlot()
+    def ask_about_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Output Folder to Ask About", config.OUTPUT_DIR)
+        if not folder:
+            return
+        try:
+            read_manifest(folder)
+        except RuntimeError as e:
+            QMessageBox.warning(self, "Cannot Ask Questions", str(e))
+            return
+        self._set_qa_folder(folder)
+        self.output_tabs.setCurrentWidget(self.ask_tab)
+        self.question_input.setFocus()
+
+    @pyqtSlot()
+    def ask_question(self):
+        """Answers the typed question from the selected run's text with one grounded AI call."""
+        question = self.question_input.text().strip()
+        if not question or self.qa_worker:
+            return
+        if self.analysis_worker:
+            QMessageBox.information(self, "Analysis Running", "Wait for the analysis to finish before asking questions.")
+            return
+        if not self.qa_folder:
+            self.ask_about_folder()
+            if not self.qa_folder:
+                return
+        self._ensure_model_loaded(lambda active_model: self._run_question(question))
+
+    def _run_question(self, question):
+        self.answer_output.append(f"<p><b>Q: {html.escape(question)}</b></p>")
+        self.answer_output.append("")
+        self.question_input.clear()
+        self._answer_pages = []
+        self.ask_btn.setEnabled(False)
+        self.start_btn.setEnabled(False)
+        self.resummarize_btn.setEnabled(False)
+        index = self._qa_indexes.setdefault(self.qa_folder, DocumentIndex(self.qa_folder))
+        signals = QuestionSignals()
+        self.qa_worker = QuestionWorker(index, question, self.llm_handler, self.embedding_handler, signals,
+                                        force_cpu=self.force_cpu_check.isChecked())
+        signals.log.connect(self.log_output.appendPlainText)
+        signals.sources.connect(self.on_answer_sources)
+        signals.token_received.connect(self.on_answer_token)
+        signals.finished.connect(self.on_answer_finished)
+        signals.error.connect(self.on_answer_error)
+        self.threadpool.start(self.qa_worker)
+
+    @pyqtSlot(object)
+    def on_answer_sources(self, sources):
+        self._answer_pages = sorted({page for page, _ in sources})
+
+    @pyqtSlot(str)
+    def on_answer_token(self, token):
+        cursor = self.answer_output.textCursor()
+        cursor.movePosition(cursor.MoveOperation.End)
+        cursor.insertText(token)
+        self.answer_output.setTextCursor(cursor)
+        self.answer_output.ensureCursorVisible()
+
+    @pyqtSlot(str)
+    def on_answer_finished(self, answer):
+        pages = ", ".join(str(page) for page in self._answer_pages)
+        self.answer_output.append(f"<p><i>Excerpts from pages: {pages}</i></p><hr>")
+        self._reset_qa_controls()
+
+    @pyqtSlot(str)
+    def on_answer_error(self, error_message):
+        QMessageBox.critical(self, "Question Error", error_message)
+        self._reset_qa_controls()
+
+    def _reset_qa_controls(self):
+        self.qa_worker = None
+        self.ask_btn.setEnabled(True)
+        self.start_btn.setEnabled(bool(self.selected_file))
+        self.resummarize_btn.setEnabled(True)
+
+    # --- Search ---
+
+    @pyqtSlot()
+    def run_search(self):
+        query = self.search_input.text().strip()
+        if not query:
+            return
+        try:
+            if self.search_index is None:
+                self.search_index = SearchIndex()
+            hits = self.search_index.search(query)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Search Error", f"Could not search the index: {e}")
+            return
+        if not hits:
+            self.search_results.setHtml(f"<p>No pages match <b>{html.escape(query)}</b>.</p>")
+            return
+        parts = [f"<p>{len(hits)} matching page(s), best first. Click a document to open its output folder.</p>"]
+        for hit in hits:
+            snippet = html.escape(hit['snippet'].replace("\n", " "))
+            snippet = snippet.replace(MATCH_START, "<b>").replace(MATCH_END, "</b>")
+            link = QUrl.fromLocalFile(hit['output_path']).toString()
+            parts.append(f"<p><a href=\"{link}\">{html.escape(hit['document'])}</a> — page {hit['page']}"
+                         f"<br>{snippet}</p>")
+        self.search_results.setHtml("".join(parts))
+
+    @pyqtSlot()
+    def index_past_runs(self):
+        self.index_past_btn.setEnabled(False)
+        worker = TaskWorker(index_past_runs)
+        worker.signals.result.connect(self.on_past_runs_indexed)
+        worker.signals.error.connect(self.on_past_runs_error)
+        self.threadpool.start(worker)
+
+    @pyqtSlot(object)
+    def on_past_runs_indexed(self, result):
+        runs, pages = result
+        self.index_past_btn.setEnabled(True)
+        self.log_output.appendPlainText(f"🔎 Search index: added {pages} pages from {runs} earlier run(s).")
+        if self.search_input.text().strip():
+            self.run_search()
+
+    @pyqtSlot(str)
+    def on_past_runs_error(self, error_message):
+        self.index_past_btn.setEnabled(True)
+        QMessageBox.warning(self, "Search Index", f"Could not index earlier runs: {error_message}")
+
     @pyqtSlot()
     def open_model_manager(self):
         current_model = self.model_combo.currentText()
@@ -534,16 +1045,25 @@ class MainWindow(QMainWindow):
     def open_output_folder(self):
         if not os.path.exists(config.OUTPUT_DIR):
             os.makedirs(config.OUTPUT_DIR)
+        self._open_path(config.OUTPUT_DIR)
+
+    def _open_path(self, path):
+        """Opens a folder in the system file manager."""
         if sys.platform == "win32":
-            os.startfile(os.path.realpath(config.OUTPUT_DIR))
+            os.startfile(os.path.realpath(path))
         elif sys.platform == "darwin":
-            subprocess.run(["open", os.path.realpath(config.OUTPUT_DIR)])
+            subprocess.run(["open", os.path.realpath(path)])
         else:
-            subprocess.run(["xdg-open", os.path.realpath(config.OUTPUT_DIR)])
+            subprocess.run(["xdg-open", os.path.realpath(path)])
             
     def closeEvent(self, event):
         """Ensures running analysis and model are terminated when the app closes."""
         if self.analysis_worker:
             self.analysis_worker.stop()
+        if self.qa_worker:
+            self.qa_worker.stop()
         self.llm_handler.shutdown()
+        self.embedding_handler.shutdown()
+        if self.search_index:
+            self.search_index.close()
         event.accept()
\ No newline at end of file
@@ -0,0 +1,183 @@
+# src/gui/page_viewer.py
+
+from collections import OrderedDict
+from PyQt6.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QLabel, QListView, QPlainTextEdit,
+                             QSpinBox, QCheckBox)
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, pyqtSignal, pyqtSlot
+
+# Pages kept loaded besides the one on screen, so flipping back and forth does not re-read them
+_CACHE_PAGES = 8
+
+
+class PageListModel(QAbstractListModel):
+    """Rows of the page navigator. They are generated when painted, so a 10,000-page document costs nothing."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._count = 0
+        self._ready = set()
+        self._partial = set()  # pages with only preliminary text so far
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        page = index.row() + 1
+        mark = '✓' if page in self._ready else '◐' if page in self._partial else '·'
+        return f"{mark} Page {page}"
+
+    def reset(self, count=0):
+        self.beginResetModel()
+        self._count = count
+        self._ready = set()
+        self._partial = set()
+        self.endResetModel()
+
+    def set_count(self, count):
+        if count > self._count:
+            self.beginInsertRows(QModelIndex(), self._count, count - 1)
+            self._count = count
+            self.endInsertRows()
+
+    def mark_ready(self, page, partial=False):
+        self.set_count(page)
+        marks = self._partial if partial else self._ready
+        if page not in marks:
+            marks.add(page)
+            if not partial:
+                self._partial.discard(page)
+            index = self.index(page - 1)
+            self.dataChanged.emit(index, index)
+
+    def is_ready(self, page):
+        return page in self._ready or page in self._partial
+
+
+class PagedTextView(QWidget):
+    """
+    Shows one page of a long document at a time, next to a page list and a jump box.
+    Text is fetched through `loader(page)` only when a page is shown (a few recent pages are
+    cached), so the widgets hold a single page however long the document is. In follow mode
+    the view moves to each new page as it arrives; picking a page turns following off and
+    emits page_picked.
+    """
+    page_picked = pyqtSignal(int)
+
+    def __init__(self, loader, empty_text="", parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.empty_text = empty_text
+        self.current_page = None
+        self._cache = OrderedDict()
+        self._navigating = False
+
+        self.model = PageListModel(self)
+        self.page_list = QListView()
+        self.page_list.setModel(self.model)
+        self.page_list.setUniformItemSizes(True)  # lets the view skip measuring every row
+        self.page_list.setMaximumWidth(120)
+        self.page_list.selectionModel().currentChanged.connect(self._on_current_changed)
+        self.jump_box = QSpinBox()
+        self.jump_box.setPrefix("Go to ")
+        self.jump_box.setRange(1, 1)
+        self.jump_box.setMaximumWidth(120)
+        self.jump_box.editingFinished.connect(self._on_jump)
+        self.follow_check = QCheckBox("Follow")
+        self.follow_check.setToolTip("Show each new page as it is processed.")
+        self.follow_check.setChecked(True)
+
+        self.title_label = QLabel()
+        self.text_view = QPlainTextEdit()
+        self.text_view.setReadOnly(True)
+
+        navigator = QVBoxLayout()
+        navigator.addWidget(self.jump_box)
+        navigator.addWidget(self.page_list)
+        navigator.addWidget(self.follow_check)
+        page_layout = QVBoxLayout()
+        page_layout.addWidget(self.title_label)
+        page_layout.addWidget(self.text_view)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(navigator)
+        layout.addLayout(page_layout, stretch=1)
+        self.clear()
+
+    def clear(self):
+        self.model.reset()
+        self._cache.clear()
+        self.current_page = None
+        self.follow_check.setChecked(True)
+        self.jump_box.setRange(1, 1)
+        self.title_label.setText("")
+        self.text_view.setPlainText(self.empty_text)
+
+    def set_total(self, total):
+        self.model.set_count(total)
+        self.jump_box.setRange(1, max(1, self.model.rowCount()))
+
+    def page_ready(self, page, partial=False):
+        """
+        A page's text is complete (and on disk). Shows it in follow mode, or refreshes it if on screen.
+        Preliminary (`partial`) text is only shown if the page is on screen or nothing is yet.
+        """
+        self.set_total(page)
+        self.model.mark_ready(page, partial)
+        self._cache.pop(page, None)
+        if page == self.current_page or self.current_page is None or (self.follow_check.isChecked() and not partial):
+            self.show_page(page)
+
+    def append_to_page(self, page, text):
+        """Streams text onto a page that is still being written, if it is the one on screen."""
+        self._cache.pop(page, None)
+        if page == self.current_page:
+            cursor = self.text_view.textCursor()
+            cursor.movePosition(cursor.MoveOperation.End)
+            cursor.insertText(text)
+            if self.follow_check.isChecked():
+                self.text_view.ensureCursorVisible()
+
+    def show_page(self, page, picked=False):
+        """Shows a page; `picked` means the user chose it, which stops following new pages."""
+        if not 1 <= page <= self.model.rowCount():
+            return
+        if picked:
+            self.follow_check.setChecked(False)
+            self.page_picked.emit(page)
+        self.current_page = page
+        self.title_label.setText(f"<b>Page {page} of {self.model.rowCount()}</b>")
+        self.text_view.setPlainText(self._load(page))
+        self._navigating = True
+        self.page_list.setCurrentIndex(self.model.index(page - 1))
+        self.page_list.scrollTo(self.model.index(page - 1))
+        self._navigating = False
+        self.jump_box.blockSignals(True)
+        self.jump_box.setValue(page)
+        self.jump_box.blockSignals(False)
+
+    def _load(self, page):
+        if page in self._cache:
+            self._cache.move_to_end(page)
+            return self._cache[page]
+        text = self.loader(page)
+        if text is None:
+            return "(Not processed yet.)"
+        # Only finished pages are cached; a page being streamed changes with every token
+        if self.model.is_ready(page):
+            self._cache[page] = text
+            if len(self._cache) > _CACHE_PAGES:
+                self._cache.popitem(last=False)
+        return text
+
+    @pyqtSlot()
+    def _on_jump(self):
+        # Also fires when the box just loses focus, which should not stop following
+        if self.jump_box.value() != self.current_page:
+            self.show_page(self.jump_box.value(), picked=True)
+
+    @pyqtSlot(QModelIndex, QModelIndex)
+    def _on_current_changed(self, current, previous):
+        if not self._navigating and current.isValid():
+            self.show_page(current.row() + 1, picked=True)
@@ -0,0 +1,179 @@
+# src/processing/autotune.py
+
+import os
+import json
+import time
+import multiprocessing
+
+import config
+from src.utils.hardware_profile import load_hardware_profile
+
+CACHE_FILENAME = "autotune.json"
+
+_BENCH_TEXT = (
+    "The supplier shall deliver the goods described in Schedule A no later than thirty days "
+    "after the purchase order date. Invoices are payable within forty-five days of receipt. "
+)
+
+
+def _bench_tokens(llm, count):
+    tokens = llm.tokenize(_BENCH_TEXT.encode('utf-8'), add_bos=False)
+    while len(tokens) < count:
+        tokens += tokens
+    return tokens[:count]
+
+
+def _prompt_eval_rate(llm, tokens):
+    llm.reset()
+    start = time.perf_counter()
+    llm.eval(tokens)
+    return len(tokens) / (time.perf_counter() - start)
+
+
+def _decode_rate(llm, tokens, steps):
+    # Continue after a short prompt one token at a time, like generation does
+    llm.reset()
+    llm.eval(tokens[:32])
+    start = time.perf_counter()
+    for token in tokens[32:32 + steps]:
+        llm.eval([token])
+    return steps / (time.perf_counter() - start)
+
+
+def _benchmark(model_path, thread_candidates, batch_candidates, budget_seconds):
+    """
+    Runs in a child process: sweeps thread counts on a small context, then n_batch.
+    Returns the fastest settings and the raw measurements (tokens/sec).
+    """
+    import llama_cpp
+    from llama_cpp import Llama
+
+    deadline = time.monotonic() + budget_seconds
+    measurements = {'prompt_eval': {}, 'decode': {}, 'n_batch': {}}
+
+    llm = Llama(model_path=model_path, n_ctx=2048, n_batch=512, n_gpu_layers=0, verbose=False)
+    tokens = _bench_tokens(llm, 1024)
+    for threads in thread_candidates:
+        if measurements['decode'] and time.monotonic() > deadline:
+            break
+        llama_cpp.llama_set_n_threads(llm.ctx, threads, threads)
+        measurements['prompt_eval'][threads] = _prompt_eval_rate(llm, tokens[:512])
+        measurements['decode'][threads] = _decode_rate(llm, tokens, 16)
+    del llm
+
+    n_threads = max(measurements['decode'], key=measurements['decode'].get)
+    n_threads_batch = max(measurements['prompt_eval'], key=measurements['prompt_eval'].get)
+
+    for n_batch in batch_candidates:
+        if measurements['n_batch'] and time.monotonic() > deadline:
+            break
+        llm = Llama(model_path=model_path, n_ctx=2048, n_batch=n_batch, n_threads=n_threads,
+                    n_threads_batch=n_threads_batch, n_gpu_layers=0, verbose=False)
+        measurements['n_batch'][n_batch] = _prompt_eval_rate(llm, tokens)
+        del llm
+
+    return {
+        'n_threads': n_threads,
+        'n_threads_batch': n_threads_batch,
+        'n_batch': max(measurements['n_batch'], key=measurements['n_batch'].get),
+        'measurements': measurements,
+    }
+
+
+def _thread_candidates(profile):
+    """Physical cores first (usually best for decode), then the usual alternatives."""
+    physical = profile.get('physical_cores') or os.cpu_count() or 1
+    logical = profile.get('logical_cores') or physical
+    candidates = [physical, logical, max(1, physical // 2), max(1, physical - 1)]
+    if profile.get('numa_nodes', 1) > 1:
+        candidates.append(max(1, physical // profile['numa_nodes']))
+    return list(dict.fromkeys(candidates))
+
+
+def _heuristic_settings(profile):
+    physical = profile.get('physical_cores') or os.cpu_count() or 1
+    return {'n_threads': physical, 'n_threads_batch': profile.get('logical_cores') or physical, 'n_batch': 512}
+
+
+def _cache_key(model_path, profile):
+    stat = os.stat(model_path)
+    return f"{os.path.basename(model_path)}|{stat.st_size}|{int(stat.st_mtime)}|{profile.get('fingerprint')}"
+
+
+def _load_cache():
+    try:
+        with open(os.path.join(config.CACHE_DIR, CACHE_FILENAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    path = os.path.join(config.CACHE_DIR, CACHE_FILENAME)
+    try:
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"Could not save autotune results: {e}")
+
+
+def tune_model(model_path, profile):
+    """
+    Returns the fastest CPU thread/batch settings for a model, benchmarking it once
+    in a separate process and remembering the result per model and machine.
+    """
+    key = _cache_key(model_path, profile)
+    cache = _load_cache()
+    if key in cache:
+        return cache[key]
+    if not config.LLM_AUTOTUNE:
+        return _heuristic_settings(profile)
+
+    print(f"Autotuning llama.cpp settings for {os.path.basename(model_path)} "
+          f"(up to ~{config.LLM_AUTOTUNE_BUDGET_SECONDS}s, once per model)...")
+    import concurrent.futures
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+            future = executor.submit(_benchmark, model_path, _thread_candidates(profile),
+                                     config.LLM_AUTOTUNE_BATCH_SIZES, config.LLM_AUTOTUNE_BUDGET_SECONDS)
+            settings = future.result(timeout=config.LLM_AUTOTUNE_BUDGET_SECONDS * 4)
+    except Exception as e:
+        print(f"Autotune failed, using defaults: {e!r}")
+        return _heuristic_settings(profile)
+
+    settings['tuned_at'] = time.time()
+    cache[key] = settings
+    _save_cache(cache)
+    print(f"Autotune result: n_threads={settings['n_threads']}, "
+          f"n_threads_batch={settings['n_threads_batch']}, n_batch={settings['n_batch']}")
+    return settings
+
+
+def resolve_llama_settings(model_path, n_gpu_layers, num_workers=1):
+    """
+    Builds the performance-related Llama() keyword arguments for this machine:
+    n_threads, n_threads_batch, n_batch and use_mlock.
+    """
+    profile = load_hardware_profile()
+    if n_gpu_layers != 0 and profile.get('gpus'):
+        # Offloaded layers run on the GPU; threads only drive the remaining CPU work
+        settings = _heuristic_settings(profile)
+    else:
+        settings = tune_model(model_path, profile)
+
+    kwargs = {
+        'n_threads': max(1, settings['n_threads'] // num_workers),
+        'n_threads_batch': max(1, settings['n_threads_batch'] // num_workers),
+        'n_batch': settings['n_batch'],
+    }
+
+    use_mlock = config.LLM_USE_MLOCK
+    if use_mlock == "auto":
+        # Pin the weights only when they fit comfortably, otherwise mlock just causes swapping
+        total_ram = profile.get('total_ram') or 0
+        use_mlock = total_ram >= 2 * num_workers * os.path.getsize(model_path)
+    kwargs['use_mlock'] = bool(use_mlock)
+    return kwargs
@@ -0,0 +1,127 @@
+# src/processing/compression.py
+
+import re
+import math
+from collections import Counter
+
+import config
+from .throughput import CHARS_PER_TOKEN
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Too common to say anything about a sentence
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by for from has have if in into is it its no not of on or "
+    "such that the their then there these they this to was were will with which who whom shall "
+    "may any all each other than under upon".split()
+)
+
+
+def split_sentences(text):
+    """
+    Splits text into (paragraph index, sentence) pairs. Lines inside a paragraph are joined
+    first, since extracted text breaks lines where the page layout did.
+    """
+    sentences = []
+    for paragraph_index, paragraph in enumerate(re.split(r"\n\s*\n", text)):
+        paragraph = " ".join(line.strip() for line in paragraph.splitlines() if line.strip())
+        sentences.extend((paragraph_index, s) for s in _SENTENCE_END_RE.split(paragraph) if s.strip())
+    return sentences
+
+
+def parse_entities(nlp_data):
+    """Entity strings from the "- LABEL: a, b" lines produced by nlp_handler.process_text."""
+    entities = set()
+    for line in (nlp_data or "").splitlines():
+        if line.startswith("- ") and ":" in line:
+            entities.update(e.strip().lower() for e in line.split(":", 1)[1].split(",") if len(e.strip()) > 1)
+    return entities
+
+
+def _terms(sentence):
+    return [w for w in _WORD_RE.findall(sentence.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def score_sentences(sentences, entities=(), iterations=30, damping=0.85):
+    """
+    TextRank over TF-IDF sentence vectors: a sentence scores high when it shares rare terms with
+    many other sentences of the page. Sentences that mention named entities found by the NLP
+    stage are boosted by COMPRESSION_ENTITY_BOOST per entity (at most three).
+    """
+    term_lists = [_terms(s) for s in sentences]
+    document_frequency = Counter(t for terms in term_lists for t in set(terms))
+    count = len(sentences)
+    vectors = []
+    for terms in term_lists:
+        weights = {t: tf * math.log(1 + count / document_frequency[t]) for t, tf in Counter(terms).items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        vectors.append({t: w / norm for t, w in weights.items()})
+
+    # Cosine similarity graph; each row normalized so a sentence spreads its score to its neighbours
+    links = []
+    for i, vector in enumerate(vectors):
+        row = {}
+        for j, other in enumerate(vectors):
+            if i != j:
+                small, large = (vector, other) if len(vector) < len(other) else (other, vector)
+                similarity = sum(w * large.get(t, 0.0) for t, w in small.items())
+                if similarity > 0:
+                    row[j] = similarity
+        total = sum(row.values())
+        links.append({j: s / total for j, s in row.items()} if total else {})
+
+    scores = [1.0 / count] * count
+    for _ in range(iterations):
+        incoming = [0.0] * count
+        for i, row in enumerate(links):
+            for j, share in row.items():
+                incoming[j] += scores[i] * share
+        scores = [(1 - damping) / count + damping * value for value in incoming]
+
+    if entities:
+        for i, sentence in enumerate(sentences):
+            lowered = sentence.lower()
+            hits = sum(1 for entity in entities if entity in lowered)
+            scores[i] *= 1 + config.COMPRESSION_ENTITY_BOOST * min(hits, 3)
+    return scores
+
+
+def compress(text, nlp_data="", ratio=None):
+    """
+    Keeps the highest-scoring sentences of a page, in their original order, until about `ratio`
+    of its estimated tokens are used. Returns (text, stats); pages under COMPRESSION_MIN_TOKENS
+    or with too few sentences are returned unchanged with stats None.
+    """
+    ratio = ratio or config.COMPRESSION_TOKEN_RATIO
+    tokens_before = len(text) // CHARS_PER_TOKEN
+    if tokens_before < config.COMPRESSION_MIN_TOKENS:
+        return text, None
+    sentences = split_sentences(text)
+    if len(sentences) < 4:
+        return text, None
+
+    scores = score_sentences([s for _, s in sentences], parse_entities(nlp_data))
+    budget = len(text) * ratio
+    kept, used = set(), 0
+    for i in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+        length = len(sentences[i][1]) + 1
+        if kept and used + length > budget:
+            continue
+        kept.add(i)
+        used += length
+
+    paragraphs = []
+    last_paragraph = None
+    for i in sorted(kept):
+        paragraph_index, sentence = sentences[i]
+        if paragraph_index != last_paragraph:
+            paragraphs.append([])
+            last_paragraph = paragraph_index
+        paragraphs[-1].append(sentence)
+    compressed = "\n\n".join(" ".join(p) for p in paragraphs)
+    return compressed, {
+        'sentences': len(sentences),
+        'kept_sentences': len(kept),
+        'tokens_before': tokens_before,
+        'tokens_after': len(compressed) // CHARS_PER_TOKEN,
+    }
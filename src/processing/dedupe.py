@@ -0,0 +1,143 @@
+# src/processing/dedupe.py
+
+import re
+import hashlib
+import difflib
+
+import config
+
+_WORD_RE = re.compile(r"\w+")
+_SIMHASH_BITS = 64
+_LANE_BITS = 16  # per-bit counters packed into one big integer, see simhash()
+# Byte value -> its 8 bits spread into 8 counter lanes
+_BYTE_LANES = [sum(((byte >> i) & 1) << (_LANE_BITS * i) for i in range(8)) for byte in range(256)]
+
+
+def _popcount(value):
+    return bin(value).count("1")
+
+
+def normalize_text(text):
+    """Lower-cased words only, so OCR spacing and punctuation noise don't hide a repeat."""
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def simhash(words, shingle_size=3):
+    """
+    64-bit SimHash over overlapping word shingles. Near-identical texts differ in only a few bits.
+    The per-bit vote counts are kept as 16-bit lanes of one integer, so each shingle costs
+    eight additions instead of 64.
+    """
+    if len(words) <= shingle_size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    counts = [0] * _SIMHASH_BITS
+    mask = (1 << _LANE_BITS) - 1
+    for start in range(0, len(shingles), mask):  # a lane holds at most `mask` votes
+        totals = 0
+        for shingle in shingles[start:start + mask]:
+            digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+            for position, byte in enumerate(digest):
+                totals += _BYTE_LANES[byte] << (8 * _LANE_BITS * position)
+        for bit in range(_SIMHASH_BITS):
+            counts[bit] += (totals >> (_LANE_BITS * bit)) & mask
+    # A bit is set when more than half of the shingles set it
+    return sum(1 << bit for bit in range(_SIMHASH_BITS) if 2 * counts[bit] > len(shingles))
+
+
+def fingerprint(text):
+    """(digest of the normalized text, SimHash, word count) of a page."""
+    normalized = normalize_text(text)
+    words = normalized.split()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest(), simhash(words), len(words)
+
+
+def image_hash(image, hash_size=None):
+    """
+    Difference hash (dHash) of a PIL image: each bit says whether a cell of a hash_size x hash_size
+    grid is brighter than its right-hand neighbour. Blank areas give 0 bits, ink gives structure.
+    """
+    from PIL import Image
+    hash_size = hash_size or config.DEDUP_IMAGE_HASH_SIZE
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = value << 1 | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def page_image_hash(page):
+    """dHash of a PDF page rendered as a small grayscale thumbnail."""
+    import fitz
+    from PIL import Image
+    pix = page.get_pixmap(dpi=config.DEDUP_IMAGE_DPI, colorspace=fitz.csGRAY)
+    return image_hash(Image.frombytes("L", (pix.width, pix.height), pix.samples))
+
+
+def text_diff(original, text):
+    """
+    Lines of `text` that are new or changed relative to `original`, lines that were removed,
+    and the share of `text`'s lines that changed.
+    """
+    old_lines = [line for line in original.splitlines() if line.strip()]
+    new_lines = [line for line in text.splitlines() if line.strip()]
+    added, removed = [], []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ('replace', 'insert'):
+            added.extend(new_lines[j1:j2])
+        if tag in ('replace', 'delete'):
+            removed.extend(old_lines[i1:i2])
+    return added, removed, len(added) / max(len(new_lines), 1)
+
+
+class DuplicateDetector:
+    """
+    Remembers fingerprints of the pages seen so far and finds the earlier page a new page repeats:
+    exactly (same normalized text), nearly (SimHash within DEDUP_TEXT_MAX_DISTANCE bits) or
+    visually (thumbnail dHash within DEDUP_IMAGE_MAX_DISTANCE bits; a candidate for a text diff, never a match by itself).
+    Lookups scan the fingerprints linearly; XOR and popcount on integers keep that well under
+    a second for thousands of pages.
+    """
+
+    def __init__(self):
+        self._exact = {}         # digest of normalized text -> first page with it
+        self._text_hashes = []   # (page, simhash)
+        self._image_hashes = []  # (page, dhash)
+
+    @staticmethod
+    def _closest(entries, value, max_distance):
+        best_page, best_distance = None, max_distance + 1
+        for page, other in entries:
+            distance = _popcount(value ^ other)
+            if distance < best_distance:
+                best_page, best_distance = page, distance
+        return best_page
+
+    def match_text(self, text_fingerprint):
+        """Returns (earlier page, exact) for a page that repeats one, else (None, False). Short pages never match."""
+        digest, value, word_count = text_fingerprint
+        if word_count < config.DEDUP_MIN_WORDS:
+            return None, False
+        if digest in self._exact:
+            return self._exact[digest], True
+        return self._closest(self._text_hashes, value, config.DEDUP_TEXT_MAX_DISTANCE), False
+
+    def add_text(self, page, text_fingerprint):
+        digest, value, word_count = text_fingerprint
+        if word_count >= config.DEDUP_MIN_WORDS:
+            self._exact.setdefault(digest, page)
+            self._text_hashes.append((page, value))
+
+    def match_image(self, value):
+        """The earlier page that looks the same, or None. Near-blank pages never match: too little to compare."""
+        if _popcount(value) < config.DEDUP_IMAGE_MIN_INK * config.DEDUP_IMAGE_HASH_SIZE ** 2:
+            return None
+        return self._closest(self._image_hashes, value, config.DEDUP_IMAGE_MAX_DISTANCE)
+
+    def add_image(self, page, value):
+        self._image_hashes.append((page, value))
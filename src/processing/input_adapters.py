@@ -0,0 +1,110 @@
+# src/processing/input_adapters.py
+
+import os
+import mmap
+
+import config
+
+TEXT_EXTENSIONS = ('.txt', '.log', '.csv', '.md')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.gif', '.webp')
+
+
+class TextDocument:
+    """
+    A plain-text file split into logical pages without reading it into memory.
+    The file is memory-mapped; a form feed always ends a page, otherwise pages are cut
+    at the last line break before TXT_PAGE_CHARS bytes.
+    """
+    kind = "text"
+
+    def __init__(self, path, page_bytes=None):
+        self.path = path
+        self.page_bytes = page_bytes or config.TXT_PAGE_CHARS
+        self._file = open(path, 'rb')
+        self._map = None
+        self.offsets = [0]
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.offsets = self._find_page_offsets()
+
+    def _find_page_offsets(self):
+        data, size = self._map, len(self._map)
+        offsets = [3 if data[:3] == b'\xef\xbb\xbf' else 0]  # skip a UTF-8 BOM
+        pos = offsets[0]
+        while pos < size:
+            end = min(pos + self.page_bytes, size)
+            form_feed = data.find(b'\f', pos, end)
+            if form_feed != -1:
+                end = form_feed + 1
+            elif end < size:
+                newline = data.rfind(b'\n', pos + self.page_bytes // 2, end)
+                if newline != -1:
+                    end = newline + 1
+                else:
+                    # One very long line: cut anyway, but not inside a UTF-8 sequence
+                    while end > pos + 1 and (data[end] & 0xC0) == 0x80:
+                        end -= 1
+            offsets.append(end)
+            pos = end
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def page_text(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self._map[start:end].decode('utf-8', errors='replace').replace('\f', '')
+
+    def page_features(self, index, dpi):
+        return {'page_pixels': 0, 'image_count': 0, 'image_pixels': 0,
+                'text_chars': self.offsets[index + 1] - self.offsets[index]}
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class ImageDocument:
+    """An image file, one page per frame (multi-page TIFFs, animated GIFs). Frames are decoded on demand."""
+    kind = "image"
+
+    def __init__(self, path):
+        from PIL import Image
+        self.path = path
+        self._image = Image.open(path)
+        self._frames = getattr(self._image, 'n_frames', 1)
+
+    def __len__(self):
+        return self._frames
+
+    def page_image(self, index):
+        """Decodes one frame as 8-bit grayscale, which is what Tesseract works on anyway."""
+        self._image.seek(index)
+        return self._image.convert('L')
+
+    def page_features(self, index, dpi):
+        self._image.seek(index)
+        width, height = self._image.size
+        return {'page_pixels': width * height, 'image_count': 0, 'image_pixels': 0, 'text_chars': None}
+
+    def close(self):
+        self._image.close()
+
+
+def open_document(path):
+    """
+    Opens a document for the pipeline. Plain text and images get their own adapters;
+    everything else (PDF, XPS, EPUB, ...) is opened with PyMuPDF.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in TEXT_EXTENSIONS:
+        return TextDocument(path)
+    if ext in IMAGE_EXTENSIONS:
+        return ImageDocument(path)
+    import fitz  # imported on first use to keep application startup fast
+    return fitz.open(path)
+
+
+def document_kind(doc):
+    return getattr(doc, 'kind', "pdf")
@@ -0,0 +1,804 @@
+# src/processing/llm_backends.py
+
+import re
+import json
+import time
+import zlib
+import queue
+import threading
+import ipaddress
+from urllib.parse import urlparse
+
+
+# How often stream_many() checks a caller's cancel_event while no events arrive
+_CANCEL_POLL_SECONDS = 0.05
+
+# llama.cpp calls used by LlamaCppBackend's batched decoding; older llama-cpp-python releases lack them
+_BATCH_API = ("llama_get_memory", "llama_memory_seq_rm", "llama_model_get_vocab",
+              "llama_vocab_n_tokens", "llama_vocab_is_eog", "llama_init_from_model")
+
+
+class InferenceBackend:
+    """
+    Interface shared by all inference backends.
+    Backends work on text: tokenize() returns token ids, detokenize() turns them back into text.
+    """
+    name = "base"
+
+    def n_ctx(self):
+        raise NotImplementedError
+
+    def tokenize(self, text):
+        raise NotImplementedError
+
+    def detokenize(self, tokens):
+        raise NotImplementedError
+
+    def count_tokens(self, text):
+        return len(self.tokenize(text))
+
+    def embed(self, texts):
+        """Returns one embedding vector (list of floats) per text."""
+        raise NotImplementedError(f"The {self.name} backend does not compute embeddings.")
+
+    def generation_stats(self):
+        """Backend-specific statistics about the most recent stream_chat() call."""
+        return {}
+
+    def stream_chat(self, messages, max_tokens, temperature):
+        """Yields completion text fragments for a list of chat messages."""
+        raise NotImplementedError
+
+    def stream_chat_batch(self, conversations, max_tokens, temperature):
+        """
+        Generates replies for several independent conversations.
+        Yields (index, text) fragments and (index, None) once a conversation is finished.
+        The default interleaves the individual streams; backends that can decode
+        sequences together override this.
+        """
+        streams = {i: self.stream_chat(messages, max_tokens, temperature)
+                   for i, messages in enumerate(conversations)}
+        try:
+            while streams:
+                for index in list(streams):
+                    try:
+                        yield index, next(streams[index])
+                    except StopIteration:
+                        del streams[index]
+                        yield index, None
+        finally:
+            for stream in streams.values():
+                stream.close()
+
+    def close(self):
+        pass
+
+
+class LlamaCppBackend(InferenceBackend):
+    """Runs a GGUF model in the current process through llama-cpp-python."""
+    name = "llama_cpp"
+
+    def __init__(self, model_path, speculative=None, **load_kwargs):
+        from llama_cpp import Llama
+        self.draft_model = None
+        self.speculative_mode = "off"
+        if speculative and speculative.get('mode', "off") != "off":
+            from .speculative import create_draft_model
+            self.speculative_mode = speculative['mode']
+            self.draft_model = create_draft_model(
+                speculative['mode'],
+                num_pred_tokens=speculative.get('num_pred_tokens', 10),
+                max_ngram_size=speculative.get('max_ngram_size', 2),
+                draft_model_path=speculative.get('draft_model_path'),
+                draft_load_kwargs={k: load_kwargs[k] for k in ('n_ctx', 'n_gpu_layers', 'verbose') if k in load_kwargs},
+            )
+            # llama-cpp-python verifies drafts against per-position logits, which it only keeps with logits_all
+            load_kwargs['logits_all'] = True
+            load_kwargs['draft_model'] = self.draft_model
+        self.llm = Llama(model_path=model_path, **load_kwargs)
+        self._last_stats = {}
+        self._chat_formatter = None
+        self._batch_ctx = None
+        self._batch_seq_max = 0
+        self._batching_supported = None
+        self._abort_callback = None
+
+    def set_abort_check(self, should_abort):
+        """
+        Has llama.cpp call should_abort() between the steps of every decode, so a cancelled job stops
+        within one step, even in the middle of evaluating a long prompt. The aborted decode raises,
+        which ends the job like an inference error. (CPU backend only; offloaded graphs run to the end.)
+        """
+        import llama_cpp
+        # The ctypes wrapper must outlive the contexts that point to it
+        callback = llama_cpp.ggml_abort_callback(lambda _: bool(should_abort()))
+        llama_cpp.llama_set_abort_callback(self.llm.ctx, callback, None)
+        # Kept only once set, so a failed call leaves batch contexts without one as well
+        self._abort_callback = callback
+        if self._batch_ctx is not None:
+            llama_cpp.llama_set_abort_callback(self._batch_ctx, self._abort_callback, None)
+
+    def n_ctx(self):
+        return self.llm.n_ctx()
+
+    def tokenize(self, text):
+        return self.llm.tokenize(text.encode('utf-8'))
+
+    def detokenize(self, tokens):
+        return self.llm.detokenize(tokens).decode('utf-8', errors='ignore')
+
+    def embed(self, texts):
+        # Needs a model loaded with embedding=True; texts longer than the context are truncated
+        return self.llm.embed(texts, normalize=True, truncate=True)
+
+    def stream_chat(self, messages, max_tokens, temperature):
+        if self.draft_model is not None:
+            self.draft_model.reset()
+        stream = self.llm.create_chat_completion(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        generated = 0
+        for chunk in stream:
+            delta = chunk['choices'][0].get('delta', {})
+            token = delta.get('content', '')
+            if token:
+                generated += 1
+                yield token
+        if self.draft_model is not None:
+            self._last_stats = {'speculative': self.speculative_mode, **self.draft_model.stats(generated)}
+
+    def generation_stats(self):
+        return self._last_stats
+
+    def _supports_batching(self):
+        """True if the installed llama-cpp-python has the memory and vocab API the batched path uses."""
+        import llama_cpp
+        if self._batching_supported is None:
+            missing = [name for name in _BATCH_API if not hasattr(llama_cpp, name)]
+            if 'kv_unified' not in dict(llama_cpp.llama_context_params._fields_):
+                missing.append('llama_context_params.kv_unified')
+            if missing:
+                print(f"Warning: llama-cpp-python {getattr(llama_cpp, '__version__', '?')} lacks "
+                      f"{', '.join(missing)}; decoding batched pages one at a time. "
+                      f"Upgrade llama-cpp-python for batched decoding.")
+            self._batching_supported = not missing
+        return self._batching_supported
+
+    def stream_chat_batch(self, conversations, max_tokens, temperature):
+        """
+        Decodes several conversations as parallel sequences in one llama.cpp context.
+        Every decode step evaluates one token per active sequence in a single batch,
+        which keeps the CPU's matrix units busy instead of running them one at a time.
+        Older llama-cpp-python releases without that API run the conversations one after another.
+        """
+        import numpy as np
+        import llama_cpp
+
+        if not self._supports_batching():
+            # One Llama object cannot interleave streams, so the fallback is sequential
+            for index, messages in enumerate(conversations):
+                for token in self.stream_chat(messages, max_tokens, temperature):
+                    yield index, token
+                yield index, None
+            return
+
+        prompts = [self._format_chat(messages) for messages in conversations]
+        ctx = self._get_batch_context(len(prompts))
+        n_ctx = llama_cpp.llama_n_ctx(ctx)
+        n_batch = self.llm.n_batch
+        vocab = llama_cpp.llama_model_get_vocab(self.llm.model)
+        n_vocab = llama_cpp.llama_vocab_n_tokens(vocab)
+        rng = np.random.default_rng()
+
+        # Admit as many sequences as fit in the shared KV cache; the rest wait for the next round
+        queue_order = list(range(len(prompts)))
+        while queue_order:
+            group = []
+            used = 0
+            for index in queue_order:
+                needed = len(prompts[index]) + max_tokens
+                if group and used + needed > n_ctx:
+                    break
+                group.append(index)
+                used += needed
+            queue_order = queue_order[len(group):]
+            yield from self._decode_group(ctx, group, prompts, max_tokens, temperature,
+                                          n_batch, vocab, n_vocab, rng)
+
+    def _decode_group(self, ctx, group, prompts, max_tokens, temperature, n_batch, vocab, n_vocab, rng):
+        import numpy as np
+        import llama_cpp
+
+        batch = llama_cpp.llama_batch_init(max(n_batch, len(group)), 0, 1)
+        memory = llama_cpp.llama_get_memory(ctx)
+        try:
+            # --- Prompt evaluation: pack prompt tokens of all sequences into n_batch chunks ---
+            # The last prompt token of every sequence goes into one final chunk so all
+            # of their logits are available together once prompt evaluation is done.
+            body = [(seq, pos, token)
+                    for seq, index in enumerate(group)
+                    for pos, token in enumerate(prompts[index][:-1])]
+            for start in range(0, len(body), n_batch):
+                chunk = body[start:start + n_batch]
+                for i, (seq, pos, token) in enumerate(chunk):
+                    self._batch_set(batch, i, token, pos, seq, False)
+                batch.n_tokens = len(chunk)
+                if llama_cpp.llama_decode(ctx, batch) != 0:
+                    raise RuntimeError("llama_decode failed during batched prompt evaluation.")
+            logit_rows = {}
+            for i, (seq, index) in enumerate(enumerate(group)):
+                self._batch_set(batch, i, prompts[index][-1], len(prompts[index]) - 1, seq, True)
+                logit_rows[seq] = i
+            batch.n_tokens = len(group)
+            if llama_cpp.llama_decode(ctx, batch) != 0:
+                raise RuntimeError("llama_decode failed during batched prompt evaluation.")
+
+            # --- Joint decode: one new token per active sequence per step ---
+            positions = [len(prompts[index]) for index in group]
+            generated = [0] * len(group)
+            pending_bytes = [b""] * len(group)
+            active = list(range(len(group)))
+            while active:
+                next_tokens = {}
+                for seq in list(active):
+                    row = llama_cpp.llama_get_logits_ith(ctx, logit_rows[seq])
+                    logits = np.ctypeslib.as_array(row, shape=(n_vocab,))
+                    token = self._sample(logits, temperature, rng)
+                    if llama_cpp.llama_vocab_is_eog(vocab, token) or generated[seq] >= max_tokens:
+                        active.remove(seq)
+                        tail = pending_bytes[seq].decode('utf-8', errors='ignore')
+                        if tail:
+                            yield group[seq], tail
+                        yield group[seq], None
+                        continue
+                    generated[seq] += 1
+                    data = pending_bytes[seq] + self.llm.detokenize([token])
+                    try:
+                        text = data.decode('utf-8')
+                        pending_bytes[seq] = b""
+                    except UnicodeDecodeError:
+                        # Multi-byte character split across tokens; wait for the rest
+                        text = ""
+                        pending_bytes[seq] = data
+                    if text:
+                        yield group[seq], text
+                    next_tokens[seq] = token
+
+                if not next_tokens:
+                    break
+                logit_rows = {}
+                for i, (seq, token) in enumerate(next_tokens.items()):
+                    self._batch_set(batch, i, token, positions[seq], seq, True)
+                    positions[seq] += 1
+                    logit_rows[seq] = i
+                batch.n_tokens = len(next_tokens)
+                if llama_cpp.llama_decode(ctx, batch) != 0:
+                    raise RuntimeError("llama_decode failed during batched generation.")
+        finally:
+            for seq in range(len(group)):
+                llama_cpp.llama_memory_seq_rm(memory, seq, -1, -1)
+            llama_cpp.llama_batch_free(batch)
+
+    @staticmethod
+    def _batch_set(batch, i, token, pos, seq, wants_logits):
+        batch.token[i] = token
+        batch.pos[i] = pos
+        batch.n_seq_id[i] = 1
+        batch.seq_id[i][0] = seq
+        batch.logits[i] = wants_logits
+
+    @staticmethod
+    def _sample(logits, temperature, rng):
+        """Greedy at temperature 0, otherwise top-k/top-p sampling like llama.cpp's defaults."""
+        import numpy as np
+        if temperature <= 0:
+            return int(np.argmax(logits))
+        top_k = 40
+        candidates = np.argpartition(logits, -top_k)[-top_k:]
+        scaled = logits[candidates].astype(np.float64) / temperature
+        probs = np.exp(scaled - scaled.max())
+        probs /= probs.sum()
+        order = np.argsort(-probs)
+        cumulative = np.cumsum(probs[order])
+        keep = order[:int(np.searchsorted(cumulative, 0.95)) + 1]
+        kept = probs[keep] / probs[keep].sum()
+        return int(candidates[keep[rng.choice(len(keep), p=kept)]])
+
+    def _format_chat(self, messages):
+        """Applies the model's chat template and returns prompt tokens."""
+        if self._chat_formatter is None:
+            from llama_cpp import llama_chat_format
+            template = self.llm.metadata.get("tokenizer.chat_template")
+            if template:
+                eos_id, bos_id = self.llm.token_eos(), self.llm.token_bos()
+                self._chat_formatter = llama_chat_format.Jinja2ChatFormatter(
+                    template=template,
+                    eos_token=self.llm._model.token_get_text(eos_id) if eos_id != -1 else "",
+                    bos_token=self.llm._model.token_get_text(bos_id) if bos_id != -1 else "",
+                )
+            else:
+                self._chat_formatter = False
+        if self._chat_formatter:
+            prompt = self._chat_formatter(messages=messages).prompt
+            return self.llm.tokenize(prompt.encode('utf-8'), add_bos=False, special=True)
+        prompt = "".join(f"{m['role']}: {m['content']}\n" for m in messages) + "assistant: "
+        return self.llm.tokenize(prompt.encode('utf-8'))
+
+    def _get_batch_context(self, n_sequences):
+        """Creates (or grows) a second context on the same weights that holds several sequences."""
+        import llama_cpp
+        if self._batch_ctx is not None and self._batch_seq_max >= n_sequences:
+            return self._batch_ctx
+        if self._batch_ctx is not None:
+            llama_cpp.llama_free(self._batch_ctx)
+            self._batch_ctx = None
+
+        params = llama_cpp.llama_context_default_params()
+        source = self.llm.context_params
+        for field in ("n_ctx", "n_batch", "n_ubatch", "n_threads", "n_threads_batch"):
+            setattr(params, field, getattr(source, field))
+        params.n_seq_max = n_sequences
+        # One KV buffer shared by all sequences, so short pages leave room for long ones
+        params.kv_unified = True
+        ctx = llama_cpp.llama_init_from_model(self.llm.model, params)
+        if not ctx:
+            raise RuntimeError("Failed to create batched llama.cpp context.")
+        if self._abort_callback is not None:
+            llama_cpp.llama_set_abort_callback(ctx, self._abort_callback, None)
+        self._batch_ctx = ctx
+        self._batch_seq_max = n_sequences
+        return ctx
+
+    def close(self):
+        if self._batch_ctx is not None:
+            import llama_cpp
+            llama_cpp.llama_free(self._batch_ctx)
+            self._batch_ctx = None
+        self.llm = None
+
+
+class OpenAICompatibleBackend(InferenceBackend):
+    """
+    Client for an OpenAI-compatible chat server such as llama.cpp's llama-server.
+    Uses one pooled keep-alive session for all requests and parses the SSE stream.
+    """
+    name = "openai"
+
+    def __init__(self, base_url, model="", api_key="", max_concurrency=4, timeout=300, allow_remote=False):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        parsed = urlparse(base_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"Invalid inference server URL: {base_url}")
+        # [SECURITY] Document text must stay on this machine unless remote servers are explicitly allowed
+        if not allow_remote and not _is_loopback(parsed.hostname):
+            raise ValueError(f"Inference server '{parsed.hostname}' is not on localhost. "
+                             "Set LLM_SERVER_ALLOW_REMOTE in config.py to use a remote server.")
+
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_concurrency))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+        self._n_ctx = None
+
+    def n_ctx(self):
+        if self._n_ctx is None:
+            import config
+            self._n_ctx = config.MAX_TOKENS
+            try:
+                # llama-server reports the per-slot context size under /props
+                response = self.session.get(f"{self.base_url}/props", timeout=10)
+                if response.ok:
+                    settings = response.json().get('default_generation_settings', {})
+                    self._n_ctx = int(settings.get('n_ctx') or self._n_ctx)
+            except Exception:
+                pass
+        return self._n_ctx
+
+    def tokenize(self, text):
+        response = self.session.post(f"{self.base_url}/tokenize", json={"content": text}, timeout=30)
+        response.raise_for_status()
+        return response.json()["tokens"]
+
+    def detokenize(self, tokens):
+        response = self.session.post(f"{self.base_url}/detokenize", json={"tokens": list(tokens)}, timeout=30)
+        response.raise_for_status()
+        return response.json()["content"]
+
+    def embed(self, texts):
+        # llama-server only serves this endpoint when started with --embeddings
+        body = {"input": list(texts)}
+        if self.model:
+            body["model"] = self.model
+        response = self.session.post(f"{self.base_url}/v1/embeddings", json=body, timeout=(10, self.timeout))
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item.get("index", 0))
+        return [item["embedding"] for item in data]
+
+    def stream_chat(self, messages, max_tokens, temperature):
+        body = {
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+        }
+        if self.model:
+            body["model"] = self.model
+        with self.session.post(f"{self.base_url}/v1/chat/completions", json=body,
+                               stream=True, timeout=(10, self.timeout)) as response:
+            response.raise_for_status()
+            for data in _iter_sse_data(response.iter_lines(decode_unicode=True)):
+                if data == "[DONE]":
+                    return
+                chunk = json.loads(data)
+                if 'error' in chunk:
+                    raise RuntimeError(chunk['error'].get('message', chunk['error']))
+                choices = chunk.get('choices') or [{}]
+                token = (choices[0].get('delta') or {}).get('content')
+                if token:
+                    yield token
+
+    def close(self):
+        self.session.close()
+
+
+class MockBackend(InferenceBackend):
+    """
+    Deterministic stand-in for tests and benchmarks.
+    Tokens are whitespace-delimited words; the "summary" is the first words of the page content.
+    """
+    name = "mock"
+    EMBEDDING_DIM = 256
+    _CONTENT_RE = re.compile(r"<content>\n(.*?)\n</content>", re.DOTALL)
+
+    def __init__(self, context_size=32768, token_delay=0.0, prompt_delay=0.0):
+        self._context_size = context_size
+        self.token_delay = token_delay
+        self.prompt_delay = prompt_delay
+        self._vocab = {}
+        self._lock = threading.Lock()
+
+    def n_ctx(self):
+        return self._context_size
+
+    def tokenize(self, text):
+        tokens = []
+        with self._lock:
+            for word in re.findall(r"\S+\s*", text):
+                token_id = zlib.crc32(word.encode('utf-8'))
+                self._vocab[token_id] = word
+                tokens.append(token_id)
+        return tokens
+
+    def detokenize(self, tokens):
+        return "".join(self._vocab.get(t, "") for t in tokens)
+
+    def embed(self, texts):
+        """Hashed bag of words: texts sharing words get similar vectors, which is enough to test retrieval."""
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.EMBEDDING_DIM
+            for word in re.findall(r"\w+", text.lower()):
+                vector[zlib.crc32(word.encode('utf-8')) % self.EMBEDDING_DIM] += 1.0
+            norm = sum(v * v for v in vector) ** 0.5 or 1.0
+            vectors.append([v / norm for v in vector])
+        return vectors
+
+    def stream_chat(self, messages, max_tokens, temperature):
+        prompt = "\n".join(m['content'] for m in messages)
+        if self.prompt_delay:
+            time.sleep(self.prompt_delay * self.count_tokens(prompt))
+        match = self._CONTENT_RE.search(messages[-1]['content'])
+        source = match.group(1) if match else messages[-1]['content']
+        words = source.split()[:max_tokens] or ["(empty", "page)"]
+        for i, word in enumerate(words):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+
+def _is_loopback(hostname):
+    if hostname == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(hostname).is_loopback
+    except ValueError:
+        return False
+
+
+def _iter_sse_data(lines):
+    """Yields the payload of each server-sent event, joining multi-line data fields."""
+    data_lines = []
+    for line in lines:
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith(":"):
+            continue  # Comment / keep-alive
+        field, _, value = line.partition(":")
+        if field == "data":
+            data_lines.append(value[1:] if value.startswith(" ") else value)
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
+def run_summary_job(backend, job, should_cancel=None):
+    """
+    Runs one page summary job on a backend.
+    Yields ('token', text) events and finishes with ('done', stats).
+    """
+    from .llm_handler import build_summary_messages
+
+    start = time.perf_counter()
+    prompt_stats = {}
+    if 'messages' in job:
+        # Prompt built by the caller, e.g. a question with retrieved excerpts
+        messages = job['messages']
+    else:
+        messages = build_summary_messages(
+            backend, job['context_text'], job['nlp_data'], job['user_instructions'], prompt_stats
+        )
+    tokenize_seconds = time.perf_counter() - start
+    completion_tokens = 0
+    first_token_at = None
+    cancelled = False
+    stream = backend.stream_chat(messages, job['max_tokens'], job['temperature'])
+    try:
+        for token in stream:
+            if should_cancel is not None and should_cancel():
+                cancelled = True
+                break
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            completion_tokens += 1
+            yield "token", token
+    finally:
+        stream.close()
+
+    elapsed = time.perf_counter() - start
+    decode_time = elapsed - (first_token_at - start) if first_token_at else 0.0
+    yield "done", {
+        'backend': backend.name,
+        'completion_tokens': completion_tokens,
+        'elapsed': elapsed,
+        'time_to_first_token': (first_token_at - start) if first_token_at else None,
+        'tokens_per_second': completion_tokens / decode_time if decode_time > 0 else 0.0,
+        'prompt_tokens': prompt_stats.get('prompt_tokens'),
+        'tokenize_seconds': tokenize_seconds,
+        'cancelled': cancelled,
+        **(backend.generation_stats() if not cancelled else {}),
+    }
+
+
+def run_batch_summary_job(backend, jobs, should_cancel=None):
+    """
+    Runs several page summary jobs as one batched generation.
+    Yields (index, 'token', text) and (index, 'done', stats) events.
+    """
+    from .llm_handler import build_summary_messages
+
+    start = time.perf_counter()
+    prompt_stats = [{} for _ in jobs]
+    conversations = [
+        build_summary_messages(backend, job['context_text'], job['nlp_data'], job['user_instructions'], stats)
+        for job, stats in zip(jobs, prompt_stats)
+    ]
+    tokenize_seconds = time.perf_counter() - start
+    counts = [0] * len(jobs)
+    first_token_at = [None] * len(jobs)
+    stream = backend.stream_chat_batch(conversations, jobs[0]['max_tokens'], jobs[0]['temperature'])
+    try:
+        for index, token in stream:
+            if should_cancel is not None and should_cancel():
+                return
+            now = time.perf_counter()
+            if token is None:
+                elapsed = now - start
+                ttft = (first_token_at[index] - start) if first_token_at[index] else None
+                decode_time = elapsed - ttft if ttft is not None else 0.0
+                yield index, "done", {
+                    'backend': backend.name,
+                    'batched': len(jobs),
+                    'completion_tokens': counts[index],
+                    'elapsed': elapsed,
+                    'time_to_first_token': ttft,
+                    'tokens_per_second': counts[index] / decode_time if decode_time > 0 else 0.0,
+                    'prompt_tokens': prompt_stats[index].get('prompt_tokens'),
+                    'tokenize_seconds': tokenize_seconds,
+                    'cancelled': False,
+                }
+                continue
+            if first_token_at[index] is None:
+                first_token_at[index] = now
+            counts[index] += 1
+            yield index, "token", token
+    finally:
+        stream.close()
+
+
+class JobRunner:
+    """
+    Common interface for whatever executes summary jobs (worker pool or in-process backend).
+    Subclasses implement stream(), count_tokens() and shutdown(); stream_many() fans jobs out.
+    """
+    size = 1
+
+    def stream(self, job, cancel_event=None):
+        raise NotImplementedError
+
+    def count_tokens(self, text):
+        raise NotImplementedError
+
+    def embed(self, texts):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+    def stream_many(self, jobs, cancel_event=None):
+        """
+        Runs several jobs concurrently, at most `size` at a time.
+        Yields (index, kind, value) events where kind is 'token', 'done' or 'error'.
+        Jobs are started in index order; events of different jobs interleave.
+        Setting `cancel_event` ends the stream early, even while no job is producing tokens.
+        """
+        events = queue.Queue()
+        pending = queue.Queue()
+        for item in enumerate(jobs):
+            pending.put(item)
+        caller_cancel, cancel_event = cancel_event, threading.Event()
+
+        def dispatch():
+            while not cancel_event.is_set():
+                try:
+                    index, job = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    for kind, value in self.stream(job, cancel_event):
+                        events.put((index, kind, value))
+                except Exception as e:
+                    events.put((index, "error", str(e)))
+
+        threads = [threading.Thread(target=dispatch, daemon=True)
+                   for _ in range(min(self.size, len(jobs)))]
+        for t in threads:
+            t.start()
+
+        remaining = len(jobs)
+        try:
+            while remaining and not (caller_cancel is not None and caller_cancel.is_set()):
+                try:
+                    event = events.get(timeout=_CANCEL_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if event[1] in ("done", "error"):
+                    remaining -= 1
+                yield event
+        finally:
+            cancel_event.set()
+            for t in threads:
+                t.join()
+
+
+class LocalBackendRunner(JobRunner):
+    """Runs jobs on an in-process backend, up to `size` concurrent requests (e.g. HTTP or mock)."""
+
+    def __init__(self, backend, size=1):
+        self.backend = backend
+        self.size = max(1, size)
+
+    def stream(self, job, cancel_event=None):
+        should_cancel = cancel_event.is_set if cancel_event is not None else None
+        try:
+            yield from run_summary_job(self.backend, job, should_cancel)
+        except RuntimeError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Inference error: {e}")
+
+    def count_tokens(self, text):
+        return self.backend.count_tokens(text)
+
+    def embed(self, texts):
+        try:
+            return self.backend.embed(texts)
+        except NotImplementedError as e:
+            raise RuntimeError(str(e))
+        except Exception as e:
+            raise RuntimeError(f"Embedding error: {e}")
+
+    def shutdown(self):
+        self.backend.close()
+
+
+class RoutedRunner(JobRunner):
+    """
+    Runs each job on one of several runners chosen by the job's 'model' key, e.g. a small and a
+    large model loaded side by side. Jobs without one go to the first runner. The stats of
+    every finished job name the model that produced it.
+    """
+
+    def __init__(self, runners):
+        self.runners = runners  # model name -> JobRunner
+        self.default = next(iter(runners))
+        self.size = sum(runner.size * getattr(runner, 'batch_size', 1) for runner in runners.values())
+
+    def _runner_for(self, job):
+        return job.get('model') or self.default
+
+    def stream(self, job, cancel_event=None):
+        model = self._runner_for(job)
+        for kind, value in self.runners[model].stream(job, cancel_event):
+            yield kind, (dict(value, model=model) if kind == "done" and value is not None else value)
+
+    def stream_many(self, jobs, cancel_event=None):
+        """Hands each model's jobs to its own runner's stream_many (keeping its batching) and merges the events."""
+        groups = {}
+        for index, job in enumerate(jobs):
+            groups.setdefault(self._runner_for(job), []).append(index)
+        events = queue.Queue()
+        # The inner runners see only this private event; it is set when the caller cancels or
+        # closes the stream, so they wind down even while their jobs produce no events
+        caller_cancel, cancel_event = cancel_event, threading.Event()
+
+        def drain(model, indices):
+            finished = set()
+            stream = self.runners[model].stream_many([jobs[i] for i in indices], cancel_event)
+            try:
+                for sub_index, kind, value in stream:
+                    if kind in ("done", "error"):
+                        finished.add(sub_index)
+                        if kind == "done" and value is not None:
+                            value = dict(value, model=model)
+                    events.put((indices[sub_index], kind, value))
+                    if cancel_event.is_set():
+                        break
+            except Exception as e:
+                for sub_index, index in enumerate(indices):
+                    if sub_index not in finished:
+                        events.put((index, "error", str(e)))
+            finally:
+                stream.close()
+
+        threads = [threading.Thread(target=drain, args=group, daemon=True) for group in groups.items()]
+        for t in threads:
+            t.start()
+
+        remaining = len(jobs)
+        try:
+            while remaining and not (caller_cancel is not None and caller_cancel.is_set()):
+                try:
+                    event = events.get(timeout=_CANCEL_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if event[1] in ("done", "error"):
+                    remaining -= 1
+                yield event
+        finally:
+            cancel_event.set()
+            for t in threads:
+                t.join()
+
+    def count_tokens(self, text):
+        return self.runners[self.default].count_tokens(text)
+
+    def embed(self, texts):
+        return self.runners[self.default].embed(texts)
+
+    def shutdown(self):
+        for runner in self.runners.values():
+            runner.shutdown()
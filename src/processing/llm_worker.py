@@ -0,0 +1,312 @@
+# src/processing/llm_worker.py
+
+import os
+import time
+import queue
+import itertools
+import multiprocessing
+
+from .llm_backends import JobRunner
+
+# Qt and llama.cpp do not survive fork() reliably, so workers are always spawned.
+_mp = multiprocessing.get_context("spawn")
+
+# How long a cancelled job may keep the worker busy before it is killed (and restarted when next needed).
+# llama.cpp checks for cancellation between decode steps, so this only runs out if a step hangs.
+_CANCEL_GRACE_SECONDS = 1
+_POLL_INTERVAL = 0.05
+
+
+def _worker_main(conn, model_path, load_kwargs, cancel_flag):
+    """
+    Entry point of an inference worker process.
+    Loads the model once, then serves jobs until told to shut down.
+    The parent writes the id of a job to cancel into the shared `cancel_flag`.
+    """
+    job_id = None
+    try:
+        from .llm_backends import LlamaCppBackend
+        backend = LlamaCppBackend(model_path, **load_kwargs)
+    except Exception as e:
+        conn.send(("load_error", None, str(e)))
+        conn.close()
+        return
+    try:
+        # Read from inside llama.cpp's decode loop, so it must be cheap: a shared integer, not the pipe
+        backend.set_abort_check(lambda: cancel_flag.value == job_id)
+    except Exception as e:
+        # Older llama-cpp-python: cancelled jobs then stop at the next token instead of mid-decode
+        print(f"Warning: llama.cpp abort callback unavailable ({e}); a cancelled job stops at its next token.")
+
+    conn.send(("ready", None, None))
+
+    from .llm_backends import run_summary_job, run_batch_summary_job
+
+    while True:
+        try:
+            command, job_id, payload = conn.recv()
+        except (EOFError, OSError):
+            break  # Parent went away
+        if command == "shutdown":
+            break
+
+        def should_cancel():
+            if cancel_flag.value == job_id:
+                return True
+            if not conn.poll():
+                return False
+            message, cancel_id, _ = conn.recv()
+            return message == "shutdown" or (message == "cancel" and cancel_id == job_id)
+
+        try:
+            if command == "count_tokens":
+                conn.send(("done", job_id, backend.count_tokens(payload)))
+            elif command == "embed":
+                conn.send(("done", job_id, backend.embed(payload)))
+            elif command == "summarize":
+                for kind, value in run_summary_job(backend, payload, should_cancel):
+                    if kind == "done":
+                        value['worker_pid'] = os.getpid()
+                    conn.send((kind, job_id, value))
+            elif command == "summarize_batch":
+                for event in run_batch_summary_job(backend, payload['batch'], should_cancel):
+                    conn.send(("event", job_id, event))
+                conn.send(("done", job_id, None))
+            # Anything else is a stale cancel for a job that already finished
+        except Exception as e:
+            conn.send(("error", job_id, f"Inference error: {e}"))
+
+
+class InferenceWorker:
+    """Owns one worker process and the parent end of its pipe."""
+
+    def __init__(self, model_path, load_kwargs):
+        self.model_path = model_path
+        self.load_kwargs = load_kwargs
+        self.process = None
+        self.conn = None
+        self.cancel_flag = None
+
+    def start(self, timeout):
+        parent_conn, child_conn = _mp.Pipe()
+        self.cancel_flag = _mp.RawValue('q', 0)
+        self.process = _mp.Process(
+            target=_worker_main,
+            args=(child_conn, self.model_path, self.load_kwargs, self.cancel_flag),
+            daemon=True
+        )
+        self.process.start()
+        # Drop our copy of the child end so a dead worker shows up as EOFError
+        child_conn.close()
+        self.conn = parent_conn
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.conn.poll(_POLL_INTERVAL):
+                try:
+                    status, _, message = self.conn.recv()
+                except EOFError:
+                    break
+                if status == "ready":
+                    return
+                self.stop()
+                raise RuntimeError(message)
+            if not self.process.is_alive():
+                break
+        exit_code = self.process.exitcode
+        self.stop()
+        raise RuntimeError(f"Inference worker failed to start (exit code {exit_code}).")
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def stop(self, timeout=5):
+        if self.conn is not None:
+            try:
+                self.conn.send(("shutdown", None, None))
+            except (OSError, ValueError):
+                pass
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        if self.conn is not None:
+            self.conn.close()
+        self.process = None
+        self.conn = None
+
+
+class LLMWorkerPool(JobRunner):
+    """
+    Supervises a fixed number of inference worker processes.
+    Each worker loads the model once; jobs are handed to whichever worker is idle
+    and crashed workers are restarted before they are handed out again.
+    """
+
+    def __init__(self, model_path, load_kwargs, size=1, load_timeout=300, batch_size=1):
+        self.model_path = model_path
+        self.load_kwargs = load_kwargs
+        self.size = max(1, size)
+        self.batch_size = max(1, batch_size)
+        self.load_timeout = load_timeout
+        self._workers = []
+        self._idle = queue.Queue()
+        self._job_ids = itertools.count(1)
+        self.restarts = 0
+
+    def start(self):
+        try:
+            for _ in range(self.size):
+                worker = InferenceWorker(self.model_path, self.load_kwargs)
+                worker.start(self.load_timeout)
+                self._workers.append(worker)
+                self._idle.put(worker)
+        except RuntimeError:
+            self.shutdown()
+            raise
+
+    def _restart(self, worker):
+        worker.stop(timeout=1)
+        self.restarts += 1
+        print(f"Restarting inference worker (restart #{self.restarts})...")
+        worker.start(self.load_timeout)
+
+    def _acquire(self):
+        """Takes an idle worker, restarting it first if it died while idle."""
+        worker = self._idle.get()
+        if not worker.is_alive():
+            try:
+                self._restart(worker)
+            except RuntimeError:
+                self._idle.put(worker)
+                raise
+        return worker
+
+    def count_tokens(self, text):
+        """Counts tokens with the model's own tokenizer on an idle worker."""
+        return self._request("count_tokens", text)
+
+    def embed(self, texts):
+        """Embeds a batch of texts on an idle worker (the model must be loaded with embedding=True)."""
+        return self._request("embed", texts)
+
+    def _request(self, command, payload):
+        """Sends a command that has a single reply to an idle worker and returns the reply."""
+        worker = self._acquire()
+        job_id = next(self._job_ids)
+        try:
+            worker.conn.send((command, job_id, payload))
+            while True:
+                kind, reply_id, value = worker.conn.recv()
+                if reply_id != job_id:
+                    continue
+                if kind == "error":
+                    raise RuntimeError(value)
+                return value
+        except (EOFError, OSError) as e:
+            raise RuntimeError(f"Inference worker is not available: {e}")
+        finally:
+            self._idle.put(worker)
+
+    def stream(self, payload, cancel_event=None):
+        """
+        Runs one summary job on an idle worker.
+        Yields ('token', str) events followed by a single ('done', stats) event.
+        A {'batch': [jobs]} payload is decoded as one batch and yields
+        ('event', (index, kind, value)) events instead.
+        Raises RuntimeError if the job fails or the worker crashes.
+        """
+        worker = self._acquire()
+        job_id = next(self._job_ids)
+        command = "summarize_batch" if 'batch' in payload else "summarize"
+        finished = False
+        healthy = True
+        crashed = False
+        try:
+            worker.conn.send((command, job_id, payload))
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                if not worker.conn.poll(_POLL_INTERVAL):
+                    if not worker.is_alive():
+                        raise EOFError
+                    continue
+                kind, reply_id, value = worker.conn.recv()
+                if reply_id != job_id:
+                    continue  # Leftover from a previously cancelled job
+                if kind in ("token", "event"):
+                    yield kind, value
+                elif kind == "done":
+                    finished = True
+                    yield "done", value
+                    return
+                else:
+                    finished = True
+                    raise RuntimeError(value)
+        except (EOFError, OSError, BrokenPipeError):
+            healthy = False
+            finished = True
+            crashed = True
+            raise RuntimeError("Inference worker crashed while generating. It has been restarted.")
+        finally:
+            if not finished:
+                healthy = self._cancel(worker, job_id)
+            if crashed:
+                try:
+                    self._restart(worker)
+                except RuntimeError as e:
+                    print(f"Inference worker restart failed: {e}")
+            elif not healthy:
+                # Killed now so the stop is immediate; _acquire() restarts it when it is needed again
+                worker.stop(timeout=0)
+            self._idle.put(worker)
+
+    def _cancel(self, worker, job_id):
+        """Asks a worker to abandon a job. Returns False if it did not respond in time."""
+        worker.cancel_flag.value = job_id
+        try:
+            worker.conn.send(("cancel", job_id, None))
+            deadline = time.monotonic() + _CANCEL_GRACE_SECONDS
+            while time.monotonic() < deadline:
+                if worker.conn.poll(_POLL_INTERVAL):
+                    kind, reply_id, _ = worker.conn.recv()
+                    if reply_id == job_id and kind in ("done", "error"):
+                        return True
+                elif not worker.is_alive():
+                    return False
+        except (EOFError, OSError, BrokenPipeError):
+            pass
+        return False
+
+    def stream_many(self, jobs, cancel_event=None):
+        """
+        Like JobRunner.stream_many, but with batch_size > 1 consecutive jobs are
+        grouped and each group is decoded together on one worker.
+        """
+        if self.batch_size <= 1 or len(jobs) <= 1:
+            yield from super().stream_many(jobs, cancel_event)
+            return
+
+        groups = [list(range(start, min(start + self.batch_size, len(jobs))))
+                  for start in range(0, len(jobs), self.batch_size)]
+        batch_jobs = [{'batch': [jobs[i] for i in group]} for group in groups]
+        finished = set()
+        for group_index, kind, value in super().stream_many(batch_jobs, cancel_event):
+            group = groups[group_index]
+            if kind == "event":
+                index, sub_kind, sub_value = value
+                if sub_kind == "done":
+                    finished.add(group[index])
+                yield group[index], sub_kind, sub_value
+            elif kind == "error":
+                for index in group:
+                    if index not in finished:
+                        finished.add(index)
+                        yield index, "error", value
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+        self._idle = queue.Queue()
@@ -1,48 +1,78 @@
 # src/processing/nlp_handler.py
 
+import threading
 from collections import defaultdict
 
 # Lazy-load spaCy to avoid crash if not installed
 _nlp = None
+_nlp_error = None
 _nlp_loaded = False
+# The startup dependency check and the analysis thread may ask for the model at the same time
+_nlp_lock = threading.Lock()
+# Long pages are analyzed in pieces of about this size, so a stop request is noticed between them
+_CHUNK_CHARS = 10000
 
 
-def _get_nlp():
-    """Loads the spaCy model lazily on first use."""
-    global _nlp, _nlp_loaded
-    if not _nlp_loaded:
-        _nlp_loaded = True
-        try:
-            import spacy
-            _nlp = spacy.load("en_core_web_sm")
-        except (ImportError, OSError) as e:
-            print(f"spaCy not available: {e}")
-            _nlp = None
+def get_nlp():
+    """
+    Loads the spaCy model once, on first use, and returns it (None if unavailable).
+    The startup dependency check uses this too, so the model is only ever loaded once.
+    """
+    global _nlp, _nlp_error, _nlp_loaded
+    with _nlp_lock:
+        if not _nlp_loaded:
+            _nlp_loaded = True
+            try:
+                import spacy
+                _nlp = spacy.load("en_core_web_sm")
+            except (ImportError, OSError) as e:
+                print(f"spaCy not available: {e}")
+                _nlp_error = e
+                _nlp = None
     return _nlp
 
 
-def process_text(text: str) -> str:
+def get_load_error():
+    """Returns the exception raised while loading spaCy, if any."""
+    return _nlp_error
+
+
+def _chunks(text):
+    """Splits text at paragraph breaks into pieces of about _CHUNK_CHARS."""
+    chunk = ""
+    for paragraph in text.split("\n\n"):
+        if chunk and len(chunk) + len(paragraph) > _CHUNK_CHARS:
+            yield chunk
+            chunk = ""
+        chunk += paragraph + "\n\n"
+    if chunk:
+        yield chunk
+
+
+def process_text(text: str, cancel=None) -> str:
     """
     Processes text using spaCy to extract named entities and returns them
     as a formatted string.
 
     Args:
         text: The raw text to analyze.
+        cancel: Optional CancelToken, checked between pieces of a long text.
 
     Returns:
         A formatted string of extracted entities, grouped by type.
     """
-    nlp = _get_nlp()
+    nlp = get_nlp()
     if not nlp:
         return "spaCy model not loaded. Cannot perform NLP analysis."
 
-    doc = nlp(text)
-
     entities = defaultdict(list)
-    for ent in doc.ents:
-        # Avoid adding duplicate entities within the same category
-        if ent.text.strip() not in entities[ent.label_]:
-            entities[ent.label_].append(ent.text.strip())
+    for chunk in _chunks(text):
+        if cancel is not None:
+            cancel.check()
+        for ent in nlp(chunk).ents:
+            # Avoid adding duplicate entities within the same category
+            if ent.text.strip() not in entities[ent.label_]:
+                entities[ent.label_].append(ent.text.strip())
 
     if not entities:
         return "No named entities found."
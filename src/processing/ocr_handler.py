@@ -1,21 +1,187 @@
 import io
-import pytesseract
-from PIL import Image
+import os
+import shlex
+import subprocess
+import threading
+import concurrent.futures
+from contextlib import contextmanager, nullcontext
 import config
+from src.utils.cancellation import Cancelled
 
-# Tell pytesseract where to find the Tesseract program
-pytesseract.pytesseract.tesseract_cmd = config.TESSERACT_CMD
+# pytesseract and PIL are imported on the first OCR call, not at application startup
+_pytesseract = None
 
-def extract_text_from_image(image_bytes):
+# Peak memory of one OCR call relative to the 8-bit grayscale pixmap:
+# the pixmap, the image Tesseract loads and its binarized/working copies.
+_OCR_MEMORY_FACTOR = 3
+
+
+def _get_pytesseract():
+    global _pytesseract
+    if _pytesseract is None:
+        import pytesseract
+        # Tell pytesseract where to find the Tesseract program
+        pytesseract.pytesseract.tesseract_cmd = config.TESSERACT_CMD
+        # Every OCR call goes through run_tesseract; ours can kill the process when a run is stopped
+        pytesseract.pytesseract.run_tesseract = _run_tesseract
+        _pytesseract = pytesseract
+    return _pytesseract
+
+
+# --- Cancellation ---
+
+# Per-thread OCR state: the cancel token of the analysis running OCR here, and its Tesseract thread cap
+_local = threading.local()
+
+
+@contextmanager
+def cancellable(token):
+    """Tesseract processes started on this thread inside the block are killed when the token is cancelled."""
+    previous = getattr(_local, 'token', None)
+    _local.token = token
+    try:
+        yield
+    finally:
+        _local.token = previous
+
+
+def _cancelled():
+    token = getattr(_local, 'token', None)
+    return token is not None and token.is_set()
+
+
+def _run_tesseract(input_filename, output_filename_base, extension, lang, config='', nice=0, timeout=0):
+    """
+    Replaces pytesseract's run_tesseract with the same command line, but a cancelled token kills
+    the process mid-page and raises Cancelled instead of waiting for the page to finish.
+    The OCR functions below return empty results when that happens, so page images are released
+    before the pixmaps they point into; callers check their token afterwards.
+    """
+    token = getattr(_local, 'token', None)
+    if token is not None:
+        token.check()
+    pytesseract = _pytesseract
+    cmd_args = ['nice', '-n', str(nice)] if nice and os.name != 'nt' else []
+    cmd_args += [pytesseract.pytesseract.tesseract_cmd, input_filename, output_filename_base]
+    if lang is not None:
+        cmd_args += ['-l', lang]
+    if config:
+        cmd_args += shlex.split(config, posix=os.name != 'nt')
+    # These outputs are requested through `config` rather than as config file names
+    cmd_args += [name for name in extension.split() if name not in {'box', 'osd', 'tsv', 'xml'}]
+    kwargs = pytesseract.pytesseract.subprocess_args()
+    threads = getattr(_local, 'omp_threads', None)
+    if threads:
+        kwargs['env'] = dict(kwargs['env'] or os.environ, OMP_THREAD_LIMIT=str(threads))
+    try:
+        proc = subprocess.Popen(cmd_args, **kwargs)
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError()
+    with token.on_cancel(proc.kill) if token is not None else nullcontext():
+        try:
+            _, errors = proc.communicate(timeout=timeout or None)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise RuntimeError('Tesseract process timeout')
+    if token is not None:
+        token.check()
+    if proc.returncode:
+        raise pytesseract.TesseractError(proc.returncode, pytesseract.pytesseract.get_errors(errors))
+
+
+# --- Profiles ---
+
+def get_profile(name=None):
+    """
+    Resolves an OCR profile from config.OCR_PROFILES (default: OCR_DEFAULT_PROFILE).
+    The result also carries the profile name, the language and the tessdata directory actually used.
+    """
+    name = name or config.OCR_DEFAULT_PROFILE
+    if name not in config.OCR_PROFILES:
+        print(f"Warning: Unknown OCR profile '{name}', using '{config.OCR_DEFAULT_PROFILE}'.")
+        name = config.OCR_DEFAULT_PROFILE
+    profile = dict(config.OCR_PROFILES[name], name=name, lang=config.OCR_LANG)
+    profile['tessdata_dir'] = _tessdata_dir(profile['tessdata'], profile['lang'])
+    if profile['tessdata'] != "standard" and profile['tessdata_dir'] != config.TESSDATA_DIRS.get(profile['tessdata']):
+        print(f"Warning: '{profile['tessdata']}' tessdata for '{profile['lang']}' not found, using the standard models.")
+        profile['tessdata'] = "standard"
+    elif profile['tessdata'] != "standard" and profile['oem'] != 1:
+        # tessdata_fast and tessdata_best only contain the LSTM engine
+        profile['oem'] = 1
+    return profile
+
+
+def _tessdata_dir(variant, lang):
+    """The directory holding `lang` for the variant, the bundled standard data, or None (Tesseract's own)."""
+    for path in (config.TESSDATA_DIRS.get(variant), config.TESSDATA_DIRS.get("standard")):
+        if path and os.path.exists(os.path.join(path, f"{lang}.traineddata")):
+            return path
+    return None
+
+
+def tesseract_args(profile):
+    """Command-line options for a resolved profile, as pytesseract's `config` string."""
+    args = [f"--oem {profile['oem']}", f"--psm {profile['psm']}"]
+    if profile['tessdata_dir']:
+        args.append(f'--tessdata-dir "{profile["tessdata_dir"]}"')
+    if profile.get('whitelist'):
+        args.append(f"-c tessedit_char_whitelist={profile['whitelist']}")
+    return " ".join(args)
+
+
+@contextmanager
+def thread_limit(profile, parallel_calls=1):
+    """
+    Caps the OpenMP threads of Tesseract processes started on this thread inside the block
+    (OMP_THREAD_LIMIT in each process's environment, not ours, so concurrent calls don't clobber
+    each other). Parallel calls get one thread each so they don't oversubscribe the CPU.
+    """
+    limit = 1 if parallel_calls > 1 else profile.get('threads')
+    previous = getattr(_local, 'omp_threads', None)
+    if limit:
+        _local.omp_threads = limit
+    try:
+        yield
+    finally:
+        _local.omp_threads = previous
+
+
+def preprocess(image, steps):
+    """Applies the profile's preprocessing steps. They keep the image size, so word positions stay valid."""
+    from PIL import ImageFilter, ImageOps
+    for step in steps:
+        if step == "autocontrast":
+            image = ImageOps.autocontrast(image, cutoff=1)
+        elif step == "denoise":
+            image = image.filter(ImageFilter.MedianFilter(3))
+        elif step == "sharpen":
+            image = image.filter(ImageFilter.SHARPEN)
+        else:
+            print(f"Warning: Unknown OCR preprocessing step '{step}' ignored.")
+    return image
+
+
+def extract_text_from_image(image_bytes, profile=None):
     """
     Performs OCR on an image provided as bytes.
     """
+    from PIL import Image
+    # Wrap the image bytes in a BytesIO stream for robustness
+    return extract_text_from_pil(Image.open(io.BytesIO(image_bytes)), profile)
+
+
+def extract_text_from_pil(image, profile=None):
+    """Performs OCR on an already decoded PIL image."""
+    profile = profile or get_profile()
+    pytesseract = _get_pytesseract()
     try:
-        # Wrap the image bytes in a BytesIO stream for robustness
-        image_stream = io.BytesIO(image_bytes)
-        image = Image.open(image_stream)
-        text = pytesseract.image_to_string(image, lang='eng')
+        with thread_limit(profile):
+            text = pytesseract.image_to_string(preprocess(image, profile['preprocess']),
+                                               lang=profile['lang'], config=tesseract_args(profile))
         return text
+    except Cancelled:
+        return ""
     except pytesseract.TesseractNotFoundError as e:
         # This error is now handled by the dependency_checker,
         # but is kept here as a failsafe.
@@ -23,4 +189,311 @@ def extract_text_from_image(image_bytes):
         raise e
     except Exception as e:
         print(f"An error occurred during OCR: {e}")
-        return ""
\ No newline at end of file
+        return ""
+
+
+def render_gray(page, dpi, clip=None):
+    """
+    Renders a page (or a clip of it) as 8-bit grayscale, a third of the RGB size;
+    Tesseract binarizes internally, so colour adds nothing. Returns (pixmap, PIL image),
+    where the image shares the pixmap's memory: keep the pixmap alive while using it and drop the image first.
+    """
+    import fitz
+    pix = page.get_pixmap(dpi=dpi, clip=clip, colorspace=fitz.csGRAY)
+    return pix, _pixmap_to_image(pix)
+
+
+def extract_text_from_page(page, dpi, profile=None):
+    """Renders a page in grayscale and OCRs it without a PNG round trip."""
+    pix, image = render_gray(page, dpi)
+    text = extract_text_from_pil(image, profile)
+    del image  # release the view before the pixmap it points into
+    return text
+
+
+# --- Adaptive DPI ---
+
+def mean_confidence(words):
+    """Mean Tesseract confidence (0-100) of the recognized words, or None if there are none."""
+    confidences = [word['conf'] for word in words if word['conf'] >= 0]
+    return sum(confidences) / len(confidences) if confidences else None
+
+
+def _ocr_region(page, dpi, profile, clip=None):
+    """OCRs a page region and returns its words with 'rect' set to page coordinates (points)."""
+    import fitz
+    pix, image = render_gray(page, dpi, clip)
+    words = ocr_words(image, profile)
+    del image  # release the view before the pixmap it points into
+    origin = clip if clip is not None else page.rect
+    scale = dpi / 72
+    for word in words:
+        x0 = origin.x0 + word['left'] / scale
+        y0 = origin.y0 + word['top'] / scale
+        word['rect'] = fitz.Rect(x0, y0, x0 + word['width'] / scale, y0 + word['height'] / scale)
+    return words
+
+
+def _group_blocks(words):
+    blocks = {}
+    for word in words:
+        blocks.setdefault(word['block'], []).append(word)
+    return blocks
+
+
+def extract_text_adaptive(page, max_dpi, profile=None):
+    """
+    OCRs a page starting at the lowest DPI step, re-rendering only what Tesseract was unsure of.
+    Text blocks below OCR_ADAPTIVE_MIN_CONFIDENCE are re-rendered at the next DPI step and
+    replaced when the new result is more confident; if most words are poor, the whole page
+    is re-rendered instead. Returns (text, info) with the highest DPI used and the mean confidence.
+    """
+    profile = profile or get_profile()
+    threshold = config.OCR_ADAPTIVE_MIN_CONFIDENCE
+    steps = [dpi for dpi in config.OCR_ADAPTIVE_DPI_STEPS if dpi < max_dpi] + [max_dpi]
+    pytesseract = _get_pytesseract()
+    try:
+        with thread_limit(profile):
+            words, dpi, regions_retried = _adaptive_passes(page, steps, threshold, profile)
+    except pytesseract.TesseractNotFoundError as e:
+        print(f"Tesseract Not Found Error: {e}")
+        raise
+    except Exception as e:
+        print(f"An error occurred during adaptive OCR: {e}")
+        return "", {'dpi': None, 'confidence': None, 'regions_retried': 0}
+
+    confidence = mean_confidence(words)
+    return words_to_text(words), {'dpi': dpi, 'confidence': confidence, 'regions_retried': regions_retried}
+
+
+def _adaptive_passes(page, steps, threshold, profile):
+    import fitz
+
+    dpi = steps[0]
+    words = _ocr_region(page, dpi, profile)
+    regions_retried = 0
+    for next_dpi in steps[1:]:
+        if _cancelled():
+            break
+        weak_blocks = {block: block_words for block, block_words in _group_blocks(words).items()
+                       if mean_confidence(block_words) is not None and mean_confidence(block_words) < threshold}
+        weak_words = sum(len(block_words) for block_words in weak_blocks.values())
+        if not words or weak_words > len(words) / 2:
+            # Mostly poor (or nothing found): a better full page beats many small regions
+            if needs_tiling(page, next_dpi):
+                break
+            retry = _ocr_region(page, next_dpi, profile)
+            if (mean_confidence(retry) or 0) >= (mean_confidence(words) or 0):
+                words = retry
+            dpi = next_dpi
+            continue
+        if not weak_blocks:
+            break
+
+        replaced = []
+        for block, block_words in _group_blocks(words).items():
+            if block not in weak_blocks:
+                replaced.extend(block_words)
+                continue
+            clip = fitz.Rect(block_words[0]['rect'])
+            for word in block_words[1:]:
+                clip |= word['rect']
+            clip = (clip + (-4, -4, 4, 4)) & page.rect
+            retry = _ocr_region(page, next_dpi, profile, clip)
+            regions_retried += 1
+            if retry and (mean_confidence(retry) or 0) > (mean_confidence(block_words) or 0):
+                # Keep the new words together as sub-blocks of the block they replace
+                for word in retry:
+                    word['block'] = (block, word['block'])
+                replaced.extend(retry)
+            else:
+                replaced.extend(block_words)
+        words = replaced
+        dpi = next_dpi
+    return words, dpi, regions_retried
+
+
+# --- Tiled OCR ---
+
+def estimate_ocr_memory(page, dpi):
+    """Approximate peak bytes needed to OCR the whole page at once as 8-bit grayscale."""
+    width = page.rect.width * dpi / 72
+    height = page.rect.height * dpi / 72
+    return int(width * height * _OCR_MEMORY_FACTOR)
+
+
+def needs_tiling(page, dpi):
+    return estimate_ocr_memory(page, dpi) > config.OCR_MAX_MEMORY_MB * 1024 * 1024
+
+
+def _pixmap_to_image(pix):
+    """Wraps a grayscale or RGB pixmap as a PIL image without copying the pixels."""
+    from PIL import Image
+    mode = "L" if pix.n == 1 else "RGB"
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, 0, 1)
+
+
+def ocr_words(image, profile=None):
+    """
+    Runs Tesseract on a PIL image and returns the recognized words as dicts with
+    text, conf, position (left, top, width, height in pixels) and block/par/line numbers.
+    """
+    profile = profile or get_profile()
+    pytesseract = _get_pytesseract()
+    try:
+        data = pytesseract.image_to_data(preprocess(image, profile['preprocess']), lang=profile['lang'],
+                                         config=tesseract_args(profile), output_type=pytesseract.Output.DICT)
+    except Cancelled:
+        return []
+    words = []
+    for i, text in enumerate(data['text']):
+        if not text.strip():
+            continue
+        words.append({
+            'text': text,
+            'conf': float(data['conf'][i]),
+            'left': data['left'][i], 'top': data['top'][i],
+            'width': data['width'][i], 'height': data['height'][i],
+            'block': data['block_num'][i], 'par': data['par_num'][i], 'line': data['line_num'][i],
+        })
+    return words
+
+
+def words_to_text(words):
+    """Rebuilds text from ocr_words() output: words joined per line, a blank line between blocks."""
+    lines = []
+    current_key = None
+    current_block = None
+    for word in words:
+        key = (word.get('band', 0), word['block'], word['par'], word['line'])
+        if key != current_key:
+            block = (word.get('band', 0), word['block'])
+            # Block numbers restart in every band, and a band's first block usually continues the previous one
+            if current_block is not None and block[0] == current_block[0] and block != current_block:
+                lines.append("")
+            lines.append(word['text'])
+            current_key, current_block = key, block
+        else:
+            lines[-1] += " " + word['text']
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _band_spans(top, bottom, width_px, px_per_unit, overlap):
+    """(top, bottom) of overlapping horizontal bands, in the caller's units, that each fit the memory ceiling."""
+    workers = max(1, config.OCR_TILE_WORKERS)
+    budget = config.OCR_MAX_MEMORY_MB * 1024 * 1024 / workers
+    # Height of a band so that width x height x factor stays within the budget
+    band_height = budget / (_OCR_MEMORY_FACTOR * width_px) / px_per_unit
+    band_height = max(band_height, 2 * overlap)
+
+    spans = []
+    while True:
+        band_bottom = min(top + band_height, bottom)
+        spans.append((top, band_bottom))
+        if band_bottom >= bottom:
+            return spans
+        top = band_bottom - overlap
+
+
+def _band_rects(page, dpi):
+    """Splits the page into overlapping horizontal bands that each fit the memory ceiling."""
+    import fitz
+
+    rect = page.rect
+    spans = _band_spans(rect.y0, rect.y1, rect.width * dpi / 72, dpi / 72, config.OCR_TILE_OVERLAP)
+    return [fitz.Rect(rect.x0, top, rect.x1, bottom) for top, bottom in spans]
+
+
+def extract_text_tiled(page, dpi, profile=None):
+    """
+    OCRs a page band by band to cap peak memory, for large-format or high-DPI pages.
+    Neighbouring bands overlap by OCR_TILE_OVERLAP points. Each word is kept only by the
+    band that owns its centre (the band's area minus half of each overlap), so lines cut
+    at a band edge are taken from the band in which they are complete, and none are duplicated.
+    Text is ordered band by band, so multi-column pages are read column by column within each band.
+    """
+    import fitz
+
+    def render(band):
+        return page.get_pixmap(dpi=dpi, clip=band, colorspace=fitz.csGRAY)
+
+    return _ocr_bands(_band_rects(page, dpi), render, _pixmap_to_image, dpi / 72, config.OCR_TILE_OVERLAP, profile)
+
+
+def image_needs_tiling(image):
+    """Like needs_tiling(), for an already decoded image (an image file's frame)."""
+    return image.width * image.height * _OCR_MEMORY_FACTOR > config.OCR_MAX_MEMORY_MB * 1024 * 1024
+
+
+def extract_text_tiled_image(image, profile=None):
+    """
+    extract_text_tiled() for a decoded image: Tesseract gets one band at a time instead of
+    the whole image. Bands are in pixels; the overlap is OCR_TILE_OVERLAP points at the image's DPI.
+    """
+    import fitz
+
+    dpi = image.info.get('dpi', (300, 300))[0] or 300
+    overlap = config.OCR_TILE_OVERLAP * dpi / 72
+    bands = [fitz.Rect(0, top, image.width, bottom)
+             for top, bottom in _band_spans(0, image.height, image.width, 1, overlap)]
+
+    def render(band):
+        return image.crop((0, int(band.y0), image.width, int(round(band.y1))))
+
+    return _ocr_bands(bands, render, lambda band_image: band_image, 1, overlap, profile)
+
+
+def _ocr_bands(bands, render, to_image, scale, overlap, profile=None):
+    """
+    Shared loop of the tiled OCR functions. render(band) returns a band's pixels (rendered on this
+    thread), to_image() turns them into a PIL image on the OCR thread, and `scale` is pixels per
+    band unit. Bands are recognized on OCR_TILE_WORKERS threads.
+    """
+    profile = profile or get_profile()
+    half_overlap = overlap / 2
+
+    token = getattr(_local, 'token', None)
+
+    def recognize(index, band, pixels):
+        # Runs on a pool thread, which needs the token and the thread cap of its own
+        with cancellable(token), thread_limit(profile, workers):
+            return recognize_band(index, band, pixels)
+
+    def recognize_band(index, band, pixels):
+        image = to_image(pixels)
+        owned_top = band.y0 + half_overlap if index > 0 else float('-inf')
+        owned_bottom = band.y1 - half_overlap if index < len(bands) - 1 else float('inf')
+        kept = []
+        for word in ocr_words(image, profile):
+            centre = band.y0 + (word['top'] + word['height'] / 2) / scale
+            if owned_top <= centre < owned_bottom:
+                word['band'] = index
+                kept.append(word)
+        return kept
+
+    results = [None] * len(bands)
+    workers = max(1, config.OCR_TILE_WORKERS)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = {}
+            for index, band in enumerate(bands):
+                if _cancelled():
+                    break
+                # Render on this thread (PyMuPDF is not thread-safe); keep at most `workers` bands in memory
+                while len(in_flight) >= workers:
+                    finished, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        results[in_flight.pop(future)] = future.result()
+                pixels = render(band)
+                in_flight[executor.submit(recognize, index, band, pixels)] = index
+                del pixels
+            for future, index in in_flight.items():
+                results[index] = future.result()
+    except _get_pytesseract().TesseractNotFoundError as e:
+        print(f"Tesseract Not Found Error: {e}")
+        raise
+    except Exception as e:
+        print(f"An error occurred during tiled OCR: {e}")
+        return ""
+
+    return words_to_text([word for band_words in results if band_words for word in band_words])
@@ -1,26 +1,46 @@
 import os
 import time
-import fitz
+import sqlite3
 from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
 
 from . import ocr_handler
 from . import nlp_handler
+from .throughput import ThroughputModel, CHARS_PER_TOKEN
+from .text_cleanup import BoilerplateFilter
+from .search_index import SearchIndex
+from .input_adapters import open_document, document_kind
+from .run_manifest import RunManifest, file_sha256, read_page_text
+from . import dedupe
+from . import compression
+from . import routing
+from .scheduling import PageScheduler, parse_page_ranges, skim_sample
+from .llm_handler import build_overview_messages
+from src.utils.tracing import Tracer
+from src.utils.cancellation import CancelToken, Cancelled
 import config
 
+PREVIEW_FILE = "preview_text.txt"
+OVERVIEW_FILE = "overview.md"
+
+
 class AnalysisSignals(QObject):
     finished = pyqtSignal(str)
     progress = pyqtSignal(int)
     status_changed = pyqtSignal(str)
     page_processed = pyqtSignal(int, int, str)
+    raw_text_saved = pyqtSignal(str, int, int, int)  # raw_text.txt path, page, start and end byte offsets
+    preview_saved = pyqtSignal(str, int, int, int)   # the same for a page's quick-pass text in preview_text.txt
+    overview_ready = pyqtSignal(str)                 # skim mode's document overview, with its coverage
     page_summary_ready = pyqtSignal(int, int, str)
     summary_header = pyqtSignal(int, int)
     token_received = pyqtSignal(str)
     detailed_progress = pyqtSignal(int, int, str, str)
+    stage_metrics = pyqtSignal(object)  # {stage: total seconds} so far
     log = pyqtSignal(str)
     error = pyqtSignal(str)
 
 class AnalysisPipeline(QRunnable):
-    def __init__(self, file_path, user_instructions, processing_options, llm_handler, signals):
+    def __init__(self, file_path, user_instructions, processing_options, llm_handler, signals, resume_dir=None):
         super().__init__()
         self.file_path = file_path
         self.user_instructions = user_instructions
@@ -28,9 +48,60 @@ class AnalysisPipeline(QRunnable):
         self.llm_handler = llm_handler
         self.signals = signals
         self._is_running = True
+        self.cancel = CancelToken()  # interrupts OCR, NLP and inference midway when the run is stopped
+        self.stop_latency = None
+        self._progress = 0
+        self.llm_stats = []
+        self.tracer = Tracer()
+        self.throughput = None
+        self._start_time = None
+        self.ocr_pages = {}  # page -> final DPI and mean confidence of adaptive OCR
+        self.ocr_profile = None
+        self.resume_dir = resume_dir
+        self.output_path = None
+        self.manifest = None
+        self._page_checkpoints = {}  # page -> raw_text.txt end offset, artifacts and text size
+        self.dedupe = dedupe.DuplicateDetector() if config.DEDUP_ENABLED else None
+        self._duplicates = {}      # page -> {'of': earlier page, 'changes': only the diff is summarized}
+        self._summaries = {}       # page -> (summary, failed), for pages that repeat it
+        self._raw_text_spans = {}  # page -> (start, end) byte offsets in raw_text.txt
+        self.text_filter = BoilerplateFilter() if config.CLEANUP_ENABLED else None
+        self.cleanup_totals = {'chars_before': 0, 'chars_after': 0, 'lines_removed': 0}
+        self.compression_totals = {'pages': 0, 'tokens_before': 0, 'tokens_after': 0, 'seconds_saved': 0.0}
+        self.search = None
+        self._search_texts = {}  # page -> text, until its summary is done and it is indexed
+        self._page_models = {}   # page -> model its summary was routed to
+        self._schedulers = []    # page queues in use, which prioritize_page() reorders
+        self._pages_started = 0
+        self._pages_total = 0    # pages the run covers: the document, a page range or a skim sample
 
     def stop(self):
         self._is_running = False
+        self.cancel.cancel()
+
+    def prioritize_page(self, page_number):
+        """Moves a page that has not been processed yet to the front. Safe to call from the GUI thread."""
+        return any([scheduler.prioritize(page_number) for scheduler in list(self._schedulers)])
+
+    def _emit_progress(self, percent):
+        # Summaries of a page batch finish after later pages were extracted; never move the dial backwards
+        if percent > self._progress:
+            self._progress = percent
+            self.signals.progress.emit(percent)
+
+    def _update_progress(self):
+        """Drives the dial from the throughput model's share of completed work."""
+        self._emit_progress(int(self.throughput.progress() * 100))
+
+    @staticmethod
+    def _format_duration(seconds):
+        return time.strftime("%H:%M:%S" if seconds >= 3600 else "%M:%S", time.gmtime(seconds))
+
+    def _emit_detailed_progress(self, current_page):
+        elapsed_str = self._format_duration(time.time() - self._start_time)
+        # Until a stage has been measured on this document the prediction is just the defaults
+        eta_str = self._format_duration(self.throughput.remaining_seconds()) if self.throughput.calibrated else "..."
+        self.signals.detailed_progress.emit(current_page, self._pages_total, elapsed_str, eta_str)
 
     def _create_output_folder(self):
         if not os.path.exists(config.OUTPUT_DIR): os.makedirs(config.OUTPUT_DIR)
@@ -58,150 +129,935 @@ class AnalysisPipeline(QRunnable):
         os.makedirs(output_path)
         return output_path
 
+    def _options_for(self, kind):
+        """Processing options adjusted to the input: text has nothing to OCR, images are OCR'd as they are."""
+        options = dict(self.processing_options)
+        if kind == "text":
+            options.update(ocr=False, images=False, tables=False)
+        elif kind == "image":
+            options.update(ocr=True, images=False, tables=False)
+        return options
+
+    def _extract_page_text(self, doc, kind, page, current_page, options, image=None):
+        """Sub-step 1: gets a page's text from the input adapter, the text layer or OCR. `image` is an image input's decoded frame."""
+        ocr_dpi = options.get('ocr_dpi', 200)
+        if kind == "text":
+            with self.tracer.span("text", current_page) as text_span:
+                page_text = doc.page_text(current_page - 1)
+            self.throughput.complete(current_page, 'text', len(page_text), text_span['duration'])
+        elif kind == "image" and ocr_handler.image_needs_tiling(image):
+            self.signals.log.emit(f"  > Tiled OCR (original image, {image.width}x{image.height} px)...")
+            with self.tracer.span("ocr", current_page, tiled=True) as ocr_span:
+                page_text = ocr_handler.extract_text_tiled_image(image, self.ocr_profile)
+            self.throughput.complete(current_page, 'ocr', seconds=ocr_span['duration'])
+        elif kind == "image":
+            self.signals.log.emit(f"  > OCR (original image)...")
+            with self.tracer.span("ocr", current_page) as ocr_span:
+                page_text = ocr_handler.extract_text_from_pil(image, self.ocr_profile)
+            self.throughput.complete(current_page, 'ocr', seconds=ocr_span['duration'])
+        elif options.get('ocr', True) and ocr_handler.needs_tiling(page, ocr_dpi):
+            # Large-format or high-DPI page: render and recognize it in bands to cap memory
+            self.signals.log.emit(f"  > Tiled OCR (DPI: {ocr_dpi}, large page)...")
+            with self.tracer.span("ocr", current_page, dpi=ocr_dpi, tiled=True) as ocr_span:
+                page_text = ocr_handler.extract_text_tiled(page, ocr_dpi, self.ocr_profile)
+            self.throughput.complete(current_page, 'ocr', seconds=ocr_span['duration'])
+        elif options.get('ocr', True) and options.get('ocr_adaptive', False):
+            # Low-DPI grayscale first; only low-confidence blocks are re-rendered, up to ocr_dpi
+            self.signals.log.emit(f"  > Adaptive OCR (up to {ocr_dpi} DPI)...")
+            with self.tracer.span("ocr", current_page, max_dpi=ocr_dpi, adaptive=True) as ocr_span:
+                page_text, info = ocr_handler.extract_text_adaptive(page, ocr_dpi, self.ocr_profile)
+            self.ocr_pages[current_page] = info
+            if info['dpi'] is not None:
+                confidence = f"{info['confidence']:.0f}%" if info['confidence'] is not None else "N/A"
+                self.signals.log.emit(f"    - Final DPI: {info['dpi']}, mean confidence: {confidence}"
+                                      f" ({info['regions_retried']} regions re-scanned)")
+            self.throughput.complete(current_page, 'ocr', seconds=ocr_span['duration'])
+        elif options.get('ocr', True):
+            self.signals.log.emit(f"  > OCR (DPI: {ocr_dpi})...")
+            with self.tracer.span("render", current_page, dpi=ocr_dpi) as render_span:
+                pix, image = ocr_handler.render_gray(page, ocr_dpi)
+            with self.tracer.span("ocr", current_page) as ocr_span:
+                page_text = ocr_handler.extract_text_from_pil(image, self.ocr_profile)
+            del image, pix
+            self.throughput.complete(current_page, 'ocr', seconds=render_span['duration'] + ocr_span['duration'])
+        else:
+            self.signals.log.emit(f"  > Extracting Text...")
+            with self.tracer.span("text", current_page) as text_span:
+                page_text = page.get_text()
+            self.throughput.complete(current_page, 'text', len(page_text), text_span['duration'])
+        self.throughput.set_text(current_page, len(page_text))
+        return page_text
+
+    def _preview_page_text(self, doc, kind, page_number, options, picked):
+        """
+        Quick text of a page: its text layer. A page without one gets low-DPI OCR only if the user
+        picked it; otherwise it waits for full OCR. Returns (text or None, OCR used).
+        """
+        if kind == "text":
+            return doc.page_text(page_number - 1), False
+        page = doc[page_number - 1]
+        page_text = page.get_text()
+        if len(page_text.strip()) >= config.PREVIEW_MIN_TEXT_CHARS or not options.get('ocr', True):
+            return page_text, False
+        if not picked:
+            return None, False
+        dpi = min(config.PREVIEW_OCR_DPI, options.get('ocr_dpi', 200))
+        if ocr_handler.needs_tiling(page, dpi):
+            return ocr_handler.extract_text_tiled(page, dpi, self.ocr_profile), True
+        return ocr_handler.extract_text_from_page(page, dpi, self.ocr_profile), True
+
+    def _preview_pages(self, doc, kind, pages, options, output_path):
+        """
+        Phase 1: a quick text-layer pass over the pages still to do, saved to preview_text.txt and
+        shown right away, before full OCR and summarization. Pages asked for in the viewer go first
+        here too; the caller's scheduler is registered as well, so they also go first in the full pass.
+        """
+        self.signals.log.emit(f"👀 Quick preview of {len(pages)} pages...")
+        scheduler = PageScheduler(pages)
+        self._schedulers.append(scheduler)
+        start = time.perf_counter()
+        previewed = ocr_pages = skipped = 0
+        preview_path = os.path.join(output_path, PREVIEW_FILE)
+        try:
+            with open(preview_path, 'w', encoding='utf-8') as f:
+                while self._is_running:
+                    page_number = scheduler.next()
+                    if page_number is None:
+                        break
+                    with self.tracer.span("preview", page_number), ocr_handler.cancellable(self.cancel):
+                        page_text, used_ocr = self._preview_page_text(doc, kind, page_number, options,
+                                                                      scheduler.is_prioritized(page_number))
+                    self.cancel.check()
+                    if page_text is None:
+                        skipped += 1
+                        continue
+                    preview_start = f.tell()
+                    f.write(f"--- Page {page_number} ---\n{page_text}\n\n")
+                    f.flush()
+                    self.signals.preview_saved.emit(preview_path, page_number, preview_start, f.tell())
+                    previewed += 1
+                    ocr_pages += used_ocr
+        finally:
+            self._schedulers.remove(scheduler)
+        self.signals.log.emit(f"👀 Preview of {previewed} pages ready in {time.perf_counter() - start:.1f}s"
+                              f"{f' ({ocr_pages} by low-DPI OCR)' if ocr_pages else ''}"
+                              f"{f', {skipped} scanned pages wait for full OCR' if skipped else ''}. Starting full processing...")
+
+    def _extract_images(self, doc, page, current_page, output_path, ocr_dpi):
+        """Saves the page's embedded images (or a render of the page) and returns the file names."""
+        saved = []
+        image_list = page.get_images(full=True)
+        if image_list:
+             self.signals.log.emit(f"    - Found {len(image_list)} images.")
+             for img_index, img in enumerate(image_list, start=1):
+                 self.cancel.check()
+                 xref = img[0]
+                 base_image = doc.extract_image(xref)
+                 image_bytes = base_image["image"]
+                 image_ext = base_image["ext"]
+                 img_filename = f"page_{current_page}_img_{img_index}.{image_ext}"
+                 img_filepath = os.path.join(output_path, img_filename)
+                 with open(img_filepath, "wb") as f:
+                     f.write(image_bytes)
+                 saved.append(img_filename)
+        else:
+             self.signals.log.emit(f"    - No embedded images. Saving page render.")
+             img_filename = f"page_{current_page}_render.png"
+             pix = page.get_pixmap(dpi=ocr_dpi)
+             pix.save(os.path.join(output_path, img_filename))
+             saved.append(img_filename)
+        return saved
+
+    def _extract_tables(self, page, current_page, output_path):
+        """Saves each table found on the page as CSV and returns the file names."""
+        saved = []
+        try:
+            tables = page.find_tables()
+            if tables.tables:
+                 self.signals.log.emit(f"  > Extracting Tables ({len(tables.tables)} found)...")
+                 for table_index, table in enumerate(tables.tables, start=1):
+                     df = table.to_pandas()
+                     csv_filename = f"page_{current_page}_table_{table_index}.csv"
+                     csv_path = os.path.join(output_path, csv_filename)
+                     df.to_csv(csv_path, index=False)
+                     saved.append(csv_filename)
+                     self.signals.log.emit(f"    - Saved: {csv_filename}")
+        except Exception as e:
+            self.signals.log.emit(f"    ⚠️ Table extraction failed (or not supported): {e}")
+        return saved
+
+    def _clean_page_text(self, current_page, page_text):
+        """Strips headers, footers and layout noise from the text sent to NLP and the LLM."""
+        with self.tracer.span("cleanup", current_page):
+            cleaned, lines_removed = self.text_filter.clean(page_text)
+        self.cleanup_totals['chars_before'] += len(page_text)
+        self.cleanup_totals['chars_after'] += len(cleaned)
+        self.cleanup_totals['lines_removed'] += lines_removed
+        saved_tokens = (len(page_text) - len(cleaned)) // CHARS_PER_TOKEN
+        if lines_removed or saved_tokens > 0:
+            self.signals.log.emit(f"  > Cleanup: {lines_removed} boilerplate line(s) removed, "
+                                  f"~{saved_tokens} tokens saved ({1 - len(cleaned) / max(len(page_text), 1):.0%})")
+        # The prompt estimate follows the text that is actually sent
+        self.throughput.set_text(current_page, len(cleaned))
+        return cleaned
+
+    def _compress_page(self, current_page, page_text, nlp_data):
+        """Keeps only the page's top-ranked sentences for the prompt (extractive compression)."""
+        with self.tracer.span("compress", current_page):
+            compressed, stats = compression.compress(page_text, nlp_data)
+        if stats is None:
+            return page_text
+        # Prompt eval time saved, at the prompt rate measured so far
+        seconds_saved = (stats['tokens_before'] - stats['tokens_after']) / self.throughput.rates['prompt']
+        totals = self.compression_totals
+        totals['pages'] += 1
+        totals['tokens_before'] += stats['tokens_before']
+        totals['tokens_after'] += stats['tokens_after']
+        totals['seconds_saved'] += seconds_saved
+        self.signals.log.emit(f"  > Compression: kept {stats['kept_sentences']}/{stats['sentences']} sentences, "
+                              f"~{stats['tokens_before']} -> ~{stats['tokens_after']} tokens "
+                              f"({stats['tokens_after'] / stats['tokens_before']:.0%}), "
+                              f"~{seconds_saved:.1f}s prompt eval saved")
+        self.throughput.set_text(current_page, len(compressed))
+        return compressed
+
+    def _log_compression_summary(self):
+        totals = self.compression_totals
+        if totals['pages']:
+            self.signals.log.emit(
+                f"🗜️ Compression: {totals['pages']} pages sent at "
+                f"{totals['tokens_after'] / totals['tokens_before']:.0%} of their tokens "
+                f"(~{totals['tokens_before'] - totals['tokens_after']} tokens, ~{totals['seconds_saved']:.1f}s prompt eval saved)")
+
+    # --- Model routing ---
+
+    def _route_page(self, page_number, page_text, nlp_data, tables=0):
+        """Sends a page to the small or the large model by its complexity score."""
+        ocr_info = self.ocr_pages.get(page_number)
+        features = routing.page_features(page_text, nlp_data, tables, ocr_info['confidence'] if ocr_info else None)
+        score = routing.complexity_score(features)
+        large = score >= config.ROUTING_THRESHOLD
+        model = self.llm_handler.model_name if large else self.llm_handler.small_model_name
+        self._page_models[page_number] = model
+        self.signals.log.emit(f"  > Routing: complexity {score:.2f} -> {'large' if large else 'small'} model ({model})")
+        return model
+
+    def _model_marker(self, page_number):
+        model = self._page_models.get(page_number)
+        return f" [{model}]" if model else ""
+
+    def _model_throughput(self):
+        """Pages, tokens and decode speed per model, for runs whose pages were routed."""
+        models = {}
+        for st in self.llm_stats:
+            if 'model' not in st:
+                continue
+            totals = models.setdefault(st['model'], {'pages': 0, 'completion_tokens': 0, 'seconds': 0.0,
+                                                     'decode_seconds': 0.0})
+            totals['pages'] += 1
+            totals['completion_tokens'] += st['completion_tokens']
+            totals['seconds'] += st['elapsed']
+            totals['decode_seconds'] += st['elapsed'] - (st['time_to_first_token'] or 0)
+        for totals in models.values():
+            totals['tokens_per_second'] = (totals['completion_tokens'] / totals['decode_seconds']
+                                           if totals['decode_seconds'] > 0 else 0.0)
+        return models
+
+    def _log_routing_summary(self):
+        for model, totals in self._model_throughput().items():
+            self.signals.log.emit(f"🔀 {model}: {totals['pages']} pages, {totals['tokens_per_second']:.1f} tok/s, "
+                                  f"{totals['seconds'] / totals['pages']:.1f}s per page")
+
+    # --- Duplicate pages ---
+
+    def _reuses_summary(self, page_number):
+        duplicate = self._duplicates.get(page_number)
+        return bool(duplicate) and not duplicate['changes']
+
+    def _duplicate_label(self, page_number):
+        duplicate = self._duplicates.get(page_number)
+        if not duplicate:
+            return ""
+        if duplicate['changes']:
+            return f"(Repeats page {duplicate['of']}; summary of the changes only.) "
+        return f"(Same as page {duplicate['of']}.) "
+
+    def _duplicate_marker(self, page_number):
+        duplicate = self._duplicates.get(page_number)
+        if not duplicate:
+            return ""
+        return f" ({'near-duplicate' if duplicate['changes'] else 'duplicate'} of page {duplicate['of']})"
+
+    def _read_raw_page(self, page_number):
+        """Reads an earlier page's text back from raw_text.txt instead of keeping every page in memory."""
+        with open(os.path.join(self.output_path, "raw_text.txt"), 'rb') as f:
+            return read_page_text(f, *self._raw_text_spans[page_number])
+
+    def _match_scanned_image(self, page, image, current_page, checkpoint):
+        """
+        Before OCR: the earlier page whose thumbnail looks the same as this one, or None. The page is
+        still OCR'd; the match only nominates the page its text is compared with in _check_duplicate().
+        """
+        with self.tracer.span("dedupe", current_page):
+            if image is not None:
+                image_hash = dedupe.image_hash(image)
+            else:
+                image_hash = dedupe.page_image_hash(page)
+        original = self.dedupe.match_image(image_hash)
+        self.dedupe.add_image(current_page, image_hash)
+        checkpoint['image_hash'] = f"{image_hash:x}"
+        return original
+
+    def _check_duplicate(self, current_page, page_text, checkpoint, looks_like=None):
+        """
+        Compares the page's text with earlier pages. Returns the text to summarize: the page itself,
+        only its changes for a near repeat, or None when an exact repeat reuses the earlier summary.
+        `looks_like` is a page with the same thumbnail; if the text check finds nothing, the page's
+        text is diffed against it, so OCR noise on a rescanned page does not hide the repeat.
+        """
+        with self.tracer.span("dedupe", current_page):
+            text_fingerprint = dedupe.fingerprint(page_text)
+            original, exact = self.dedupe.match_text(text_fingerprint)
+            if original is None and looks_like is not None and text_fingerprint[2] >= config.DEDUP_MIN_WORDS:
+                original = looks_like
+            self.dedupe.add_text(current_page, text_fingerprint)
+            added = removed = None
+            if original is not None and not exact:
+                original_text = self._read_raw_page(original)
+                if self.text_filter:
+                    original_text = self.text_filter.clean(original_text, learn=False)[0]
+                added, removed, changed = dedupe.text_diff(original_text, page_text)
+                if changed > config.DEDUP_MAX_CHANGED_RATIO:
+                    original = None
+                elif not added and not removed:
+                    exact = True  # only spacing or punctuation differs
+        digest, value, words = text_fingerprint
+        checkpoint['fingerprint'] = [digest, f"{value:x}", words]
+        if original is None:
+            return page_text
+
+        self._duplicates[current_page] = {'of': original, 'changes': not exact}
+        checkpoint['duplicate_of'] = original
+        checkpoint['duplicate_changes'] = not exact
+        if exact:
+            self.signals.log.emit(f"  > Same text as page {original}: reusing its summary.")
+            return None
+        self.signals.log.emit(f"  > Near-duplicate of page {original}: summarizing only the "
+                              f"{len(added)} changed line(s).")
+        diff_text = f"This page repeats page {original} with changes. Lines added or changed:\n" + "\n".join(added)
+        if removed:
+            diff_text += "\nLines removed:\n" + "\n".join(removed)
+        return diff_text
+
+    def _summarize_pending(self, pending, final_summary_parts, total_pages):
+        """
+        Summarizes a batch of (page_number, text, nlp_data) entries concurrently.
+        Tokens of the earliest unfinished page stream live; later pages are buffered
+        and replayed once the pages before them are done, so output stays in page order.
+        """
+        temperature = self.processing_options.get('temperature', 0.2)
+        buffers = [[] for _ in pending]
+        results = [None] * len(pending)
+        failed = [False] * len(pending)
+        # Repeated pages are labelled in the summary; exact repeats reuse the earlier summary
+        # and take no inference slot
+        prefixes = [self._duplicate_label(page_number) for page_number, _, _ in pending]
+        jobs = [i for i, (page_number, _, _) in enumerate(pending) if not self._reuses_summary(page_number)]
+        if len(jobs) > 1:
+            # Requested pages jump the queue, so a batch is not always a contiguous range
+            page_list = ", ".join(str(pending[i][0]) for i in jobs)
+            self.signals.log.emit(f"  > AI Summarization of pages {page_list} "
+                                  f"across {self.llm_handler.process.size} workers...")
+        elif jobs:
+            self.signals.log.emit(f"  > AI Summarization...")
+        head = 0
+        window_start = time.time()
+        window_tokens = 0
+
+        def begin(index):
+            self.signals.summary_header.emit(pending[index][0], total_pages)
+            if prefixes[index]:
+                self.signals.token_received.emit(prefixes[index])
+            for token in buffers[index]:
+                self.signals.token_received.emit(token)
+
+        def advance():
+            """Completes every page at the head that has finished, then streams the next one."""
+            nonlocal head
+            while head < len(pending):
+                page_number = pending[head][0]
+                if results[head] is None and self._reuses_summary(page_number):
+                    summary, failed[head] = self._summaries[self._duplicates[page_number]['of']]
+                    results[head] = prefixes[head] + summary
+                if results[head] is None:
+                    return
+                if not buffers[head] and results[head]:
+                    self.signals.token_received.emit(results[head][len(prefixes[head]):])
+                self.signals.page_summary_ready.emit(page_number, total_pages, results[head])
+                if self._reuses_summary(page_number) and self._duplicates[page_number]['of'] in self._page_models:
+                    self._page_models[page_number] = self._page_models[self._duplicates[page_number]['of']]
+                heading = f"## Page {page_number} Summary{self._duplicate_marker(page_number)}{self._model_marker(page_number)}"
+                final_summary_parts.append((page_number, f"{heading}\n{results[head]}"))
+                self._summaries[page_number] = (results[head], failed[head])
+                self._checkpoint_page(page_number, results[head], failed[head])
+                self._update_progress()
+                # The page counter tracks extraction, which is already past this batch
+                self._emit_detailed_progress(self._pages_started)
+                head += 1
+                if head < len(pending):
+                    begin(head)
+
+        begin(0)
+        advance()
+        events = self.llm_handler.generate_summaries_parallel(
+            [(pending[i][1], pending[i][2]) for i in jobs], self.user_instructions, temperature,
+            models=[self._page_models.get(pending[i][0]) for i in jobs], cancel=self.cancel
+        ) if jobs else iter(())
+        try:
+            for job, kind, value in events:
+                if not self._is_running:
+                    break
+                index = jobs[job]
+                if kind == "token":
+                    buffers[index].append(value)
+                    if index == head:
+                        self.signals.token_received.emit(value)
+                    # Progress within the AI step follows the tokens generated so far
+                    if len(buffers[index]) % 5 == 0:
+                        self.throughput.set_generated(pending[index][0], len(buffers[index]))
+                        self._update_progress()
+                    continue
+
+                if kind == "error":
+                    self.signals.log.emit(f"    ⚠️ Summary for page {pending[index][0]} failed: {value}")
+                    results[index] = prefixes[index] + f"[Summary unavailable: {value}]"
+                    failed[index] = True
+                    self.throughput.complete(pending[index][0], 'prompt')
+                    self.throughput.complete(pending[index][0], 'decode')
+                else:
+                    results[index] = prefixes[index] + "".join(buffers[index])
+                    if value:
+                        self.throughput.observe_llm(pending[index][0], value)
+                        window_tokens += value.get('completion_tokens', 0)
+                        self.llm_stats.append(value)
+                        self.tracer.add_llm_stats(pending[index][0], value, time.perf_counter(), track=job + 1)
+                        self.signals.stage_metrics.emit(self.tracer.stage_totals())
+                        if 'acceptance_rate' in value:
+                            self.signals.log.emit(
+                                f"    - ⚡ Page {pending[index][0]}: {value['acceptance_rate']:.0%} of drafted tokens accepted, "
+                                f"{value['tokens_per_second']:.1f} tok/s effective")
+
+                advance()
+        finally:
+            if jobs:
+                events.close()
+
+        if len(pending) > 1 and window_tokens:
+            window_seconds = time.time() - window_start
+            self.signals.log.emit(f"    - {window_tokens} tokens in {window_seconds:.1f}s "
+                                  f"({window_tokens / max(window_seconds, 1e-6):.1f} tok/s aggregate)")
+
+    def _checkpoint_page(self, page_number, summary, failed=False):
+        """Records a page whose summary is done in the run manifest, so a resumed run can skip it."""
+        checkpoint = self._page_checkpoints.pop(page_number)
+        try:
+            self.manifest.record_page(page_number, summary, failed=failed, **checkpoint)
+        except OSError as e:
+            self.signals.log.emit(f"⚠️ Could not checkpoint page {page_number}: {e}")
+        if self.search:
+            try:
+                self.search.add_page(page_number, self._search_texts.pop(page_number, ""), summary,
+                                     checkpoint.get('nlp_data', ""))
+            except sqlite3.Error as e:
+                self._close_search(f"⚠️ Search index disabled for this run: {e}")
+
+    def _open_search(self, done_pages):
+        """Opens the search database and registers this run; a failure only disables search."""
+        try:
+            self.search = SearchIndex()
+            if done_pages and not self.search.is_indexed(self.output_path):
+                # A run started before it could be indexed: add the pages already done
+                self.search.index_folder(self.output_path)
+            self.search.begin_run(self.output_path, os.path.basename(self.file_path), done_pages)
+        except (sqlite3.Error, OSError) as e:
+            self._close_search(f"⚠️ Search index not available: {e}")
+
+    def _close_search(self, message=None):
+        if message:
+            self.signals.log.emit(message)
+        search, self.search = self.search, None
+        if search:
+            try:
+                search.close()
+            except sqlite3.Error as e:
+                self.signals.log.emit(f"⚠️ Could not save the search index: {e}")
+
+    def _open_run(self, total_pages):
+        """
+        Creates the run manifest, or for a resumed run checks that the document is the same file
+        and restores the pages already done. Returns (pages already done, [(page, summary part)]).
+        """
+        source_hash = file_sha256(self.file_path)
+        if not self.resume_dir:
+            self.manifest = RunManifest.create(self.output_path, self.file_path, source_hash, total_pages,
+                                               self.processing_options, self.user_instructions)
+            return set(), []
+
+        source = self.manifest.header['source']
+        if source_hash != source['sha256'] or total_pages != self.manifest.header['total_pages']:
+            raise RuntimeError(f"'{os.path.basename(self.file_path)}' does not match the document of this run "
+                               f"('{source['name']}'). The file has changed or is a different file.")
+        raw_text_end = self.manifest.rewind()
+        raw_text_path = os.path.join(self.output_path, "raw_text.txt")
+        if not os.path.exists(raw_text_path) or os.path.getsize(raw_text_path) < raw_text_end:
+            self.signals.log.emit("⚠️ raw_text.txt is incomplete; text of earlier pages is missing from it.")
+        else:
+            os.truncate(raw_text_path, raw_text_end)
+
+        summary_parts = []
+        for page_number in sorted(self.manifest.pages):
+            record = self.manifest.pages[page_number]
+            if 'duplicate_of' in record:
+                self._duplicates[page_number] = {'of': record['duplicate_of'], 'changes': record['duplicate_changes']}
+            if 'model' in record:
+                self._page_models[page_number] = record['model']
+            heading = f"## Page {page_number} Summary{self._duplicate_marker(page_number)}{self._model_marker(page_number)}"
+            summary_parts.append((page_number, f"{heading}\n{record['summary']}"))
+            self._summaries[page_number] = (record['summary'], False)
+            self._raw_text_spans[page_number] = self.manifest.page_span(page_number)
+            self.signals.raw_text_saved.emit(raw_text_path, page_number, *self._raw_text_spans[page_number])
+            if self.dedupe and 'fingerprint' in record:
+                digest, value, words = record['fingerprint']
+                self.dedupe.add_text(page_number, (digest, int(value, 16), words))
+            if self.dedupe and 'image_hash' in record:
+                self.dedupe.add_image(page_number, int(record['image_hash'], 16))
+            self.signals.summary_header.emit(page_number, total_pages)
+            self.signals.token_received.emit(record['summary'])
+            self.signals.page_summary_ready.emit(page_number, total_pages, record['summary'])
+            self.throughput.set_text(page_number, record['text_chars'])
+            self.throughput.skip(page_number)
+        done_pages = set(self.manifest.pages)
+        if self.text_filter and done_pages:
+            # Headers and footers are learned again from the text of the pages already done
+            for _, page_text, _ in self.manifest.page_texts():
+                self.text_filter.clean(page_text)
+        return done_pages, summary_parts
+
+    # --- Page selection and skim mode ---
+
+    def _select_pages(self, total_pages, options):
+        """The pages this run covers: the page range option, thinned to a stratified sample in skim mode."""
+        try:
+            pages = parse_page_ranges(options.get('pages', ""), total_pages)
+        except ValueError as e:
+            raise RuntimeError(f"Invalid page selection: {e}")
+        if options.get('skim', False):
+            sample = skim_sample(pages)
+            self.signals.log.emit(f"👀 Skim mode: summarizing {len(sample)} of {len(pages)} pages "
+                                  f"(first, last and a stratified sample in between).")
+            return sample
+        if len(pages) < total_pages:
+            self.signals.log.emit(f"📑 Page selection: {len(pages)} of {total_pages} pages.")
+        return pages
+
+    def _write_overview(self, output_path, total_pages):
+        """Writes the skim overview from the summarized pages to overview.md. Returns it as a report section."""
+        summaries = [(page, summary) for page, (summary, failed) in sorted(self._summaries.items()) if not failed]
+        if not summaries:
+            return ""
+        coverage = f"Coverage: {len(summaries)} of {total_pages} pages ({len(summaries) / total_pages:.0%})"
+        self.signals.log.emit(f"🧭 Writing the document overview from {len(summaries)} page summaries...")
+        messages = build_overview_messages(summaries, self.user_instructions, coverage)
+        with self.tracer.span("overview"):
+            overview = "".join(self.llm_handler.generate_answer_stream(
+                messages, self.processing_options.get('temperature', 0.2), config.SKIM_OVERVIEW_MAX_TOKENS, self.cancel))
+        if not self._is_running:
+            return ""
+        report = f"# Skim Overview\n{coverage}\n\n{overview.strip()}"
+        try:
+            with open(os.path.join(output_path, OVERVIEW_FILE), 'w', encoding='utf-8') as f:
+                f.write(report + "\n")
+            self.signals.log.emit(f"💾 Saved {OVERVIEW_FILE}")
+        except OSError as e:
+            self.signals.log.emit(f"⚠️ Could not save the overview: {e}")
+        self.signals.overview_ready.emit(report)
+        return report
+
+    def _log_speculative_summary(self):
+        """Reports draft acceptance and effective decode speed over the whole run."""
+        spec = [st for st in self.llm_stats if 'acceptance_rate' in st]
+        if not spec:
+            return
+        drafted = sum(st['drafted_tokens'] for st in spec)
+        accepted = sum(st['accepted_tokens'] for st in spec)
+        tokens = sum(st['completion_tokens'] for st in spec)
+        decode_seconds = sum(st['elapsed'] - (st['time_to_first_token'] or 0) for st in spec)
+        self.signals.log.emit(
+            f"⚡ Speculative decoding ({spec[0]['speculative']}): "
+            f"{accepted / drafted if drafted else 0:.0%} acceptance, "
+            f"{tokens / decode_seconds if decode_seconds > 0 else 0:.1f} tok/s effective over {len(spec)} pages"
+        )
+
+    def _write_metrics(self, output_path, prefix=""):
+        """Saves the run's spans as trace.json (Chrome trace-event format) and a metrics.json summary."""
+        try:
+            self.tracer.write_chrome_trace(os.path.join(output_path, f"{prefix}trace.json"))
+            self.tracer.write_metrics(
+                os.path.join(output_path, f"{prefix}metrics.json"),
+                document=os.path.basename(self.file_path),
+                pages=len({span['page'] for span in self.tracer.spans if span['page'] is not None}),
+                backend=self.llm_handler.backend_name,
+                model=self.llm_handler.model_name,
+                options=self.processing_options,
+                ocr_profile=self.ocr_profile,
+                ocr_pages=self.ocr_pages,
+                text_cleanup=self.cleanup_totals,
+                compression=self.compression_totals,
+                models=self._model_throughput(),
+                stop_latency_seconds=self.stop_latency,
+            )
+            self.signals.log.emit(f"📈 Saved {prefix}trace.json and {prefix}metrics.json to the output folder.")
+        except OSError as e:
+            self.signals.log.emit(f"⚠️ Could not save metrics: {e}")
+
+    def _log_engine(self):
+        """Says where inference runs for the selected backend."""
+        backend = self.llm_handler.backend_name
+        if backend == "llama_cpp":
+            runners = getattr(self.llm_handler.process, 'runners', {None: self.llm_handler.process})
+            workers = sum(runner.size for runner in runners.values())
+            self.signals.log.emit(f"✅ AI engine is running in {workers} separate worker process(es).")
+        elif backend == "openai":
+            self.signals.log.emit(f"✅ AI engine: OpenAI-compatible server at {config.LLM_SERVER_URL}.")
+        else:
+            self.signals.log.emit(f"✅ AI engine: {backend} backend (in-process).")
+
+    def _log_stopped(self):
+        """Reports a stop and how long the run took to stand down after the request (also in metrics.json)."""
+        self.stop_latency = self.cancel.latency()
+        self.signals.log.emit(f"🛑 Process stopped by user ({self.stop_latency * 1000:.0f} ms after the request).")
+
+    def _finish_run(self, final_summary_parts, total_pages, options, output_path):
+        """Closes a run that finished or was stopped: the run summaries, the skim overview and the final report."""
+        if self._is_running:
+            self.manifest.mark_complete()
+        else:
+            self._log_stopped()
+
+        self._log_speculative_summary()
+        self._log_compression_summary()
+        self._log_routing_summary()
+        self.signals.log.emit("🏁 Analysis complete. Finalizing report.")
+        final_report = "\n\n".join(part for _, part in sorted(final_summary_parts))
+        if options.get('skim', False) and self._is_running:
+            final_report = f"{self._write_overview(output_path, total_pages)}\n\n{final_report}".strip()
+        self.signals.finished.emit(final_report)
+
     def run(self):
         doc = None
+        output_path = None
+        raw_text_file = None
         try:
-            start_time = time.time()
+            self._start_time = time.time()
             self.signals.log.emit(f"▶️ Analysis started for: {os.path.basename(self.file_path)}")
             
-            output_path = self._create_output_folder()
-            self.signals.log.emit(f"📂 Created output folder: {os.path.basename(output_path)}")
-            self.signals.log.emit(f"✅ AI engine is running in a separate process.")
+            if self.resume_dir:
+                output_path = self.resume_dir
+                self.manifest = RunManifest.load(output_path)
+                # A resumed run continues with the settings it was started with
+                self.processing_options = self.manifest.header['options']
+                self.user_instructions = self.manifest.header['instructions']
+                self.signals.log.emit(f"♻️ Resuming run in: {os.path.basename(output_path)}")
+            else:
+                output_path = self._create_output_folder()
+                self.signals.log.emit(f"📂 Created output folder: {os.path.basename(output_path)}")
+            self.output_path = output_path
+            self._log_engine()
             
             self.signals.status_changed.emit('analyzing')
             
             try:
-                doc = fitz.open(self.file_path)
+                doc = open_document(self.file_path)
             except Exception as e:
                 raise RuntimeError(f"Failed to open document: {e}\nThe file may be corrupt or in an unsupported format.")
+            kind = document_kind(doc)
+            options = self._options_for(kind)
+            if options.get('ocr', True):
+                self.ocr_profile = ocr_handler.get_profile(options.get('ocr_profile'))
+                profile = self.ocr_profile
+                self.signals.log.emit(f"🔍 OCR profile: {profile['name']} (OEM {profile['oem']}, PSM {profile['psm']}, "
+                                      f"{profile['tessdata']} models)")
             
             total_pages = len(doc)
             if total_pages == 0:
                 raise RuntimeError("Document contains 0 pages. Nothing to analyze.")
+            if kind == "text":
+                self.signals.log.emit(f"📄 Plain-text input, split into {total_pages} logical pages.")
+            elif kind == "image":
+                self.signals.log.emit(f"🖼️ Image input, OCR runs on the original image ({total_pages} frame(s)).")
             self.signals.log.emit(f"✅ Detected {total_pages} pages. Starting page-by-page analysis...")
-            final_summary_parts = []
-            full_raw_text = ""
+            pending_summaries = []
 
-            # Each page has 5 sub-steps for smooth progress
-            SUB_STEPS = 5  # OCR, Images, Tables, NLP, AI Summary
-            total_steps = total_pages * SUB_STEPS
+            # Progress and ETA come from predicted work per page and measured stage rates
+            self.throughput = ThroughputModel(
+                options,
+                parallelism=self.llm_handler.parallelism,
+                max_prompt_tokens=config.MAX_TOKENS - 1024,
+                expected_completion_tokens=config.SUMMARY_MAX_TOKENS // 2,
+            )
+            self.throughput.scan(doc)
+            # A page range or skim sample is chosen again the same way when the run is resumed
+            selected = self._select_pages(total_pages, options)
+            self.throughput.select(selected)
+            done_pages, final_summary_parts = self._open_run(total_pages)
+            if config.SEARCH_ENABLED:
+                self._open_search(done_pages)
+            # Raw text is written page by page so large inputs are never held in memory twice
+            raw_text_file = open(os.path.join(output_path, "raw_text.txt"), 'a' if self.resume_dir else 'w', encoding='utf-8')
 
-            for i, page in enumerate(doc):
-                if not self._is_running:
-                    self.signals.log.emit("🛑 Process stopped by user.")
+            todo = [page for page in selected if page not in done_pages]
+            if done_pages:
+                self.signals.log.emit(f"♻️ {len(done_pages)} of {len(selected)} pages were already done. "
+                                      f"Continuing with the other {len(todo)}.")
+            # Pages run in order unless the user asks for one first. The scheduler exists before the
+            # preview, so pages picked while the preview runs are also processed first
+            scheduler = PageScheduler(todo)
+            self._schedulers.append(scheduler)
+            if options.get('preview', False) and kind != "image" and todo:
+                self._preview_pages(doc, kind, todo, options, output_path)
+            self._pages_total = len(selected)
+            self._pages_started = len(selected) - len(todo)
+
+            while self._is_running:
+                current_page = scheduler.next()
+                if current_page is None:
                     break
 
-                current_page = i + 1
-                base_step = (i) * SUB_STEPS  # completed steps from previous pages
-                self.signals.log.emit(f"--- Processing Page {current_page}/{total_pages} ---")
-                
-                elapsed_seconds = time.time() - start_time
-                elapsed_time_str = time.strftime("%M:%S", time.gmtime(elapsed_seconds))
-                time_per_page = elapsed_seconds / current_page if i > 0 else 0
-                eta_str = time.strftime("%M:%S", time.gmtime((total_pages - current_page) * time_per_page)) if i > 0 else "..."
-                self.signals.detailed_progress.emit(current_page, total_pages, elapsed_time_str, eta_str)
+                page = doc[current_page - 1] if kind == "pdf" else None
+                self._pages_started += 1
+                if scheduler.is_prioritized(current_page):
+                    self.signals.log.emit(f"--- Processing Page {current_page}/{total_pages} (requested) ---")
+                else:
+                    self.signals.log.emit(f"--- Processing Page {current_page}/{total_pages} ---")
+                self._emit_detailed_progress(self._pages_started)
 
                 # --- Sub-step 1: OCR / Text Extraction ---
-                ocr_dpi = self.processing_options.get('ocr_dpi', 200)
-                if self.processing_options.get('ocr', True):
-                    self.signals.log.emit(f"  > OCR (DPI: {ocr_dpi})...")
-                    pix = page.get_pixmap(dpi=ocr_dpi)
-                    page_text = ocr_handler.extract_text_from_image(pix.tobytes("png"))
-                else:
-                    self.signals.log.emit(f"  > Extracting Text...")
-                    page_text = page.get_text()
-                
-                self.signals.progress.emit(int(((base_step + 1) / total_steps) * 100))
+                ocr_dpi = options.get('ocr_dpi', 200)
+                checkpoint = {'artifacts': []}
+                looks_like = None
+                # An image input's frame is decoded once, for the duplicate check and OCR
+                image = doc.page_image(current_page - 1) if kind == "image" else None
+                if self.dedupe and options.get('ocr', True):
+                    looks_like = self._match_scanned_image(page, image, current_page, checkpoint)
+                with ocr_handler.cancellable(self.cancel):
+                    page_text = self._extract_page_text(doc, kind, page, current_page, options, image)
+                # A stopped OCR call returns early with partial text, which is not kept
+                self.cancel.check()
+                del image
+                self._update_progress()
                 
-                full_raw_text += f"--- Page {current_page} ---\n{page_text}\n\n"
+                raw_text_start = raw_text_file.tell()
+                raw_text_file.write(f"--- Page {current_page} ---\n{page_text}\n\n")
+                # Flushed so the checkpoint never points past what is on disk
+                raw_text_file.flush()
+                checkpoint.update(raw_text_start=raw_text_start, raw_text_end=raw_text_file.tell(), text_chars=len(page_text))
+                self._raw_text_spans[current_page] = (raw_text_start, checkpoint['raw_text_end'])
+                if self.search:
+                    self._search_texts[current_page] = page_text
+                self._page_checkpoints[current_page] = checkpoint
                 self.signals.page_processed.emit(current_page, total_pages, page_text)
+                self.signals.raw_text_saved.emit(raw_text_file.name, current_page, *self._raw_text_spans[current_page])
+                # Boilerplate is stripped before duplicate checks, so repeats differing only in
+                # page numbers or running headers are exact
+                summary_text = self._clean_page_text(current_page, page_text) if self.text_filter else page_text
+                if self.dedupe:
+                    summary_text = self._check_duplicate(current_page, summary_text, checkpoint, looks_like)
 
                 # --- Sub-step 2: Image Extraction ---
-                if self.processing_options.get('images', False):
+                if options.get('images', False):
                     self.signals.log.emit(f"  > Extracting Images...")
-                    image_list = page.get_images(full=True)
-                    if image_list:
-                         self.signals.log.emit(f"    - Found {len(image_list)} images.")
-                         for img_index, img in enumerate(image_list, start=1):
-                             xref = img[0]
-                             base_image = doc.extract_image(xref)
-                             image_bytes = base_image["image"]
-                             image_ext = base_image["ext"]
-                             img_filename = f"page_{current_page}_img_{img_index}.{image_ext}"
-                             img_filepath = os.path.join(output_path, img_filename)
-                             with open(img_filepath, "wb") as f:
-                                 f.write(image_bytes)
-                    else:
-                         self.signals.log.emit(f"    - No embedded images. Saving page render.")
-                         img_path = os.path.join(output_path, f"page_{current_page}_render.png")
-                         pix = page.get_pixmap(dpi=ocr_dpi)
-                         pix.save(img_path)
-                self.signals.progress.emit(int(((base_step + 2) / total_steps) * 100))
+                    with self.tracer.span("images", current_page) as images_span:
+                        checkpoint['artifacts'] += self._extract_images(doc, page, current_page, output_path, ocr_dpi)
+                    self.throughput.complete(current_page, 'images', seconds=images_span['duration'])
+                    self._update_progress()
 
                 # --- Sub-step 3: Table Extraction ---
-                if self.processing_options.get('tables', False):
-                     try:
-                        tables = page.find_tables()
-                        if tables.tables:
-                             self.signals.log.emit(f"  > Extracting Tables ({len(tables.tables)} found)...")
-                             for table_index, table in enumerate(tables.tables, start=1):
-                                 df = table.to_pandas()
-                                 csv_filename = f"page_{current_page}_table_{table_index}.csv"
-                                 csv_path = os.path.join(output_path, csv_filename)
-                                 df.to_csv(csv_path, index=False)
-                                 self.signals.log.emit(f"    - Saved: {csv_filename}")
-                     except Exception as e:
-                         self.signals.log.emit(f"    ⚠️ Table extraction failed (or not supported): {e}")
-                self.signals.progress.emit(int(((base_step + 3) / total_steps) * 100))
+                if options.get('tables', False):
+                    self.cancel.check()
+                    with self.tracer.span("tables", current_page) as tables_span:
+                        checkpoint['artifacts'] += self._extract_tables(page, current_page, output_path)
+                    self.throughput.complete(current_page, 'tables', seconds=tables_span['duration'])
+                    self._update_progress()
 
                 # --- Sub-step 4: NLP ---
                 page_nlp_data = ""
-                if self.processing_options.get('nlp', True):
+                if summary_text is None:
+                    # Exact repeat: the earlier page's summary is reused, so there is nothing to analyze
+                    for stage in ('nlp', 'prompt', 'decode'):
+                        self.throughput.complete(current_page, stage, 0)
+                elif options.get('nlp', True):
                     self.signals.log.emit(f"  > NLP Analysis...")
-                    page_nlp_data = nlp_handler.process_text(page_text)
-                self.signals.progress.emit(int(((base_step + 4) / total_steps) * 100))
+                    with self.tracer.span("nlp", current_page) as nlp_span:
+                        page_nlp_data = nlp_handler.process_text(summary_text, self.cancel)
+                    self.throughput.complete(current_page, 'nlp', len(summary_text), nlp_span['duration'])
+                    self._update_progress()
+                    checkpoint['nlp_data'] = page_nlp_data
+
+                # Routed on the full page text, before compression shortens it
+                if self.llm_handler.small_model_name and summary_text is not None:
+                    tables = sum(1 for name in checkpoint['artifacts'] if "_table_" in name)
+                    checkpoint['model'] = self._route_page(current_page, summary_text, page_nlp_data, tables)
+
+                # Dense pages are cut down to their top-ranked sentences; repeats are already short
+                if options.get('compress', False) and summary_text is not None and current_page not in self._duplicates:
+                    summary_text = self._compress_page(current_page, summary_text, page_nlp_data)
+                self.signals.stage_metrics.emit(self.tracer.stage_totals())
 
                 # --- Sub-step 5: AI Summarization (Streaming) ---
-                self.signals.log.emit(f"  > AI Summarization...")
-                self.signals.summary_header.emit(current_page, total_pages)
-                
-                temperature = self.processing_options.get('temperature', 0.2)
-                page_summary_tokens = []
-                token_count = 0
-                # Progress within AI step: interpolate from sub-step 4 to sub-step 5
-                ai_start_pct = ((base_step + 4) / total_steps) * 100
-                ai_end_pct = ((base_step + 5) / total_steps) * 100
-                max_expected_tokens = 512  # matches max_tokens in LLM call
-                
-                for token in self.llm_handler.generate_summary_stream(page_text, page_nlp_data, self.user_instructions, temperature):
+                # Pages are queued until every inference worker has one, then summarized together.
+                # A page the user asked for is summarized straight away.
+                # Exact repeats are queued too, so pages are checkpointed in the order their text
+                # was appended to raw_text.txt, but they take no inference slot
+                pending_summaries.append((current_page, summary_text, page_nlp_data))
+                queued_jobs = sum(1 for number, _, _ in pending_summaries if not self._reuses_summary(number))
+                if (queued_jobs >= self.llm_handler.parallelism or not len(scheduler)
+                        or scheduler.is_prioritized(current_page)):
+                    self._summarize_pending(pending_summaries, final_summary_parts, total_pages)
+                    pending_summaries = []
+
+            raw_text_file.close()
+            self._finish_run(final_summary_parts, total_pages, options, output_path)
+
+        except Cancelled:
+            # A stage was interrupted midway; the pages it was working on are redone when the run is resumed
+            self._finish_run(final_summary_parts, total_pages, options, output_path)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+            self.signals.log.emit(f"🔴 ERROR: {e}")
+        finally:
+            if raw_text_file:
+                raw_text_file.close()
+            if doc:
+                doc.close()
+            self._close_search()
+            if output_path:
+                self._write_metrics(output_path)
+
+
+class ResummarizePipeline(AnalysisPipeline):
+    """
+    Summarizes the pages of an earlier run again, reusing the text and NLP data saved in its
+    output folder: no OCR, extraction or NLP. Each instruction variant is run in turn and
+    saved as its own summaries_<time>_<n>.md in that folder.
+    """
+
+    def __init__(self, output_path, instruction_variants, processing_options, llm_handler, signals):
+        super().__init__(None, instruction_variants[0], processing_options, llm_handler, signals)
+        self.output_path = output_path
+        self.instruction_variants = instruction_variants
+        self.dedupe = None
+
+    def _checkpoint_page(self, page_number, summary, failed=False):
+        pass  # the run's own checkpoints stay as they are
+
+    def _page_batches(self):
+        """The saved pages, read back lazily in groups of one page per inference worker."""
+        batch = []
+        for page_number, page_text, nlp_data in self.manifest.page_texts():
+            if self.text_filter:
+                page_text = self._clean_page_text(page_number, page_text)
+            if self.llm_handler.small_model_name and not self._reuses_summary(page_number):
+                tables = sum(1 for name in self.manifest.pages[page_number].get('artifacts', []) if "_table_" in name)
+                self._route_page(page_number, page_text, nlp_data, tables)
+            if self.processing_options.get('compress', False) and page_number not in self._duplicates:
+                page_text = self._compress_page(page_number, page_text, nlp_data)
+            batch.append((page_number, page_text, nlp_data))
+            if sum(1 for number, _, _ in batch if not self._reuses_summary(number)) >= self.llm_handler.parallelism:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self):
+        try:
+            self._start_time = time.time()
+            self.manifest = RunManifest.load(self.output_path)
+            self.file_path = self.manifest.header['source']['path']
+            page_count = len(self.manifest.pages)
+            if not page_count:
+                raise RuntimeError("This run has no finished pages to summarize again.")
+            total_pages = self.manifest.header['total_pages']
+            self._pages_total = total_pages
+            raw_text_path = os.path.join(self.output_path, "raw_text.txt")
+            for page in sorted(self.manifest.pages):
+                self.signals.raw_text_saved.emit(raw_text_path, page, *self.manifest.page_span(page))
+            self.signals.log.emit(f"✍️ Re-summarizing {page_count} pages of {os.path.basename(self.file_path)} "
+                                  f"from: {os.path.basename(self.output_path)}")
+            self.signals.status_changed.emit('analyzing')
+
+            self.throughput = ThroughputModel(
+                {'ocr': False, 'images': False, 'tables': False, 'nlp': False},
+                parallelism=self.llm_handler.parallelism,
+                max_prompt_tokens=config.MAX_TOKENS - 1024,
+                expected_completion_tokens=config.SUMMARY_MAX_TOKENS // 2,
+            )
+            # A run limited to a page range or skim sample saved only some of the document's pages
+            self.throughput.scan_texts(self.manifest.pages[page]['text_chars'] if page in self.manifest.pages else 0
+                                       for page in range(1, total_pages + 1))
+            self.throughput.select(self.manifest.pages)
+            # Exact repeats found by the original run reuse the new summary of the page they repeat.
+            # Near repeats are summarized in full, since their diff was not saved.
+            self._duplicates = {page: {'of': record['duplicate_of'], 'changes': False}
+                                for page, record in self.manifest.pages.items()
+                                if 'duplicate_of' in record and not record['duplicate_changes']}
+
+            final_report = ""
+            for number, instructions in enumerate(self.instruction_variants, start=1):
+                if not self._is_running:
+                    break
+                self.user_instructions = instructions
+                if len(self.instruction_variants) > 1:
+                    self.signals.log.emit(f"--- Instruction variant {number}/{len(self.instruction_variants)} ---")
+                # Every variant starts the dial again; measured LLM rates carry over
+                self.throughput.restart()
+                self._summaries = {}
+                self._page_models = {}
+                self.text_filter = BoilerplateFilter() if config.CLEANUP_ENABLED else None
+                self.cleanup_totals = {'chars_before': 0, 'chars_after': 0, 'lines_removed': 0}
+                self.compression_totals = {'pages': 0, 'tokens_before': 0, 'tokens_after': 0, 'seconds_saved': 0.0}
+                for page in self.manifest.pages:
+                    self.throughput.complete(page, 'text')
+                    if page in self._duplicates:
+                        self.throughput.complete(page, 'prompt', 0)
+                        self.throughput.complete(page, 'decode', 0)
+                self._progress = 0
+                self.signals.progress.emit(0)
+
+                summary_parts = []
+                for batch in self._page_batches():
                     if not self._is_running:
                         break
-                    page_summary_tokens.append(token)
-                    self.signals.token_received.emit(token)
-                    token_count += 1
-                    # Update progress every 5 tokens during streaming
-                    if token_count % 5 == 0:
-                        token_fraction = min(token_count / max_expected_tokens, 1.0)
-                        current_pct = int(ai_start_pct + (ai_end_pct - ai_start_pct) * token_fraction)
-                        self.signals.progress.emit(current_pct)
-                
-                page_summary = "".join(page_summary_tokens)
-                self.signals.page_summary_ready.emit(current_page, total_pages, page_summary)
-                final_summary_parts.append(f"## Page {current_page} Summary\n{page_summary}")
-                
-                self.signals.progress.emit(int(((base_step + 5) / total_steps) * 100))
+                    self._pages_started = batch[-1][0]
+                    self._emit_detailed_progress(self._pages_started)
+                    self._summarize_pending(batch, summary_parts, total_pages)
+                final_report = "\n\n".join(part for _, part in sorted(summary_parts))
 
-            text_path = os.path.join(output_path, "raw_text.txt")
-            with open(text_path, 'w', encoding='utf-8') as f:
-                f.write(full_raw_text)
+                report_name = f"summaries_{time.strftime('%Y%m%d_%H%M%S')}_{number}.md"
+                with open(os.path.join(self.output_path, report_name), 'w', encoding='utf-8') as f:
+                    f.write(f"# Instructions\n{instructions or '(none)'}\n\n{final_report}\n")
+                self.signals.log.emit(f"💾 Saved {report_name}")
 
-            self.signals.log.emit("🏁 Analysis complete. Finalizing report.")
-            final_report = "\n\n".join(final_summary_parts)
+            if not self._is_running:
+                self._log_stopped()
+            self._log_speculative_summary()
+            self._log_compression_summary()
+            self._log_routing_summary()
+            self.signals.log.emit("🏁 Re-summarizing complete.")
             self.signals.finished.emit(final_report)
 
         except Exception as e:
             self.signals.error.emit(str(e))
             self.signals.log.emit(f"🔴 ERROR: {e}")
         finally:
-            if doc:
-                doc.close()
\ No newline at end of file
+            if self.manifest:
+                self._write_metrics(self.output_path, prefix="resummarize_")
@@ -0,0 +1,52 @@
+# src/processing/routing.py
+
+import re
+
+import config
+from .throughput import CHARS_PER_TOKEN
+from .compression import parse_entities
+
+_CELL_SEPARATOR_RE = re.compile(r"\t|\s{2,}|\s*\|\s*")
+_NUMBER_RE = re.compile(r"^[-+(]?[$€£]?\d[\d,.:/]*%?\)?$")
+
+
+def _is_table_row(line):
+    """
+    Three or more cells separated by tabs, pipes or wide gaps, or (once cleanup has collapsed
+    the gaps) a line of three or more words of which at least half are numbers.
+    """
+    if len([cell for cell in _CELL_SEPARATOR_RE.split(line.strip()) if cell]) >= 3:
+        return True
+    words = line.split()
+    return len(words) >= 3 and 2 * sum(1 for word in words if _NUMBER_RE.match(word)) >= len(words)
+
+
+def page_features(text, nlp_data="", tables=0, ocr_confidence=None):
+    """
+    The signals a page's complexity is scored from: estimated tokens, distinct named entities
+    per word, extracted tables (or, without table extraction, the share of table-like lines)
+    and the mean OCR confidence when adaptive OCR measured one.
+    """
+    words = len(text.split())
+    lines = [line for line in text.splitlines() if line.strip()]
+    return {
+        'tokens': len(text) // CHARS_PER_TOKEN,
+        'entity_density': len(parse_entities(nlp_data)) / words if words else 0.0,
+        'tables': tables,
+        'table_lines': sum(1 for line in lines if _is_table_row(line)) / len(lines) if lines else 0.0,
+        'ocr_confidence': ocr_confidence,
+    }
+
+
+def complexity_score(features):
+    """Weighted 0-1 complexity of a page; each signal is capped at 1 at its ROUTING_*_FULL level."""
+    ocr_confidence = features['ocr_confidence']
+    signals = {
+        'tokens': features['tokens'] / config.ROUTING_TOKENS_FULL,
+        'entities': features['entity_density'] / config.ROUTING_ENTITY_DENSITY_FULL,
+        'tables': 1.0 if features['tables'] else features['table_lines'] / config.ROUTING_TABLE_LINES_FULL,
+        # Noisy OCR text takes a stronger model to make sense of
+        'ocr': 0.0 if ocr_confidence is None else (100 - ocr_confidence) / (100 - config.ROUTING_OCR_CONFIDENCE_FLOOR),
+    }
+    weights = config.ROUTING_WEIGHTS
+    return sum(weights[name] * min(1.0, max(0.0, value)) for name, value in signals.items()) / sum(weights.values())
@@ -0,0 +1,161 @@
+# src/processing/run_manifest.py
+
+import os
+import json
+import time
+import hashlib
+
+MANIFEST_FILE = "manifest.json"
+JOURNAL_FILE = "pages.jsonl"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hashes a file in chunks, so large documents are never read into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_page_text(f, start, end):
+    """Reads one page back from raw_text.txt (opened in binary mode), given its byte range."""
+    f.seek(start)
+    chunk = f.read(end - start).decode('utf-8', errors='replace')
+    if os.linesep != "\n":
+        chunk = chunk.replace(os.linesep, "\n")
+    # Each page is written as "--- Page N ---\n<text>\n\n"
+    text = chunk.partition("\n")[2]
+    return text[:-2] if text.endswith("\n\n") else text
+
+
+def read_manifest(output_path):
+    """Reads the manifest.json of an output folder. Raises RuntimeError if there is no usable manifest."""
+    path = os.path.join(output_path, MANIFEST_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            header = json.load(f)
+    except FileNotFoundError:
+        raise RuntimeError(f"No {MANIFEST_FILE} found in:\n{output_path}\n\nOnly runs started with checkpointing can be resumed.")
+    except (OSError, json.JSONDecodeError) as e:
+        raise RuntimeError(f"Could not read {MANIFEST_FILE}: {e}")
+    if header.get('version') != MANIFEST_VERSION:
+        raise RuntimeError(f"Unsupported manifest version: {header.get('version')}")
+    return header
+
+
+class RunManifest:
+    """
+    Checkpoint of one analysis run, kept in its output folder.
+    manifest.json describes the run (source file and hash, options, instructions) and is replaced
+    atomically. pages.jsonl gets one line per page as it completes: its summary, the artifacts
+    written for it and where its text is in raw_text.txt. A line cut short by a crash is
+    ignored, so that page is simply processed again. Pages may be processed out of order, but
+    they are journaled in the order their text was appended to raw_text.txt.
+    """
+
+    def __init__(self, output_path, header, pages=None):
+        self.output_path = output_path
+        self.header = header
+        self.pages = pages or {}  # page -> journal record
+
+    @property
+    def _journal_path(self):
+        return os.path.join(self.output_path, JOURNAL_FILE)
+
+    @classmethod
+    def create(cls, output_path, source_path, source_hash, total_pages, options, instructions):
+        header = {
+            'version': MANIFEST_VERSION,
+            'source': {
+                'path': os.path.abspath(source_path),
+                'name': os.path.basename(source_path),
+                'size': os.path.getsize(source_path),
+                'sha256': source_hash,
+            },
+            'total_pages': total_pages,
+            'options': options,
+            'instructions': instructions,
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'complete': False,
+        }
+        manifest = cls(output_path, header)
+        manifest.save()
+        open(manifest._journal_path, 'w', encoding='utf-8').close()
+        return manifest
+
+    @classmethod
+    def load(cls, output_path):
+        manifest = cls(output_path, read_manifest(output_path))
+        if os.path.exists(manifest._journal_path):
+            with open(manifest._journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn write from a crash; everything after it is redone
+                    manifest.pages[record['page']] = record
+        return manifest
+
+    def save(self):
+        self.header['updated'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        path = os.path.join(self.output_path, MANIFEST_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.header, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def page_span(self, page):
+        """Start and end byte offsets of a journaled page's text in raw_text.txt."""
+        record = self.pages[page]
+        if 'raw_text_start' in record:
+            return record['raw_text_start'], record['raw_text_end']
+        # Older runs processed pages in order, so a page started where the previous one ended
+        return (self.pages[page - 1]['raw_text_end'] if page > 1 else 0), record['raw_text_end']
+
+    def rewind(self):
+        """
+        Keeps the journaled pages before the first one whose summary failed and drops the rest, so
+        they are processed again, rewriting the journal without them. Journal order is the order of
+        raw_text.txt, so the kept pages cover its start; returns the length of raw_text.txt they cover.
+        """
+        kept = {}
+        for number, record in self.pages.items():  # in journal order
+            if record.get('failed'):
+                break
+            kept[number] = record
+        self.pages = kept
+        tmp_path = self._journal_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in kept.values():
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, self._journal_path)
+        return max((record['raw_text_end'] for record in kept.values()), default=0)
+
+    def record_page(self, page, summary, raw_text_end, failed=False, **details):
+        """
+        Appends a completed page to the journal and forces it to disk. `details` are stored with it
+        (artifacts, text_chars, nlp_data, duplicate_of, fingerprints).
+        """
+        record = dict(details, page=page, summary=summary, raw_text_end=raw_text_end)
+        if failed:
+            record['failed'] = True
+        with open(self._journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.pages[page] = record
+
+    def page_texts(self):
+        """
+        Yields (page, text, nlp_data) for the journaled pages, reading each page's text back from
+        raw_text.txt, in page order.
+        """
+        with open(os.path.join(self.output_path, "raw_text.txt"), 'rb') as f:
+            for page in sorted(self.pages):
+                yield page, read_page_text(f, *self.page_span(page)), self.pages[page].get('nlp_data', "")
+
+    def mark_complete(self):
+        self.header['complete'] = True
+        self.save()
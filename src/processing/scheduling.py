@@ -0,0 +1,99 @@
+# src/processing/scheduling.py
+
+import heapq
+import itertools
+import random
+import threading
+
+import config
+
+
+def parse_page_ranges(spec, total_pages):
+    """
+    Pages selected by a spec such as "1-20,45,100-" ("-5" is pages 1-5, "100-" runs to the end).
+    An empty spec selects every page. Raises ValueError for a malformed spec or one that selects nothing.
+    """
+    if not spec or not spec.strip():
+        return list(range(1, total_pages + 1))
+    pages = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        start, dash, end = part.partition("-")
+        try:
+            first = int(start) if start else 1
+            last = int(end) if end else (total_pages if dash else first)
+        except ValueError:
+            raise ValueError(f"'{part}' is not a page number or range.") from None
+        if first < 1 or (end and last < first):
+            raise ValueError(f"'{part}' is not a valid page range.")
+        pages.update(range(first, min(last, total_pages) + 1))
+    if not pages:
+        raise ValueError(f"'{spec}' selects no pages; the document has {total_pages}.")
+    return sorted(pages)
+
+
+def skim_sample(pages):
+    """
+    A stratified sample of the pages for skim mode: the first and last page, plus one page drawn
+    from each of equal slices of the pages in between. About SKIM_FRACTION of the pages are taken,
+    within SKIM_MIN_PAGES..SKIM_MAX_PAGES. The draw is seeded, so a resumed run picks the same pages.
+    """
+    pages = sorted(pages)
+    count = round(len(pages) * config.SKIM_FRACTION)
+    count = min(max(count, config.SKIM_MIN_PAGES), config.SKIM_MAX_PAGES)
+    if count >= len(pages):
+        return pages
+    rng = random.Random(len(pages))
+    inner = pages[1:-1]
+    strata = max(count - 2, 0)
+    sample = {pages[0], pages[-1]}
+    for i in range(strata):
+        stratum = inner[i * len(inner) // strata:(i + 1) * len(inner) // strata]
+        if stratum:
+            sample.add(rng.choice(stratum))
+    return sorted(sample)
+
+
+class PageScheduler:
+    """
+    Priority queue of the pages still to process. Pages come out in ascending order, except
+    that a page passed to prioritize() comes out next (the most recently requested first).
+    prioritize() may be called from the GUI thread while the pipeline takes pages with next().
+    """
+
+    def __init__(self, pages):
+        self._pending = set(pages)
+        # Entries are (rank, order, page); a sorted list is already a valid heap
+        self._heap = [(1, page, page) for page in sorted(self._pending)]
+        self._requests = itertools.count()
+        self._prioritized = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def prioritize(self, page):
+        """Moves a page to the front of the queue. Returns False if it is not waiting to be processed."""
+        with self._lock:
+            if page not in self._pending:
+                return False
+            # The page's ascending entry stays in the heap and is skipped once the page is out
+            heapq.heappush(self._heap, (0, -next(self._requests), page))
+            self._prioritized.add(page)
+            return True
+
+    def is_prioritized(self, page):
+        with self._lock:
+            return page in self._prioritized
+
+    def next(self):
+        """Takes the next page to process, or returns None when every page has been handed out."""
+        with self._lock:
+            while self._heap:
+                _, _, page = heapq.heappop(self._heap)
+                if page in self._pending:
+                    self._pending.discard(page)
+                    return page
+            return None
@@ -0,0 +1,184 @@
+# src/processing/search_index.py
+
+import os
+import re
+import time
+import sqlite3
+
+from .run_manifest import RunManifest, MANIFEST_FILE
+import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    output_path TEXT UNIQUE NOT NULL,
+    document TEXT NOT NULL,
+    indexed TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    text, summary, entities, run_id UNINDEXED, page UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+# Matches in summaries and entities say more about a page than a passing mention in its text
+_RANK = "bm25(pages, 1.0, 2.0, 3.0)"
+# Control characters mark snippet matches, so the GUI can escape the text before highlighting
+MATCH_START, MATCH_END = "\x02", "\x03"
+_RAW_PAGE_RE = re.compile(r"^--- Page (\d+) ---\n", re.MULTILINE)
+
+
+def database_path():
+    return os.path.join(config.OUTPUT_DIR, config.SEARCH_DB_FILE)
+
+
+def _fts_query(text):
+    """
+    Every word of a free-text query as a quoted FTS5 term, so punctuation is never read as
+    syntax. All words must match; a trailing * matches any word starting with the term.
+    """
+    terms = re.findall(r"(\w+)(\*?)", text)
+    return " ".join(f'"{term}"{star}' for term, star in terms)
+
+
+def index_past_runs():
+    """Indexes the run folders under OUTPUT_DIR that are not in the database yet. Returns (runs, pages) added."""
+    index = SearchIndex()
+    try:
+        return index.index_output_dir(log=print)
+    finally:
+        index.close()
+
+
+class SearchIndex:
+    """
+    Full-text index of the page text, summaries and entities of every analysis run, in one
+    SQLite FTS5 database under OUTPUT_DIR. WAL mode lets the GUI search while a run writes.
+    Pages are buffered and written SEARCH_COMMIT_PAGES at a time in one transaction, which
+    keeps indexing to a few milliseconds per batch. Not thread-safe: use one instance per thread.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or database_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.run_id = None
+        self._pending = []
+
+    def begin_run(self, output_path, document, done_pages=()):
+        """
+        Registers a run and drops its pages other than `done_pages`, which a resumed run
+        processes again.
+        """
+        output_path = os.path.abspath(output_path)
+        done_pages = set(done_pages)
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO runs (output_path, document, indexed) VALUES (?, ?, ?)",
+                              (output_path, document, time.strftime("%Y-%m-%dT%H:%M:%S")))
+            self.run_id = self.conn.execute("SELECT id FROM runs WHERE output_path = ?", (output_path,)).fetchone()[0]
+            rows = self.conn.execute("SELECT rowid, page FROM pages WHERE run_id = ?", (self.run_id,)).fetchall()
+            self.conn.executemany("DELETE FROM pages WHERE rowid = ?",
+                                  [(rowid,) for rowid, page in rows if page not in done_pages])
+        return self.run_id
+
+    def add_page(self, page, text, summary="", entities=""):
+        self._pending.append((text, summary, entities, self.run_id, page))
+        if len(self._pending) >= config.SEARCH_COMMIT_PAGES:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT INTO pages (text, summary, entities, run_id, page) VALUES (?, ?, ?, ?, ?)",
+                                  self._pending)
+        self._pending = []
+
+    def is_indexed(self, output_path):
+        return self.conn.execute("SELECT 1 FROM runs WHERE output_path = ?",
+                                 (os.path.abspath(output_path),)).fetchone() is not None
+
+    def index_folder(self, output_path):
+        """
+        Adds an earlier run's output folder. Runs with a page journal bring their summaries and
+        entities; older folders only have raw_text.txt. Returns the number of pages added.
+        """
+        self.run_id = None
+        try:
+            return self._index_folder(output_path)
+        except Exception:
+            # Leave no half-indexed run behind, so the folder is picked up again next time
+            self._pending = []
+            if self.run_id is None:
+                raise
+            with self.conn:
+                self.conn.execute("DELETE FROM pages WHERE run_id = ?", (self.run_id,))
+                self.conn.execute("DELETE FROM runs WHERE id = ?", (self.run_id,))
+            raise
+
+    def _index_folder(self, output_path):
+        pages = 0
+        if os.path.exists(os.path.join(output_path, MANIFEST_FILE)):
+            manifest = RunManifest.load(output_path)
+            self.begin_run(output_path, manifest.header['source']['name'])
+            for page, text, nlp_data in manifest.page_texts():
+                self.add_page(page, text, manifest.pages[page]['summary'], nlp_data)
+                pages += 1
+        else:
+            raw_text_path = os.path.join(output_path, "raw_text.txt")
+            with open(raw_text_path, 'r', encoding='utf-8', errors='replace') as f:
+                raw_text = f.read()
+            # Folder names are "<document>_<YYYYmmdd>_<HHMMSS>"
+            document = re.sub(r"_\d{8}_\d{6}$", "", os.path.basename(os.path.normpath(output_path)))
+            self.begin_run(output_path, document)
+            parts = _RAW_PAGE_RE.split(raw_text)
+            for number, text in zip(parts[1::2], parts[2::2]):
+                self.add_page(int(number), text.rstrip("\n"))
+                pages += 1
+        self.flush()
+        return pages
+
+    def index_output_dir(self, output_dir=None, log=None):
+        """Indexes every run folder under OUTPUT_DIR that is not in the database yet."""
+        output_dir = output_dir or config.OUTPUT_DIR
+        runs = pages = 0
+        for name in sorted(os.listdir(output_dir)):
+            folder = os.path.join(output_dir, name)
+            if not os.path.isdir(folder) or self.is_indexed(folder):
+                continue
+            if not (os.path.exists(os.path.join(folder, MANIFEST_FILE))
+                    or os.path.exists(os.path.join(folder, "raw_text.txt"))):
+                continue
+            try:
+                pages += self.index_folder(folder)
+                runs += 1
+            except (OSError, ValueError, KeyError, RuntimeError) as e:
+                if log:
+                    log(f"⚠️ Skipped {name}: {e}")
+        return runs, pages
+
+    def search(self, query, limit=None):
+        """
+        Ranked page-level hits for a free-text query: dicts with document, output_path, page,
+        score (lower is better) and a snippet whose matches are wrapped in MATCH_START/MATCH_END.
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        rows = self.conn.execute(
+            f"SELECT runs.document, runs.output_path, pages.page, {_RANK} AS score, "
+            f"snippet(pages, -1, ?, ?, ' … ', 16) "
+            f"FROM pages JOIN runs ON runs.id = pages.run_id "
+            f"WHERE pages MATCH ? ORDER BY score LIMIT ?",
+            (MATCH_START, MATCH_END, match, limit or config.SEARCH_MAX_RESULTS),
+        ).fetchall()
+        return [{'document': document, 'output_path': output_path, 'page': page, 'score': score, 'snippet': snippet}
+                for document, output_path, page, score, snippet in rows]
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
@@ -0,0 +1,84 @@
+# src/processing/speculative.py
+
+import numpy as np
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
+
+
+class GGUFDraftModel(LlamaDraftModel):
+    """
+    Drafts tokens greedily with a small GGUF model that shares the main model's vocabulary.
+    The draft model's KV cache is reused for the common prefix between calls.
+    """
+
+    def __init__(self, model_path, num_pred_tokens=10, **load_kwargs):
+        from llama_cpp import Llama
+        self.llm = Llama(model_path=model_path, **load_kwargs)
+        self.num_pred_tokens = num_pred_tokens
+        self._eos = self.llm.token_eos()
+
+    def __call__(self, input_ids, /, **kwargs):
+        import llama_cpp
+
+        if len(input_ids) + self.num_pred_tokens >= self.llm.n_ctx():
+            return np.array([], dtype=np.intc)
+        # Keep the shared prefix, but always re-evaluate at least the last token for fresh logits
+        prefix = self.llm.longest_token_prefix(self.llm.input_ids[:self.llm.n_tokens], input_ids)
+        prefix = min(prefix, len(input_ids) - 1)
+        self.llm.n_tokens = prefix
+        self.llm.eval(input_ids[prefix:].tolist())
+
+        drafts = []
+        n_vocab = self.llm.n_vocab()
+        for _ in range(self.num_pred_tokens):
+            logits = np.ctypeslib.as_array(llama_cpp.llama_get_logits_ith(self.llm.ctx, -1), shape=(n_vocab,))
+            token = int(np.argmax(logits))
+            if token == self._eos:
+                break
+            drafts.append(token)
+            self.llm.eval([token])
+        return np.array(drafts, dtype=np.intc)
+
+
+class MeteredDraftModel(LlamaDraftModel):
+    """Wraps a draft model and counts how many tokens it proposes."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.drafted_tokens = 0
+
+    def __call__(self, input_ids, /, **kwargs):
+        drafts = self.inner(input_ids, **kwargs)
+        self.calls += 1
+        self.drafted_tokens += len(drafts)
+        return drafts
+
+    def stats(self, generated_tokens):
+        """
+        Estimates acceptance for one generation.
+        Each verification step emits the accepted drafts plus one sampled token,
+        so accepted drafts = generated tokens - verification steps.
+        """
+        accepted = max(0, generated_tokens - self.calls)
+        return {
+            'draft_calls': self.calls,
+            'drafted_tokens': self.drafted_tokens,
+            'accepted_tokens': min(accepted, self.drafted_tokens),
+            'acceptance_rate': min(accepted / self.drafted_tokens, 1.0) if self.drafted_tokens else 0.0,
+        }
+
+
+def create_draft_model(mode, num_pred_tokens=10, max_ngram_size=2, draft_model_path=None, draft_load_kwargs=None):
+    """Builds the metered draft model for a speculative decoding mode."""
+    if mode == "prompt_lookup":
+        inner = LlamaPromptLookupDecoding(max_ngram_size=max_ngram_size, num_pred_tokens=num_pred_tokens)
+    elif mode == "draft_model":
+        if not draft_model_path:
+            raise RuntimeError("Speculative mode 'draft_model' needs SPECULATIVE_DRAFT_MODEL to be set.")
+        inner = GGUFDraftModel(draft_model_path, num_pred_tokens=num_pred_tokens, **(draft_load_kwargs or {}))
+    else:
+        raise RuntimeError(f"Unknown speculative decoding mode: {mode}")
+    return MeteredDraftModel(inner)
@@ -0,0 +1,79 @@
+# src/processing/text_cleanup.py
+
+import re
+from collections import Counter
+
+import config
+
+_DIGITS_RE = re.compile(r"\d+")
+_SPACES_RE = re.compile(r"[ \t\f\v\u00a0]+")
+# A word broken at the end of a line and continued in lower case on the next one
+_HYPHENATED_RE = re.compile(r"(\w)-\n[ \t]*([a-z]\w*)")
+# "7", "- 7 -", "Page 7", "Page 7 of 20", "7 / 20" once digits are normalized
+_PAGE_NUMBER_RE = re.compile(r"^[-–—\s]*(page|p\.?|pg\.?)?\s*#(\s*(of|/)\s*#)?[-–—\s]*$")
+
+
+def _line_key(line):
+    """Lines that differ only in numbers (page numbers, dates) count as the same line."""
+    return _DIGITS_RE.sub("#", _SPACES_RE.sub(" ", line).strip().lower())
+
+
+def rejoin_hyphenated(text):
+    """Joins words split across lines, keeping the line break after the whole word."""
+    return _HYPHENATED_RE.sub(lambda m: f"{m.group(1)}{m.group(2)}\n", text)
+
+
+def collapse_whitespace(text):
+    """Single spaces inside lines, no trailing spaces, at most one blank line in a row."""
+    lines = [_SPACES_RE.sub(" ", line).strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+class BoilerplateFilter:
+    """
+    Removes running headers, footers, page numbers and repeated disclaimers from page text
+    before it reaches spaCy and the LLM. Pages arrive one at a time, so repeats are learned
+    as the document is read: a line within CLEANUP_EDGE_LINES of the top or bottom of a
+    page is dropped once the same line (numbers ignored) has been in that zone on
+    CLEANUP_REPEAT_PAGES pages, counting the current one. Lone page numbers at the edges
+    are dropped from the start.
+    """
+
+    def __init__(self, edge_lines=None, repeat_pages=None):
+        self.edge_lines = edge_lines or config.CLEANUP_EDGE_LINES
+        self.repeat_pages = repeat_pages or config.CLEANUP_REPEAT_PAGES
+        self._seen = Counter()  # (zone, line key) -> pages it was seen on
+
+    def _edge_keys(self, lines):
+        """{line index: (zone, key)} of the non-blank lines near the top and bottom of a page."""
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        # On short pages the zones shrink so that the middle of the page is never looked at
+        count = min(self.edge_lines, len(filled) // 3)
+        edges = {}
+        for i in filled[len(filled) - count:]:
+            edges[i] = ("bottom", _line_key(lines[i]))
+        for i in filled[:count]:
+            edges[i] = ("top", _line_key(lines[i]))
+        return edges
+
+    def _is_boilerplate(self, zone, key):
+        return bool(_PAGE_NUMBER_RE.match(key)) or self._seen[(zone, key)] >= self.repeat_pages
+
+    def clean(self, text, learn=True):
+        """
+        Returns (cleaned text, number of boilerplate lines removed). Pass learn=False for a page
+        that was cleaned before, so it is not counted twice.
+        """
+        lines = rejoin_hyphenated(text).splitlines()
+        edges = self._edge_keys(lines)
+        if learn:
+            self._seen.update(set(edges.values()))
+        # Headers and footers are blocks at the very edge: stop at the first line that is not one
+        drop = set()
+        for zone, indexes in (("top", sorted(edges)), ("bottom", sorted(edges, reverse=True))):
+            for i in indexes:
+                if edges[i][0] != zone or not self._is_boilerplate(*edges[i]):
+                    break
+                drop.add(i)
+        kept = [line for i, line in enumerate(lines) if i not in drop]
+        return collapse_whitespace("\n".join(kept)), len(drop)
@@ -0,0 +1,204 @@
+# src/processing/throughput.py
+
+import time
+
+# Starting rates until the first pages have been measured (a mid-range CPU, no GPU)
+DEFAULT_RATES = {
+    'ocr': 2.0e6,       # rendered pixels/sec, render + Tesseract
+    'text': 2.0e6,      # characters/sec from the text layer
+    'images': 5.0e7,    # image pixels/sec extracted and written
+    'tables': 5.0,      # pages/sec through find_tables()
+    'nlp': 2.0e4,       # characters/sec through spaCy
+    'prompt': 150.0,    # prompt tokens/sec (prompt eval)
+    'decode': 12.0,     # generated tokens/sec per sequence
+}
+CHARS_PER_TOKEN = 4
+PROMPT_OVERHEAD_TOKENS = 200   # system prompt, instructions and NLP data
+DEFAULT_OCR_CHARS = 2500       # text per scanned page until OCR has produced some
+_PRESCAN_BUDGET_SECONDS = 1.0  # larger documents extrapolate from the pages scanned in time
+_LLM_STAGES = ('prompt', 'decode')
+
+
+class ThroughputModel:
+    """
+    Predicts the remaining analysis time from per-page features and measured stage rates.
+    Each stage keeps an exponentially weighted rate (OCR pixels/sec, prompt tokens/sec,
+    decode tokens/sec, ...). Work per page is estimated from what is known up front
+    (page size at the OCR DPI, embedded image pixels, text-layer size) and refined as
+    pages are processed. Progress is completed work over total work, both valued at the current rates.
+    """
+
+    def __init__(self, options, parallelism=1, max_prompt_tokens=None, expected_completion_tokens=256, alpha=0.3):
+        self.options = options
+        self.parallelism = max(1, parallelism)
+        self.max_prompt_tokens = max_prompt_tokens
+        self.alpha = alpha
+        self.rates = dict(DEFAULT_RATES)
+        self._measured = set()
+        self.features = []
+        self.selected = None  # pages the run covers, when not the whole document
+        self.done = {}        # page -> {stage: units completed}
+        self.actual = {}      # page -> {stage: units}, known once a stage has run
+        self._ocr_chars = DEFAULT_OCR_CHARS
+        self._completion_tokens = expected_completion_tokens
+
+    # --- Features ---
+
+    def scan(self, doc):
+        """Collects cheap per-page features: page pixels at the OCR DPI, image pixels and text-layer size."""
+        dpi = self.options.get('ocr_dpi', 200)
+        deadline = time.perf_counter() + _PRESCAN_BUDGET_SECONDS
+        scanned = []
+        if hasattr(doc, 'page_features'):
+            # Text and image inputs describe their own pages
+            self.features = [doc.page_features(i, dpi) for i in range(len(doc))]
+            return
+        for page in doc:
+            rect = page.rect
+            images = page.get_images(full=True)
+            scanned.append({
+                'page_pixels': rect.width * dpi / 72 * rect.height * dpi / 72,
+                'image_count': len(images),
+                'image_pixels': sum(img[2] * img[3] for img in images),
+                # A scanned page's text only exists after OCR
+                'text_chars': None if self.options.get('ocr', True) else len(page.get_text()),
+            })
+            if time.perf_counter() > deadline:
+                break
+        # Pages beyond the scan budget look like the average scanned page
+        if scanned and len(scanned) < len(doc):
+            average = {key: sum(f[key] or 0 for f in scanned) / len(scanned) for key in scanned[0]}
+            if self.options.get('ocr', True):
+                average['text_chars'] = None
+            scanned.extend(dict(average) for _ in range(len(doc) - len(scanned)))
+        self.features = scanned
+
+    def scan_texts(self, char_counts):
+        """Features for pages whose text is already known, e.g. when summarizing a finished run again."""
+        self.features = [{'page_pixels': 0, 'image_count': 0, 'image_pixels': 0, 'text_chars': chars}
+                         for chars in char_counts]
+
+    def select(self, pages):
+        """Limits predictions to the given pages (a page range or skim sample); the rest are not counted."""
+        self.selected = sorted(pages)
+
+    def restart(self):
+        """Starts another pass over the same pages, keeping the measured rates."""
+        self.done = {}
+        self.actual = {}
+
+    # --- Measurements ---
+
+    def observe(self, stage, units, seconds):
+        """Feeds one measurement (units processed in seconds) into the stage's weighted rate."""
+        if seconds <= 1e-4 or units <= 0:
+            return
+        rate = units / seconds
+        if stage in self._measured:
+            self.rates[stage] = self.alpha * rate + (1 - self.alpha) * self.rates[stage]
+        else:
+            # The first real measurement replaces the default outright
+            self.rates[stage] = rate
+            self._measured.add(stage)
+
+    def complete(self, page, stage, units=None, seconds=None):
+        """Marks a stage of a page as done, optionally with its measured work and time."""
+        if units is None:
+            units = self._units(page, stage)
+        self.actual.setdefault(page, {})[stage] = units
+        self.done.setdefault(page, {})[stage] = units
+        if seconds is not None:
+            self.observe(stage, units, seconds)
+
+    def skip(self, page):
+        """Marks every stage of a page as done without a measurement (pages finished by an earlier run)."""
+        for stage in self._stages():
+            self.complete(page, stage)
+
+    def set_text(self, page, chars):
+        """Records the extracted text size of a page; for OCR it also refines the estimate for later pages."""
+        self.features[page - 1]['text_chars'] = chars
+        if self.options.get('ocr', True):
+            self._ocr_chars = self.alpha * chars + (1 - self.alpha) * self._ocr_chars
+
+    def set_generated(self, page, tokens):
+        """Counts tokens streamed so far for a page's summary."""
+        self.done.setdefault(page, {})['decode'] = tokens
+
+    def observe_llm(self, page, stats):
+        """Takes the prompt-eval and decode rates from a finished summary's stats."""
+        prompt_seconds = (stats.get('time_to_first_token') or 0) - (stats.get('tokenize_seconds') or 0)
+        if stats.get('prompt_tokens'):
+            self.complete(page, 'prompt', stats['prompt_tokens'], prompt_seconds)
+        else:
+            self.complete(page, 'prompt')
+        completion = stats.get('completion_tokens') or 0
+        decode_seconds = (stats.get('elapsed') or 0) - (stats.get('time_to_first_token') or 0)
+        self.complete(page, 'decode', completion, decode_seconds)
+        if completion:
+            self._completion_tokens = self.alpha * completion + (1 - self.alpha) * self._completion_tokens
+
+    # --- Predictions ---
+
+    def _stages(self):
+        stages = ['ocr'] if self.options.get('ocr', True) else ['text']
+        if self.options.get('images', False):
+            stages.append('images')
+        if self.options.get('tables', False):
+            stages.append('tables')
+        if self.options.get('nlp', True):
+            stages.append('nlp')
+        return stages + list(_LLM_STAGES)
+
+    def _text_chars(self, page):
+        chars = self.features[page - 1]['text_chars']
+        return self._ocr_chars if chars is None else chars
+
+    def _units(self, page, stage):
+        if stage in self.actual.get(page, {}):
+            return self.actual[page][stage]
+        feature = self.features[page - 1]
+        if stage == 'ocr':
+            return feature['page_pixels']
+        if stage == 'images':
+            # Pages without embedded images get a full-page render saved instead
+            return feature['image_pixels'] if feature['image_count'] else feature['page_pixels']
+        if stage == 'tables':
+            return 1
+        if stage in ('text', 'nlp'):
+            return self._text_chars(page)
+        if stage == 'prompt':
+            tokens = self._text_chars(page) / CHARS_PER_TOKEN + PROMPT_OVERHEAD_TOKENS
+            return min(tokens, self.max_prompt_tokens) if self.max_prompt_tokens else tokens
+        return self._completion_tokens
+
+    def _cost(self, stage, units):
+        seconds = units / self.rates[stage]
+        # Summaries run on several workers at once
+        return seconds / self.parallelism if stage in _LLM_STAGES else seconds
+
+    def _totals(self):
+        done_seconds = remaining_seconds = 0.0
+        pages = self.selected if self.selected is not None else range(1, len(self.features) + 1)
+        for page in pages:
+            finished = self.done.get(page, {})
+            for stage in self._stages():
+                total = self._units(page, stage)
+                completed = min(finished.get(stage, 0), total)
+                done_seconds += self._cost(stage, completed)
+                remaining_seconds += self._cost(stage, max(total - completed, 0))
+        return done_seconds, remaining_seconds
+
+    @property
+    def calibrated(self):
+        """True once at least one stage rate has been measured on this document."""
+        return bool(self._measured)
+
+    def remaining_seconds(self):
+        return self._totals()[1]
+
+    def progress(self):
+        """Fraction of the predicted total work that is done (0..1)."""
+        done_seconds, remaining_seconds = self._totals()
+        total = done_seconds + remaining_seconds
+        return done_seconds / total if total > 0 else 0.0
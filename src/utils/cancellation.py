@@ -0,0 +1,68 @@
+# src/utils/cancellation.py
+
+import time
+import threading
+from contextlib import contextmanager
+
+
+class Cancelled(BaseException):
+    """
+    Raised inside a stage that was stopped midway. Like asyncio.CancelledError it is not an
+    Exception, so the `except Exception` fallbacks around OCR and inference let it through.
+    """
+
+
+class CancelToken:
+    """
+    Set once to stop an analysis. Loops poll it with is_set() or check(); blocking work that
+    cannot poll (a Tesseract process, a worker's decode) registers a callback with on_cancel()
+    that aborts it as soon as cancel() is called. It can stand in for the threading.Event that
+    job runners take as cancel_event.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self.requested_at = None  # perf_counter() time of the cancel request
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.requested_at = time.perf_counter()
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+        for callback in callbacks:
+            callback()
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    def check(self):
+        """Raises Cancelled if the token has been cancelled."""
+        if self._event.is_set():
+            raise Cancelled()
+
+    def latency(self):
+        """Seconds since the cancel request, or None if there was none."""
+        return None if self.requested_at is None else time.perf_counter() - self.requested_at
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """Calls `callback` if the token is cancelled while the block runs (at once if it already is)."""
+        key = object()
+        with self._lock:
+            cancelled = self._event.is_set()
+            if not cancelled:
+                self._callbacks[key] = callback
+        if cancelled:
+            callback()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callbacks.pop(key, None)
@@ -21,13 +21,13 @@ def check_tesseract_dependency():
 def check_spacy_model():
     """
     Checks if the spaCy model is installed.
-    Imports spacy lazily to avoid crash if not installed.
+    The model is loaded through nlp_handler, which keeps it for the first analysis.
     """
-    try:
-        import spacy
-        spacy.load("en_core_web_sm")
+    from src.processing import nlp_handler
+
+    if nlp_handler.get_nlp() is not None:
         return True, "spaCy model 'en_core_web_sm' is available."
-    except ImportError:
+    if isinstance(nlp_handler.get_load_error(), ImportError):
         message = (
             "spaCy library is not installed.\n\n"
             "Please install it by running:\n\n"
@@ -35,10 +35,14 @@ def check_spacy_model():
             "python -m spacy download en_core_web_sm"
         )
         return False, message
-    except OSError:
-        message = (
-            "spaCy model 'en_core_web_sm' not found.\n\n"
-            "Please install it by running the following command in your terminal:\n\n"
-            "python -m spacy download en_core_web_sm"
-        )
-        return False, message
\ No newline at end of file
+    message = (
+        "spaCy model 'en_core_web_sm' not found.\n\n"
+        "Please install it by running the following command in your terminal:\n\n"
+        "python -m spacy download en_core_web_sm"
+    )
+    return False, message
+
+
+def run_dependency_checks():
+    """Runs all dependency checks and returns a list of (is_found, message) tuples."""
+    return [check_tesseract_dependency(), check_spacy_model()]
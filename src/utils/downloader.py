@@ -1,7 +1,6 @@
 # src/utils/downloader.py
 
 import os
-import requests
 from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
 
 
@@ -26,6 +25,7 @@ class DownloadWorker(QRunnable):
             if not self.url.startswith("https://"):
                 raise ValueError("Only HTTPS URLs are allowed for security.")
 
+            import requests
             response = requests.get(self.url, stream=True, timeout=(30, None))
             response.raise_for_status()
             total_size = int(response.headers.get('content-length', 0))
@@ -0,0 +1,188 @@
+# src/utils/hardware_profile.py
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import platform
+import subprocess
+
+import config
+from src.utils.helpers import get_memory_info
+
+PROFILE_FILENAME = "hardware_profile.json"
+PROFILE_VERSION = 1
+
+
+def _read(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _parse_size(text):
+    """Parses cache sizes such as '32K', '1024 KB' or '8 MiB' into bytes."""
+    match = re.match(r"\s*([\d.]+)\s*([KMG]?)", str(text).upper())
+    if not match:
+        return None
+    return int(float(match.group(1)) * {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[match.group(2)])
+
+
+def _run(args, timeout=5):
+    try:
+        result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+        if result.returncode == 0:
+            return result.stdout.strip()
+    except (subprocess.TimeoutExpired, OSError):
+        pass
+    return None
+
+
+def _physical_cores():
+    try:
+        import psutil
+        count = psutil.cpu_count(logical=False)
+        if count:
+            return count
+    except ImportError:
+        pass
+
+    # Linux: unique (package, core) pairs from sysfs
+    cores = set()
+    for topology in glob.glob("/sys/devices/system/cpu/cpu[0-9]*/topology"):
+        package = _read(os.path.join(topology, "physical_package_id"))
+        core = _read(os.path.join(topology, "core_id"))
+        if core is not None:
+            cores.add((package, core))
+    if cores:
+        return len(cores)
+
+    if sys.platform == "darwin":
+        value = _run(["sysctl", "-n", "hw.physicalcpu"])
+        if value and value.isdigit():
+            return int(value)
+    if sys.platform == "win32":
+        value = _run(["powershell", "-NoProfile", "-Command",
+                      "(Get-CimInstance Win32_Processor | Measure-Object -Property NumberOfCores -Sum).Sum"],
+                     timeout=15)
+        if value and value.isdigit():
+            return int(value)
+    return os.cpu_count() or 1
+
+
+def _numa_nodes():
+    nodes = glob.glob("/sys/devices/system/node/node[0-9]*")
+    return len(nodes) or 1
+
+
+def _cache_sizes(cpu_info):
+    """Returns {'L1d': bytes, 'L2': bytes, 'L3': bytes} for the first CPU, where known."""
+    caches = {}
+    for index in glob.glob("/sys/devices/system/cpu/cpu0/cache/index[0-9]*"):
+        level = _read(os.path.join(index, "level"))
+        cache_type = _read(os.path.join(index, "type"))
+        size = _parse_size(_read(os.path.join(index, "size")) or "")
+        if not level or not size or cache_type == "Instruction":
+            continue
+        name = f"L{level}d" if level == "1" else f"L{level}"
+        caches[name] = size
+    if caches:
+        return caches
+
+    if sys.platform == "darwin":
+        for name, key in (("L1d", "hw.l1dcachesize"), ("L2", "hw.l2cachesize"), ("L3", "hw.l3cachesize")):
+            value = _run(["sysctl", "-n", key])
+            if value and value.isdigit() and int(value) > 0:
+                caches[name] = int(value)
+        return caches
+
+    for name, key in (("L1d", "l1_data_cache_size"), ("L2", "l2_cache_size"), ("L3", "l3_cache_size")):
+        size = _parse_size(cpu_info.get(key, "")) if cpu_info.get(key) else None
+        if size:
+            caches[name] = size
+    return caches
+
+
+def _gpus():
+    output = _run(['nvidia-smi', '--query-gpu=name,memory.total', '--format=csv,noheader,nounits'])
+    gpus = []
+    for line in (output or "").splitlines():
+        name, _, memory = line.rpartition(',')
+        if name.strip():
+            gpus.append({'name': name.strip(), 'memory_mb': int(memory) if memory.strip().isdigit() else None})
+    return gpus
+
+
+def _fingerprint():
+    """Identifies the machine so a copied cache file is not trusted on different hardware."""
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}"
+
+
+def collect_hardware_profile():
+    """
+    Gathers a full hardware profile. This is slow (tens of ms to seconds), so call it
+    off the GUI thread and prefer load_hardware_profile(), which caches the result.
+    """
+    cpu_info = {}
+    brand = ""
+    try:
+        import cpuinfo
+        cpu_info = cpuinfo.get_cpu_info()
+        brand = cpu_info.get('brand_raw', '')
+    except Exception:
+        brand = platform.processor()
+
+    total_ram, _ = get_memory_info()
+    return {
+        'version': PROFILE_VERSION,
+        'fingerprint': _fingerprint(),
+        'created': time.time(),
+        'platform': platform.platform(),
+        'cpu_brand': brand or "Unknown CPU",
+        'logical_cores': os.cpu_count() or 1,
+        'physical_cores': _physical_cores(),
+        'numa_nodes': _numa_nodes(),
+        'caches': _cache_sizes(cpu_info),
+        'total_ram': total_ram,
+        'gpus': _gpus(),
+    }
+
+
+def load_hardware_profile(refresh=False):
+    """Returns the cached hardware profile, collecting and saving a new one when missing or stale."""
+    path = os.path.join(config.CACHE_DIR, PROFILE_FILENAME)
+    max_age = config.HARDWARE_PROFILE_MAX_AGE_DAYS * 86400
+    if not refresh:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                profile = json.load(f)
+            if (profile.get('version') == PROFILE_VERSION and profile.get('fingerprint') == _fingerprint()
+                    and time.time() - profile.get('created', 0) < max_age):
+                return profile
+        except (OSError, ValueError):
+            pass
+
+    profile = collect_hardware_profile()
+    try:
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not cache hardware profile: {e}")
+    return profile
+
+
+def device_from_profile(profile):
+    """Maps a profile to the ('device_type', 'device_name') pair used by the GUI."""
+    if profile.get('gpus'):
+        return 'cuda', profile['gpus'][0]['name']
+    brand = profile.get('cpu_brand', '')
+    if 'intel' in brand.lower() or 'amd' in brand.lower():
+        return 'cpu', brand
+    return 'cpu', 'Unknown CPU'
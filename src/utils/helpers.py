@@ -1,13 +1,13 @@
 # src/utils/helpers.py
 
+import os
 import platform
-import cpuinfo
-import subprocess
 
 def detect_hardware():
     """
     Detects the available hardware for processing.
-    Checks for CUDA first, then identifies the CPU vendor.
+    Reads the cached hardware profile, so nvidia-smi and cpuinfo only run when
+    the cache is missing or stale. Call it off the GUI thread on first run.
 
     Returns:
         tuple: A tuple containing ('device_type', 'device_name').
@@ -15,30 +15,65 @@ def detect_hardware():
                      ('cpu', 'intel'),
                      ('cpu', 'amd')
     """
-    # Check for NVIDIA GPU with CUDA
+    from src.utils.hardware_profile import load_hardware_profile, device_from_profile
     try:
-        result = subprocess.run(['nvidia-smi', '--query-gpu=name', '--format=csv,noheader'], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0 and result.stdout.strip():
-            gpu_name = result.stdout.strip().split('\n')[0]
-            return 'cuda', gpu_name
-    except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
+        return device_from_profile(load_hardware_profile())
+    except Exception:
+        return 'cpu', 'Unknown CPU'
+
+
+def get_memory_info():
+    """
+    Reports total and available system memory without third-party packages.
+
+    Returns:
+        tuple: (total_bytes, available_bytes). Either value is None when it
+               cannot be determined on this platform.
+    """
+    # Linux: /proc/meminfo has both values, MemAvailable accounts for page cache
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            fields = {}
+            for line in f:
+                key, _, value = line.partition(':')
+                fields[key] = int(value.split()[0]) * 1024
+        return fields.get('MemTotal'), fields.get('MemAvailable', fields.get('MemFree'))
+    except (OSError, ValueError, IndexError):
         pass
 
+    # Windows: GlobalMemoryStatusEx
+    if platform.system() == 'Windows':
+        try:
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ('dwLength', ctypes.c_ulong),
+                    ('dwMemoryLoad', ctypes.c_ulong),
+                    ('ullTotalPhys', ctypes.c_ulonglong),
+                    ('ullAvailPhys', ctypes.c_ulonglong),
+                    ('ullTotalPageFile', ctypes.c_ulonglong),
+                    ('ullAvailPageFile', ctypes.c_ulonglong),
+                    ('ullTotalVirtual', ctypes.c_ulonglong),
+                    ('ullAvailVirtual', ctypes.c_ulonglong),
+                    ('ullAvailExtendedVirtual', ctypes.c_ulonglong),
+                ]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullTotalPhys, status.ullAvailPhys
+        except Exception:
+            pass
+
+    # Generic POSIX fallback (macOS has no SC_AVPHYS_PAGES)
     try:
-        info = cpuinfo.get_cpu_info()
-        brand = info.get('brand_raw', '')
-        brand_lower = brand.lower()
-        if 'intel' in brand_lower:
-            return 'cpu', brand
-        if 'amd' in brand_lower:
-            return 'cpu', brand
-    except Exception:
-        # Fallback to platform module
-        processor_brand = platform.processor()
-        if 'intel' in processor_brand.lower():
-             return 'cpu', processor_brand
-        if 'amd' in processor_brand.lower():
-             return 'cpu', processor_brand
-
-    return 'cpu', 'Unknown CPU'
\ No newline at end of file
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        total = os.sysconf('SC_PHYS_PAGES') * page_size
+        try:
+            available = os.sysconf('SC_AVPHYS_PAGES') * page_size
+        except (ValueError, OSError):
+            available = None
+        return total, available
+    except (ValueError, OSError, AttributeError):
+        return None, None
@@ -0,0 +1,46 @@
+# src/utils/startup_profile.py
+
+import sys
+import subprocess
+
+import config
+
+
+def _parse_importtime(stderr):
+    """Parses `-X importtime` output into (self_us, cumulative_us, depth, module) tuples."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip())) // 2
+            rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+        except ValueError:
+            continue
+    return rows
+
+
+def import_time_report(module="src.gui.main_window", top=25):
+    """
+    Imports a module in a fresh interpreter with `-X importtime` and returns a text report
+    of the total import time and the slowest imports (cumulative and self time).
+    """
+    if getattr(sys, 'frozen', False):
+        return "Import profiling needs a Python interpreter; it is not available in the packaged app."
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=config.BASE_DIR, timeout=120
+    )
+    rows = _parse_importtime(result.stderr)
+    if result.returncode != 0 or not rows:
+        return f"Import of '{module}' failed:\n{result.stderr.strip()[-2000:]}"
+
+    # Top-level entries (depth 1) add up to the total time spent importing the module
+    total_us = sum(cumulative for _, cumulative, depth, _ in rows if depth == 1)
+    lines = [f"Import time for '{module}': {total_us / 1000:.1f} ms ({len(rows)} modules)", "",
+             f"{'cumulative ms':>14} {'self ms':>9}  module"]
+    for self_us, cumulative_us, depth, name in sorted(rows, key=lambda row: row[1], reverse=True)[:top]:
+        lines.append(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    return "\n".join(lines)
@@ -0,0 +1,161 @@
+# src/utils/tracing.py
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Stages in display order; anything else is appended after these
+STAGE_ORDER = ["preview", "dedupe", "render", "ocr", "text", "cleanup", "images", "tables", "nlp", "compress",
+               "llm_tokenize", "llm_prompt_eval", "llm_decode", "overview"]
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile of a list of numbers (q in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples):
+    """count/total/mean/p50/p90/p99 of a list of numbers."""
+    return {
+        'count': len(samples),
+        'total': sum(samples),
+        'mean': sum(samples) / len(samples) if samples else None,
+        'p50': percentile(samples, 50),
+        'p90': percentile(samples, 90),
+        'p99': percentile(samples, 99),
+    }
+
+
+class Tracer:
+    """
+    Records timed spans for one analysis run.
+    Spans are kept in memory and written at the end as a Chrome trace-event file
+    (open it in chrome://tracing or https://ui.perfetto.dev) and a metrics.json summary.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans = []
+        self.llm_stats = []
+
+    @contextmanager
+    def span(self, name, page=None, **args):
+        """Times the block. The yielded dict receives the span's 'duration' when the block exits."""
+        record = {}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['duration'] = time.perf_counter() - start
+            self.add_span(name, start, record['duration'], page, **args)
+
+    def add_span(self, name, start, duration, page=None, track=0, **args):
+        """Adds a span measured elsewhere. start is a perf_counter() value; track separates parallel work."""
+        with self._lock:
+            self.spans.append({'name': name, 'start': start - self._origin, 'duration': max(duration, 0.0),
+                               'page': page, 'track': track, 'args': args})
+
+    def add_llm_stats(self, page, stats, finished_at, track=0):
+        """
+        Turns the stats of a finished summary job into tokenize / prompt eval / decode spans.
+        The job ran in a worker, so its spans are placed backwards from when the result arrived.
+        """
+        if not stats or not stats.get('elapsed'):
+            return
+        start = finished_at - stats['elapsed']
+        tokenize = stats.get('tokenize_seconds') or 0.0
+        ttft = stats.get('time_to_first_token')
+        with self._lock:
+            self.llm_stats.append(dict(stats, page=page))
+        self.add_span("llm_tokenize", start, tokenize, page, track)
+        if ttft is not None:
+            self.add_span("llm_prompt_eval", start + tokenize, ttft - tokenize, page, track,
+                          prompt_tokens=stats.get('prompt_tokens'))
+            self.add_span("llm_decode", start + ttft, stats['elapsed'] - ttft, page, track,
+                          completion_tokens=stats.get('completion_tokens'))
+
+    def stage_totals(self):
+        """{stage: total seconds} in display order, for the live breakdown in the GUI."""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span['name']] = totals.get(span['name'], 0.0) + span['duration']
+        ordered = {name: totals[name] for name in STAGE_ORDER if name in totals}
+        ordered.update({name: value for name, value in totals.items() if name not in ordered})
+        return ordered
+
+    def metrics(self, **extra):
+        """Per-stage latency statistics plus LLM throughput figures."""
+        with self._lock:
+            spans = list(self.spans)
+            llm_stats = list(self.llm_stats)
+        by_stage = {}
+        for span in spans:
+            by_stage.setdefault(span['name'], []).append(span['duration'])
+        stages = {name: summarize(by_stage[name]) for name in self.stage_totals()}
+
+        llm = {}
+        if llm_stats:
+            prompt_rates = [st['prompt_tokens'] / (st['time_to_first_token'] - (st.get('tokenize_seconds') or 0))
+                            for st in llm_stats
+                            if st.get('prompt_tokens') and st.get('time_to_first_token')
+                            and st['time_to_first_token'] > (st.get('tokenize_seconds') or 0)]
+            ttft = [st['time_to_first_token'] for st in llm_stats if st.get('time_to_first_token') is not None]
+            decode = [st['tokens_per_second'] for st in llm_stats if st.get('tokens_per_second')]
+            llm = {
+                'summaries': len(llm_stats),
+                'prompt_tokens': sum(st.get('prompt_tokens') or 0 for st in llm_stats),
+                'completion_tokens': sum(st.get('completion_tokens') or 0 for st in llm_stats),
+                'prompt_eval_tokens_per_sec': summarize(prompt_rates) if prompt_rates else None,
+                'time_to_first_token': summarize(ttft) if ttft else None,
+                'decode_tokens_per_sec': summarize(decode) if decode else None,
+            }
+        return dict(extra, wall_seconds=time.perf_counter() - self._origin, stages=stages, llm=llm)
+
+    def write_chrome_trace(self, path):
+        """Writes the spans in Chrome trace-event format (complete 'X' events, microseconds)."""
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': 'pipeline'}}]
+        with self._lock:
+            spans = list(self.spans)
+        for track in sorted({span['track'] for span in spans} - {0}):
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': track,
+                           'args': {'name': f"llm worker {track}"}})
+        for span in spans:
+            args = dict(span['args'])
+            if span['page'] is not None:
+                args['page'] = span['page']
+            events.append({
+                'name': span['name'],
+                'cat': 'llm' if span['name'].startswith('llm_') else 'page',
+                'ph': 'X',
+                'ts': round(span['start'] * 1e6),
+                'dur': round(span['duration'] * 1e6),
+                'pid': pid,
+                'tid': span['track'],
+                'args': args,
+            })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def write_metrics(self, path, **extra):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.metrics(**extra), f, indent=2)
+
+
+def format_stage_totals(totals):
+    """Compact one-line breakdown, e.g. 'ocr 12.3s (61%) · nlp 2.0s (10%)'."""
+    overall = sum(totals.values())
+    if not overall:
+        return "N/A"
+    return " · ".join(f"{name.replace('llm_', 'llm ')} {seconds:.1f}s ({seconds / overall:.0%})"
+                      for name, seconds in totals.items())
@@ -0,0 +1,27 @@
+# src/utils/workers.py
+
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable
+
+
+class TaskSignals(QObject):
+    """Defines signals for a background task."""
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+
+class TaskWorker(QRunnable):
+    """A QRunnable that runs a plain function in the background and reports its return value."""
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.result.emit(result)